@@ -6,6 +6,8 @@ from flask_cors import CORS
 from .config import Config
 from .db import SessionLocal
 from .seed import ensure_schema, seed_if_empty
+from .services.model_state import StateConflict
+from .utils import err
 
 
 def create_app() -> Flask:
@@ -67,6 +69,11 @@ def create_app() -> Flask:
     def handle_value_error(exc):
         return {"ok": False, "error": str(exc)}, 401
 
+    @app.errorhandler(StateConflict)
+    def handle_state_conflict(_exc):
+        # Another request or the job worker saved the model state first; this request's changes were rolled back.
+        return err("state_conflict", 409)
+
     ensure_schema()
     seed_if_empty()
 
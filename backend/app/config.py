@@ -40,3 +40,8 @@ class Config:
     DEFAULT_CONTEXT_TITLE = os.getenv("DEFAULT_CONTEXT_TITLE", "Default")
     UPLOADS_DIR = os.getenv("UPLOADS_DIR", os.path.join(BASE_DIR, "uploads"))
     AUTO_SEED = os.getenv("AUTO_SEED", "1") == "1"
+    TEAMGEN_WORKERS = int(os.getenv("TEAMGEN_WORKERS", "1"))
+    # Config sweeps are independent replays, so they use every core unless told otherwise.
+    SWEEP_WORKERS = int(os.getenv("SWEEP_WORKERS", "0")) or os.cpu_count() or 1
+    FEEDBACK_RECOMPUTE_SECONDS = float(os.getenv("FEEDBACK_RECOMPUTE_SECONDS", "30"))
+    JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "2"))
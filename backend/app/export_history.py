@@ -0,0 +1,29 @@
+import argparse
+import json
+import pathlib
+
+from team_model.team_model.backtest import history_to_rows
+
+from .config import Config
+from .db import SessionLocal, get_db
+from .services.replay import context_history
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Export a context's finished matches and feedback for offline backtests.")
+    parser.add_argument("output", type=pathlib.Path)
+    parser.add_argument("--context", type=int, default=Config.DEFAULT_CONTEXT_ID)
+    args = parser.parse_args(argv)
+
+    db = get_db()
+    try:
+        rows = history_to_rows(context_history(db, args.context))
+    finally:
+        SessionLocal.remove()
+    args.output.write_text(json.dumps(rows, ensure_ascii=False, indent=1), encoding="utf-8")
+    print(f"{len(rows)} matches written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
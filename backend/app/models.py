@@ -8,6 +8,7 @@ from sqlalchemy import (
     Float,
     ForeignKey,
     Integer,
+    JSON,
     LargeBinary,
     String,
     Text,
@@ -156,6 +157,17 @@ class ModelState(Base):
     updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
 
 
+class ModelCheckpoint(Base):
+    __tablename__ = "model_checkpoints"
+    id = Column(Integer, primary_key=True)
+    context_id = Column(Integer, nullable=False, index=True)
+    match_id = Column(Integer, ForeignKey("matches.id"), nullable=False)
+    position = Column(Integer, nullable=False)
+    history_hash = Column(String, nullable=False)
+    state_blob = Column(LargeBinary, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
 class RatingLog(Base):
     __tablename__ = "rating_logs"
     id = Column(Integer, primary_key=True)
@@ -186,3 +198,50 @@ class InteractionLog(Base):
     value_after = Column(Float, nullable=False, default=0)
     source = Column(String, nullable=False, default="manual")
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class InteractionArchive(Base):
+    # Pairs a compaction removed because a player went inactive, with their last value: from
+    # POST /admin/state/compact, or from the online pass of the match in `match_id` (rewritten on replay).
+    # Kept apart from interaction_logs, which log rebuilds regenerate from the match history.
+    __tablename__ = "interaction_archive"
+    id = Column(Integer, primary_key=True)
+    context_id = Column(Integer, nullable=False, index=True)
+    match_id = Column(Integer, nullable=True)
+    venue = Column(String, nullable=False)
+    kind = Column(String, nullable=False)  # "synergy" | "domination"
+    player_a = Column(String, nullable=False)
+    player_b = Column(String, nullable=False)
+    value = Column(Float, nullable=False)
+    archived_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class RecomputeStat(Base):
+    # Per-context feedback recompute metrics kept outside the jobs table: requests that needed no replay.
+    __tablename__ = "recompute_stats"
+    context_id = Column(Integer, primary_key=True)
+    skipped = Column(Integer, nullable=False, default=0)
+
+
+class Job(Base):
+    # Background work run by `python -m app.worker`; `cursor` counts finished steps so an interrupted job resumes.
+    __tablename__ = "jobs"
+    id = Column(Integer, primary_key=True)
+    kind = Column(String, nullable=False)
+    context_id = Column(Integer, nullable=False)
+    status = Column(String, nullable=False, default="queued")  # queued | running | done | failed | cancelled
+    progress = Column(Float, nullable=False, default=0)
+    cursor = Column(Integer, nullable=False, default=0)
+    cancel_requested = Column(Boolean, nullable=False, default=False)
+    # Log rebuilds: the highest log id when the job started. Rows above it are the generation being written,
+    # hidden from readers until the job finishes and drops the rows at or below it.
+    watermark = Column(Integer, nullable=True)
+    # Feedback recomputes: the matches that got feedback, and the end of the window that collects them.
+    params_json = Column(JSON, nullable=True)
+    run_after = Column(DateTime, nullable=True)
+    error = Column(String, nullable=True)
+    result_json = Column(JSON, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    started_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    finished_at = Column(DateTime, nullable=True)
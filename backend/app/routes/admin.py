@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from datetime import datetime
-import copy
+import pickle
 
 from flask import Blueprint, request
 
@@ -12,8 +12,10 @@ from ..models import (
     Event,
     Feedback,
     InteractionLog,
+    Job,
     Match,
     MatchMember,
+    ModelCheckpoint,
     PaymentInfo,
     PaymentRequest,
     PaymentStatus,
@@ -24,13 +26,15 @@ from ..models import (
     User,
     UserSettings,
 )
-from ..routes.feedback import log_interaction_diffs
-from ..services.match import build_feedback, build_team_model_match
-from ..services.model_state import load_state, save_state
+from ..services.jobs import enqueue, job_payload, request_cancel
+from ..services.model_state import load_state, save_state, state_version
+from ..services.rebuild import published
+from ..services.replay import archive_interactions, invalidate_checkpoints
+from ..services.team_cache import cache_key, get_cached, put_cached
 from ..utils import err, ok
 from team_model.team_model import Config as TeamConfig
 from team_model.team_model import ModelState as TeamModelState
-from team_model.team_model import update_from_match_with_breakdown
+from team_model.team_model.compaction import compact_state
 
 bp = Blueprint("admin", __name__, url_prefix="/admin")
 
@@ -87,6 +91,7 @@ def _rebind_player(state: TeamModelState, source_id: str, target_id: str) -> Non
             key = (new_dom, new_victim)
             updated[key] = updated.get(key, 0.0) + value
         state.interactions.domination[venue] = updated
+    state.interactions.invalidate_effective()
 
     if source_id in state.players:
         del state.players[source_id]
@@ -223,50 +228,6 @@ def _rebind_interaction_logs(db, source_id: str, target_id: str) -> None:
             row.player_b = target_id
 
 
-def _log_match_deltas(db, match: Match, state: TeamModelState) -> None:
-    team_match = build_team_model_match(db, match.id)
-    venue = team_match.venue
-    pre_global = {name: player.global_rating for name, player in state.players.items()}
-    pre_venue = {
-        name: player.venue_ratings.get(venue, state.config.venue_start_rating)
-        for name, player in state.players.items()
-    }
-    quick_feedback, expanded_feedback = build_feedback(db, match.id)
-    deltas, breakdown = update_from_match_with_breakdown(
-        state, team_match, quick_feedback=quick_feedback, expanded_feedback=expanded_feedback
-    )
-    goals: dict[str, int] = {}
-    assists: dict[str, int] = {}
-    for ev in team_match.events:
-        if ev.event_type == "goal":
-            goals[ev.player] = goals.get(ev.player, 0) + 1
-        elif ev.event_type == "assist":
-            assists[ev.player] = assists.get(ev.player, 0) + 1
-    for player_id, delta in deltas.items():
-        player = state.players.get(player_id)
-        if not player:
-            continue
-        post_global = player.global_rating
-        post_venue = player.venue_ratings.get(venue, state.config.venue_start_rating)
-        before_global = pre_global.get(player_id, post_global - delta)
-        before_venue = pre_venue.get(player_id, post_venue - delta)
-        db.add(
-            RatingLog(
-                match_id=match.id,
-                player_id=player_id,
-                venue=venue,
-                delta=delta,
-                pre_global=before_global,
-                post_global=post_global,
-                pre_venue=before_venue,
-                post_venue=post_venue,
-                goals=goals.get(player_id, 0),
-                assists=assists.get(player_id, 0),
-                details_json=breakdown.get(player_id),
-            )
-        )
-
-
 @bp.get("/users")
 def list_users():
     if not _require_admin():
@@ -424,6 +385,7 @@ def bind_state_player():
             target_user.custom_avatar = source_user.custom_avatar
         db.query(UserSettings).filter_by(tg_id=source_tg).delete()
         db.delete(source_user)
+    invalidate_checkpoints(db)
     save_state(db, context_id, state)
     db.commit()
     return ok()
@@ -439,18 +401,29 @@ def rebuild_state():
     context = db.query(Context).filter_by(id=context_id).one_or_none()
     if context is None:
         return err("context_not_found", 404)
-    state = TeamModelState.empty(TeamConfig())
-    matches = (
-        db.query(Match)
-        .filter_by(context_id=context_id, status="finished")
-        .order_by(Match.created_at.asc())
-        .all()
-    )
-    for match in matches:
-        team_match = build_team_model_match(db, match.id)
-        update_from_match(state, team_match)
+    # Replaying a whole history can outlive the request timeout, so `python -m app.worker` runs it.
+    return ok(job_payload(enqueue(db, "rebuild_state", context_id)), 202)
+
+
+@bp.post("/state/compact")
+def compact_state_route():
+    if not _require_admin():
+        return err("forbidden", 403)
+    data = request.get_json(silent=True) or {}
+    context_id = int(data.get("context_id", 1))
+    try:
+        days = float(data.get("days", 0.0))
+        matches = int(data.get("matches", 0))
+    except (TypeError, ValueError):
+        return err("invalid_payload", 400)
+    db = get_db()
+    state = load_state(db, context_id)
+    bytes_before = len(pickle.dumps(state))
+    report = compact_state(state, matches=matches, days=days)
+    # Archived pairs are stored in the same commit as the state they were removed from.
+    archive_interactions(db, context_id, report.archived_entries())
     save_state(db, context_id, state)
-    return ok({"matches": len(matches)})
+    return ok({**report.as_dict(), "bytes_before": bytes_before, "bytes_after": len(pickle.dumps(state))})
 
 
 @bp.post("/matches/<int:match_id>/members")
@@ -496,6 +469,7 @@ def add_match_members(match_id: int):
             record.name = name
             record.rating = rating
             record.invited_by_tg_id = invited_by_tg_id
+    invalidate_checkpoints(db, match)
     db.commit()
     return ok()
 
@@ -508,6 +482,7 @@ def remove_match_member(match_id: int, tg_id: int):
     member = db.query(MatchMember).filter_by(match_id=match_id, tg_id=tg_id).one_or_none()
     if member is None:
         return err("member_not_found", 404)
+    invalidate_checkpoints(db, db.query(Match).filter_by(id=match_id).one())
     db.delete(member)
     db.commit()
     return ok()
@@ -528,6 +503,7 @@ def patch_segment(match_id: int, segment_id: int):
         segment.score_b = int(data["score_b"])
     if data.get("ended_at") == "now":
         segment.ended_at = datetime.utcnow()
+    invalidate_checkpoints(db, db.query(Match).filter_by(id=match_id).one())
     db.commit()
     return ok()
 
@@ -542,6 +518,9 @@ def delete_match(match_id: int):
         return err("match_not_found", 404)
     
     # Удаляем все связанные данные в правильном порядке
+    # 0. Checkpoint (later ones no longer match the history hash)
+    db.query(ModelCheckpoint).filter_by(match_id=match_id).delete()
+
     # 1. Rating logs
     db.query(RatingLog).filter_by(match_id=match_id).delete()
     
@@ -589,7 +568,7 @@ def rating_logs():
     db = get_db()
     player_id = request.args.get("player_id")
     match_id = request.args.get("match_id", type=int)
-    query = db.query(RatingLog).order_by(RatingLog.created_at.desc())
+    query = published(db, db.query(RatingLog), RatingLog).order_by(RatingLog.created_at.desc())
     if player_id:
         query = query.filter_by(player_id=str(player_id))
     if match_id:
@@ -671,6 +650,41 @@ def list_interactions():
     return ok({"players": players, "values": values, "venue": venue, "kind": kind})
 
 
+@bp.get("/interactions/<player>/top")
+def top_interactions(player: str):
+    if not _require_admin():
+        return err("forbidden", 403)
+    db = get_db()
+    context_id = request.args.get("context_id", type=int) or 1
+    venue = request.args.get("venue") or "__global__"
+    kind = request.args.get("kind") or "synergy"
+    k = request.args.get("k", type=int) or 5
+    if kind not in ("synergy", "domination", "dominated_by") or k < 1:
+        return err("invalid_query", 400)
+    # The partner index lives on the interactions object, so it is kept per state version and
+    # later queries only walk the ends of the player's sorted lists.
+    key = cache_key(context_id, state_version(db, context_id), "", [], "interactions")
+    cached = get_cached(key)
+    if cached is None:
+        state = load_state(db, context_id)
+        cached = (frozenset(state.players), state.interactions)
+        put_cached(cache_key(context_id, state_version(db, context_id), "", [], "interactions"), cached)
+    players, interactions = cached
+    if player not in players:
+        return err("player_not_found", 404)
+    venues = None if venue == "all" else tuple(_venue_keys(venue))
+    top = interactions.top_partners(kind, player, venues, k)
+    return ok(
+        {
+            "player": player,
+            "venue": venue,
+            "kind": kind,
+            "positive": [{"player": other, "value": value} for other, value in top["positive"]],
+            "negative": [{"player": other, "value": value} for other, value in top["negative"]],
+        }
+    )
+
+
 @bp.patch("/interactions")
 def patch_interaction():
     if not _require_admin():
@@ -699,6 +713,7 @@ def patch_interaction():
         key = (str(player_a), str(player_b))
         before = state.interactions.domination[venue].get(key, 0.0)
         state.interactions.domination[venue][key] = float(value)
+    state.interactions.invalidate_effective()
     save_state(db, context_id, state)
     db.add(
         InteractionLog(
@@ -725,7 +740,8 @@ def interaction_logs():
     venue = request.args.get("venue")
     kind = request.args.get("kind")
     player = request.args.get("player")
-    query = db.query(InteractionLog).filter_by(context_id=context_id).order_by(InteractionLog.created_at.desc())
+    query = published(db, db.query(InteractionLog), InteractionLog)
+    query = query.filter_by(context_id=context_id).order_by(InteractionLog.created_at.desc())
     if venue and venue not in ("all", "__global__"):
         venue_keys = _venue_keys(venue)
         if len(venue_keys) == 1:
@@ -767,42 +783,7 @@ def rebuild_interaction_logs():
         return err("forbidden", 403)
     data = request.get_json(silent=True) or {}
     context_id = int(data.get("context_id", 1))
-    db = get_db()
-    db.query(InteractionLog).filter_by(context_id=context_id).delete()
-    state = TeamModelState.empty(TeamConfig())
-    matches = (
-        db.query(Match)
-        .filter_by(context_id=context_id, status="finished")
-        .order_by(Match.created_at.asc())
-        .all()
-    )
-    for match in matches:
-        team_match = build_team_model_match(db, match.id)
-        quick_feedback, expanded_feedback = build_feedback(db, match.id)
-        state_match = copy.deepcopy(state)
-        update_from_match_with_breakdown(state_match, team_match, quick_feedback=None, expanded_feedback=None)
-        log_interaction_diffs(db, context_id, state, state_match, match_id=match.id, source="match")
-        if quick_feedback or expanded_feedback:
-            state_feedback = copy.deepcopy(state)
-            update_from_match_with_breakdown(
-                state_feedback,
-                team_match,
-                quick_feedback=quick_feedback,
-                expanded_feedback=expanded_feedback,
-            )
-            log_interaction_diffs(
-                db,
-                context_id,
-                state_match,
-                state_feedback,
-                match_id=match.id,
-                source="feedback",
-            )
-            state = state_feedback
-        else:
-            state = state_match
-    db.commit()
-    return ok({"matches": len(matches)})
+    return ok(job_payload(enqueue(get_db(), "rebuild_interaction_logs", context_id)), 202)
 
 
 @bp.post("/rating-logs/rebuild")
@@ -811,16 +792,26 @@ def rebuild_rating_logs():
         return err("forbidden", 403)
     data = request.get_json(silent=True) or {}
     context_id = int(data.get("context_id", 1))
+    return ok(job_payload(enqueue(get_db(), "rebuild_rating_logs", context_id)), 202)
+
+
+@bp.get("/jobs/<int:job_id>")
+def get_job(job_id: int):
+    if not _require_admin():
+        return err("forbidden", 403)
+    job = get_db().query(Job).filter_by(id=job_id).one_or_none()
+    if job is None:
+        return err("job_not_found", 404)
+    return ok(job_payload(job))
+
+
+@bp.post("/jobs/<int:job_id>/cancel")
+def cancel_job(job_id: int):
+    if not _require_admin():
+        return err("forbidden", 403)
     db = get_db()
-    db.query(RatingLog).delete()
-    state = TeamModelState.empty(TeamConfig())
-    matches = (
-        db.query(Match)
-        .filter_by(context_id=context_id, status="finished")
-        .order_by(Match.created_at.asc())
-        .all()
-    )
-    for match in matches:
-        _log_match_deltas(db, match, state)
-    db.commit()
-    return ok({"matches": len(matches)})
+    job = db.query(Job).filter_by(id=job_id).one_or_none()
+    if job is None:
+        return err("job_not_found", 404)
+    request_cancel(db, job)
+    return ok(job_payload(job))
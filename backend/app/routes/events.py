@@ -6,6 +6,7 @@ from ..auth import is_admin, require_user
 from ..db import get_db
 from ..models import Event, Match, MatchMember, Segment
 from ..services.match import ensure_active_segment
+from ..services.replay import invalidate_checkpoints
 from ..utils import err, ok
 
 bp = Blueprint("events", __name__, url_prefix="/matches/<int:match_id>/events")
@@ -64,6 +65,7 @@ def goal(match_id: int):
     )
     db.add(event)
     _apply_score(segment, team, 1)
+    invalidate_checkpoints(db, match)
     db.commit()
     return ok({"event_id": event.id})
 
@@ -97,6 +99,7 @@ def own_goal(match_id: int):
     )
     db.add(event)
     _apply_score(segment, opponent, 1)
+    invalidate_checkpoints(db, match)
     db.commit()
     return ok({"event_id": event.id})
 
@@ -117,6 +120,7 @@ def patch_event(match_id: int, event_id: int):
     event.scorer_tg_id = data.get("scorer_tg_id", event.scorer_tg_id)
     event.assist_tg_id = data.get("assist_tg_id", event.assist_tg_id)
     event.updated_at = datetime.utcnow()
+    invalidate_checkpoints(db, match)
     db.commit()
     return ok()
 
@@ -137,5 +141,6 @@ def delete_event(match_id: int, event_id: int):
         event.is_deleted = True
         segment = db.query(Segment).filter_by(id=event.segment_id).one()
         _apply_score(segment, event.team, -1)
+    invalidate_checkpoints(db, match)
     db.commit()
     return ok()
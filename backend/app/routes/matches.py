@@ -1,5 +1,5 @@
+from dataclasses import replace
 from datetime import datetime
-import copy
 
 from flask import Blueprint, request
 
@@ -15,24 +15,25 @@ from ..models import (
     PaymentInfo,
     PaymentRequest,
     PaymentStatus,
-    RatingLog,
     Segment,
     TeamCurrent,
     TeamVariant,
     User,
 )
-from ..routes.feedback import log_interaction_diffs
-from ..services.match import build_feedback, build_team_model_match, ensure_active_segment, finish_segment
+from ..routes.feedback import log_interaction_changes
+from ..routes.teams import generate_variants
+from ..services.match import build_team_model_match, ensure_active_segment, finish_segment
 from ..services.model_state import load_state, save_state
+from ..services.replay import apply_match, invalidate_checkpoints
 from ..utils import err, ok
-from team_model.team_model import ModelState as TeamModelState
-from team_model.team_model import update_from_match_with_breakdown
-from team_model.team_model import Config as TeamConfig
-from team_model.team_model.teamgen import evaluate_split, generate_teams
+from team_model.team_model import Segment as TeamSegment
+from team_model.team_model import update_from_match
+from team_model.team_model.overlay import overlay_state
 
 bp = Blueprint("matches", __name__, url_prefix="/matches")
 
 _VENUE_MAP = {"зал1": "Эксперт", "зал2": "Маракана"}
+MAX_SCORELINES = 12
 
 
 def _display_venue(venue: str | None) -> str | None:
@@ -48,6 +49,20 @@ def _normalize_venue(venue: str | None) -> str | None:
     return reverse.get(venue, venue)
 
 
+def _scorelines_payload(data: dict) -> list[tuple[int, int]] | None:
+    raw = data.get("scorelines")
+    if not isinstance(raw, list) or not 0 < len(raw) <= MAX_SCORELINES:
+        return None
+    scorelines = []
+    for item in raw:
+        if not isinstance(item, list) or len(item) != 2:
+            return None
+        if not all(isinstance(goals, int) and not isinstance(goals, bool) and 0 <= goals <= 99 for goals in item):
+            return None
+        scorelines.append((item[0], item[1]))
+    return scorelines
+
+
 def _require_member(db, match_id: int, tg_id: int) -> MatchMember | None:
     return db.query(MatchMember).filter_by(match_id=match_id, tg_id=tg_id).one_or_none()
 
@@ -64,21 +79,6 @@ def _can_edit(db, match_id: int, user_id: int) -> bool:
     return member is not None and (member.can_edit or member.role == "organizer")
 
 
-def _why_text(base_eval: dict, alt_eval: dict) -> str:
-    reasons = []
-    if abs(alt_eval["d_hat"]) > abs(base_eval["d_hat"]):
-        reasons.append("больший разрыв рейтинга")
-    if alt_eval["components"]["syn"] > base_eval["components"]["syn"]:
-        reasons.append("больше стакинга синергии")
-    if alt_eval["components"]["dom"] > base_eval["components"]["dom"]:
-        reasons.append("больше доминирования")
-    if alt_eval["components"]["role"] > base_eval["components"]["role"]:
-        reasons.append("хуже баланс ролей")
-    if alt_eval["components"]["top"] > base_eval["components"]["top"]:
-        reasons.append("слишком сильные игроки в одной команде")
-    return ", ".join(reasons) or "слегка хуже по общему балансу"
-
-
 @bp.get("/")
 def list_matches():
     user = require_user()
@@ -251,62 +251,42 @@ def finish_match(match_id: int):
     match.finished_at = datetime.utcnow()
 
     state = load_state(db, match.context_id)
-    prev_state = TeamModelState.empty(TeamConfig())
-    prev_state.interactions = copy.deepcopy(state.interactions)
-    team_match = build_team_model_match(db, match_id)
-    venue = team_match.venue
-    pre_global = {name: player.global_rating for name, player in state.players.items()}
-    pre_venue = {
-        name: player.venue_ratings.get(venue, state.config.venue_start_rating)
-        for name, player in state.players.items()
-    }
-    quick_feedback, expanded_feedback = build_feedback(db, match_id)
-    deltas, breakdown = update_from_match_with_breakdown(
-        state, team_match, quick_feedback=quick_feedback, expanded_feedback=expanded_feedback
-    )
-    goals: dict[str, int] = {}
-    assists: dict[str, int] = {}
-    for ev in team_match.events:
-        if ev.event_type == "goal":
-            goals[ev.player] = goals.get(ev.player, 0) + 1
-        elif ev.event_type == "assist":
-            assists[ev.player] = assists.get(ev.player, 0) + 1
-    for player_id, delta in deltas.items():
-        player = state.players.get(player_id)
-        if not player:
-            continue
-        post_global = player.global_rating
-        post_venue = player.venue_ratings.get(venue, state.config.venue_start_rating)
-        before_global = pre_global.get(player_id, post_global - delta)
-        before_venue = pre_venue.get(player_id, post_venue - delta)
-        db.add(
-            RatingLog(
-                match_id=match.id,
-                player_id=player_id,
-                venue=venue,
-                delta=delta,
-                pre_global=before_global,
-                post_global=post_global,
-                pre_venue=before_venue,
-                post_venue=post_venue,
-                goals=goals.get(player_id, 0),
-                assists=assists.get(player_id, 0),
-                details_json=breakdown.get(player_id),
-            )
-        )
+    journal = apply_match(db, state, match_id)
     save_state(db, match.context_id, state)
-    log_interaction_diffs(
-        db,
-        match.context_id,
-        prev_state,
-        state,
-        match_id=match.id,
-        source="match",
-    )
+    log_interaction_changes(db, match.context_id, journal.interaction_changes(), match_id=match.id, source="match")
     db.commit()
     return ok()
 
 
+@bp.post("/<int:match_id>/simulate")
+def simulate_match(match_id: int):
+    require_user()
+    data = request.get_json(silent=True) or {}
+    scorelines = _scorelines_payload(data)
+    if scorelines is None:
+        return err("invalid_scorelines", 400)
+    db = get_db()
+    match = db.query(Match).filter_by(id=match_id).one_or_none()
+    if match is None:
+        return err("match_not_found", 404)
+    if match.status == "finished":
+        # The saved state already includes a finished match; projecting it again would count it twice.
+        return err("match_finished", 400)
+    team_match = build_team_model_match(db, match_id)
+    if not team_match.team_a or not team_match.team_b:
+        return err("teams_not_found", 404)
+    state = load_state(db, match.context_id)
+    projections = []
+    for goals_a, goals_b in scorelines:
+        # Scoreline only: one segment, no goal/assist events. Each projection gets its own overlay over the
+        # saved state, so nothing is copied beyond the players and interactions the update touches.
+        segment = TeamSegment(goals_a=goals_a, goals_b=goals_b, segment_index=0)
+        projected = replace(team_match, segments=[segment], events=[])
+        deltas = update_from_match(overlay_state(state), projected)
+        projections.append({"score_a": goals_a, "score_b": goals_b, "deltas": deltas})
+    return ok({"projections": projections})
+
+
 @bp.post("/<int:match_id>/segments/new")
 def new_segment(match_id: int):
     user = require_user()
@@ -340,6 +320,7 @@ def delete_segment(match_id: int, segment_id: int):
         return err("segment_not_finished", 400)
     db.query(Event).filter_by(segment_id=segment_id, match_id=match_id).delete()
     db.delete(segment)
+    invalidate_checkpoints(db, match)
     db.commit()
     return ok()
 
@@ -432,23 +413,15 @@ def repeat_match(match_id: int):
                 )
             )
 
-        state = load_state(db, new_match.context_id)
         participants = [str(tg_id) for tg_id in participant_ids]
-        for name in participants:
-            state.ensure_player(name, new_match.venue, state.config.global_start_rating, False)
-        save_state(db, new_match.context_id, state)
-
-        variants = generate_teams(state, participants, new_match.venue, top_n=3)
-        base_eval = evaluate_split(state, variants[0]["team_a"], variants[0]["team_b"], new_match.venue)
-        for idx, variant in enumerate(variants, start=1):
-            eval_split = evaluate_split(state, variant["team_a"], variant["team_b"], new_match.venue)
-            why = None if idx == 1 else _why_text(base_eval, eval_split)
+        _, rows = generate_variants(db, new_match.context_id, new_match.venue, participants)
+        for idx, (teams_json, why) in enumerate(rows, start=1):
             db.add(
                 TeamVariant(
                     match_id=new_match.id,
                     variant_no=idx,
                     is_recommended=idx == 1,
-                    teams_json={"A": variant["team_a"], "B": variant["team_b"]},
+                    teams_json=teams_json,
                     why_text=why,
                 )
             )
@@ -1,14 +1,27 @@
+import copy
+from datetime import datetime
+
 from flask import Blueprint, request
 
 from ..auth import is_admin, require_user
+from ..config import Config
 from ..db import get_db
-from ..models import Match, MatchMember, TeamCurrent, TeamVariant, User
-from ..services.model_state import load_state, save_state
+from ..models import Job, Match, MatchMember, TeamCurrent, TeamVariant, User
+from ..services.jobs import JobError, enqueue
+from ..services.model_state import ensure_players, load_state, save_state, state_version
+from ..services.replay import invalidate_checkpoints
+from ..services.team_cache import cache_key, cached_matrix, get_cached, put_cached
 from ..utils import err, ok
-from team_model.team_model.teamgen import evaluate_split, generate_teams
+from team_model.team_model.constraints import TeamConstraints
+from team_model.team_model.dense import DenseInteractionState
+from team_model.team_model.engine import build_split_context
+from team_model.team_model.partition import TEAM_KEYS, generate_partitions
+from team_model.team_model.teamgen import SOLVERS, evaluate_split, generate_teams, suggest_quick_swaps
 
 bp = Blueprint("teams", __name__, url_prefix="/matches/<int:match_id>/teams")
 
+MAX_SWAP_SUGGESTIONS = 10
+
 
 def _is_organizer(db, match_id: int, tg_id: int) -> bool:
     member = (
@@ -36,6 +49,8 @@ def _why_text(base_eval: dict, alt_eval: dict) -> str:
 
 def _normalize_team_payload(data: dict) -> dict | None:
     teams = data.get("teams") or {}
+    if not isinstance(teams, dict):
+        return None
     team_a = teams.get("A") or teams.get("team_a")
     team_b = teams.get("B") or teams.get("team_b")
     if not isinstance(team_a, list) or not isinstance(team_b, list):
@@ -43,6 +58,29 @@ def _normalize_team_payload(data: dict) -> dict | None:
     return {"A": [str(p) for p in team_a], "B": [str(p) for p in team_b]}
 
 
+def _constraints_payload(data: dict, participants: list[str]) -> TeamConstraints | None:
+    raw = data.get("constraints") or {}
+    if not isinstance(raw, dict):
+        return None
+    together = raw.get("together") or []
+    apart = raw.get("apart") or []
+    team_a = raw.get("A") or []
+    team_b = raw.get("B") or []
+    if not all(isinstance(value, list) for value in (together, apart, team_a, team_b)):
+        return None
+    groups = [*together, *apart, team_a, team_b]
+    if not all(isinstance(g, list) for g in groups):
+        return None
+    if any(len(pair) != 2 for pair in apart) or not {str(p) for g in groups for p in g} <= set(participants):
+        return None
+    return TeamConstraints(
+        together=tuple(tuple(str(p) for p in group) for group in together),
+        apart=tuple((str(a), str(b)) for a, b in apart),
+        team_a=tuple(str(p) for p in team_a),
+        team_b=tuple(str(p) for p in team_b),
+    )
+
+
 def _team_name_from_current(current: TeamCurrent | None, team_key: str) -> str:
     if current and current.current_teams_json.get(team_key):
         return current.current_teams_json.get(team_key)
@@ -102,6 +140,147 @@ def _build_custom_reason(
     return " ".join(reasons)
 
 
+def _build_variants(
+    state,
+    participants: list[str],
+    venue: str,
+    solver: str,
+    teams_count: int,
+    constraints: TeamConstraints | None = None,
+    matrix: DenseInteractionState | None = None,
+) -> tuple[list[dict], list]:
+    ctx = build_split_context(state, participants, venue, matrix)
+    rows = []
+    if teams_count > 2:
+        # Rotation nights: each variant carries one key per team ("A", "B", "C", ...).
+        variants = generate_partitions(state, participants, venue, teams_count, top_n=3, ctx=ctx)
+        for idx, variant in enumerate(variants, start=1):
+            why = None if idx == 1 else _why_text(variants[0], variant)
+            rows.append((dict(zip(TEAM_KEYS, variant["teams"])), why))
+        return variants, rows
+
+    variants = generate_teams(
+        state,
+        participants,
+        venue,
+        top_n=3,
+        solver=solver,
+        ctx=ctx,
+        workers=Config.TEAMGEN_WORKERS,
+        constraints=constraints,
+    )
+    if not variants:
+        return [], []
+    base_eval = evaluate_split(state, variants[0]["team_a"], variants[0]["team_b"], venue, ctx=ctx)
+    for idx, variant in enumerate(variants, start=1):
+        eval_split = evaluate_split(state, variant["team_a"], variant["team_b"], venue, ctx=ctx)
+        why = None if idx == 1 else _why_text(base_eval, eval_split)
+        rows.append(({"A": variant["team_a"], "B": variant["team_b"]}, why))
+    return variants, rows
+
+
+def generate_variants(
+    db,
+    context_id: int,
+    venue: str,
+    participants: list[str],
+    solver: str = "auto",
+    teams_count: int = 2,
+    constraints: TeamConstraints | None = None,
+    progress=None,
+) -> tuple[list[dict], list]:
+    # Returns (variants, [(teams_json, why_text), ...]). Repeat generations for an unchanged
+    # state and roster are served from the cache without unpickling the state.
+    options = ("generate", solver, teams_count, constraints)
+    cached = get_cached(cache_key(context_id, state_version(db, context_id), venue, participants, *options))
+    if cached is None:
+        state = load_state(db, context_id)
+        if ensure_players(state, participants, venue):
+            save_state(db, context_id, state)
+        version = state_version(db, context_id)
+        matrix = cached_matrix(context_id, version, lambda: DenseInteractionState.from_sparse(state.interactions))
+        if progress:
+            progress(0.2)
+        cached = _build_variants(state, participants, venue, solver, teams_count, constraints, matrix)
+        put_cached(cache_key(context_id, version, venue, participants, *options), cached)
+    return copy.deepcopy(cached)
+
+
+def _generate_and_store(
+    db,
+    match_id: int,
+    context_id: int,
+    venue: str,
+    participants: list[str],
+    solver: str,
+    teams_count: int,
+    constraints: TeamConstraints,
+    progress=None,
+) -> dict:
+    try:
+        variants, rows = generate_variants(db, context_id, venue, participants, solver, teams_count, constraints, progress)
+    except ValueError as exc:
+        if str(exc) != "conflicting_constraints":
+            raise
+        raise JobError("conflicting_constraints") from exc
+    if not rows:
+        raise JobError("constraints_unsatisfiable")
+    if progress:
+        progress(0.9)
+    db.query(TeamVariant).filter_by(match_id=match_id).delete()
+    for idx, (teams_json, why) in enumerate(rows, start=1):
+        db.add(
+            TeamVariant(
+                match_id=match_id,
+                variant_no=idx,
+                is_recommended=idx == 1,
+                teams_json=teams_json,
+                why_text=why,
+            )
+        )
+    db.commit()
+    return {
+        "variants": [
+            {
+                "variant_no": idx + 1,
+                "is_recommended": idx == 0,
+                "teams": variants[idx],
+                "why_text": rows[idx][1],
+            }
+            for idx in range(len(variants))
+        ]
+    }
+
+
+def run_generate_job(db, job: Job) -> dict:
+    # Worker handler for {"async": true} generations; params_json holds the request as it was queued.
+    params = job.params_json
+    raw = params["constraints"]
+    constraints = TeamConstraints(
+        together=tuple(tuple(group) for group in raw["together"]),
+        apart=tuple((a, b) for a, b in raw["apart"]),
+        team_a=tuple(raw["A"]),
+        team_b=tuple(raw["B"]),
+    )
+
+    def progress(value: float) -> None:
+        job.progress = round(min(max(value, 0.0), 1.0), 3)
+        job.updated_at = datetime.utcnow()
+        db.commit()
+
+    return _generate_and_store(
+        db,
+        params["match_id"],
+        job.context_id,
+        params["venue"],
+        params["participants"],
+        params["solver"],
+        params["teams_count"],
+        constraints,
+        progress,
+    )
+
+
 @bp.post("/generate")
 def generate(match_id: int):
     user = require_user()
@@ -111,6 +290,16 @@ def generate(match_id: int):
         return err("match_not_found", 404)
     if not (is_admin(user) or _is_organizer(db, match_id, user.tg_id)):
         return err("forbidden", 403)
+    data = request.get_json(silent=True) or {}
+    solver = data.get("solver", "auto")
+    if solver not in SOLVERS:
+        return err("invalid_solver", 400)
+    try:
+        teams_count = int(data.get("teams_count", 2))
+    except (TypeError, ValueError):
+        return err("invalid_teams_count", 400)
+    if not 2 <= teams_count <= len(TEAM_KEYS):
+        return err("invalid_teams_count", 400)
 
     members = (
         db.query(MatchMember)
@@ -119,46 +308,52 @@ def generate(match_id: int):
         .all()
     )
     participants = [str(m.tg_id) for m in members]
-    if len(participants) < 2:
+    if len(participants) < teams_count:
         return err("not_enough_players", 400)
+    constraints = _constraints_payload(data, participants)
+    if constraints is None or (teams_count > 2 and not constraints.is_empty()):
+        return err("invalid_constraints", 400)
+
+    if data.get("async"):
+        # Runs on `python -m app.worker`, so the job outlives this request and a restart of the web process.
+        params = {
+            "match_id": match_id,
+            "venue": match.venue,
+            "participants": participants,
+            "solver": solver,
+            "teams_count": teams_count,
+            "constraints": {
+                "together": [list(group) for group in constraints.together],
+                "apart": [list(pair) for pair in constraints.apart],
+                "A": list(constraints.team_a),
+                "B": list(constraints.team_b),
+            },
+        }
+        job = enqueue(db, "generate_teams", match.context_id, params)
+        return ok({"job_id": job.id, "status": job.status}, 202)
+    try:
+        args = (match_id, match.context_id, match.venue, participants, solver, teams_count, constraints)
+        return ok(_generate_and_store(db, *args))
+    except JobError as exc:
+        return err(str(exc), 400)
 
-    state = load_state(db, match.context_id)
-    for name in participants:
-        state.ensure_player(name, match.venue, state.config.global_start_rating, False)
-    save_state(db, match.context_id, state)
-    variants = generate_teams(state, participants, match.venue, top_n=3)
-    db.query(TeamVariant).filter_by(match_id=match_id).delete()
 
-    base_eval = evaluate_split(state, variants[0]["team_a"], variants[0]["team_b"], match.venue)
-    for idx, variant in enumerate(variants, start=1):
-        eval_split = evaluate_split(state, variant["team_a"], variant["team_b"], match.venue)
-        why = None
-        if idx != 1:
-            why = _why_text(base_eval, eval_split)
-        db.add(
-            TeamVariant(
-                match_id=match_id,
-                variant_no=idx,
-                is_recommended=idx == 1,
-                teams_json={"A": variant["team_a"], "B": variant["team_b"]},
-                why_text=why,
-            )
-        )
-    db.commit()
+@bp.get("/jobs/<int:job_id>")
+def generate_job(match_id: int, job_id: int):
+    user = require_user()
+    db = get_db()
+    if not (is_admin(user) or _is_organizer(db, match_id, user.tg_id)):
+        return err("forbidden", 403)
+    job = db.query(Job).filter_by(id=job_id, kind="generate_teams").one_or_none()
+    if job is None or job.params_json["match_id"] != match_id:
+        return err("job_not_found", 404)
     return ok(
         {
-            "variants": [
-                {
-                    "variant_no": idx + 1,
-                    "is_recommended": idx == 0,
-                    "teams": variants[idx],
-                    "why_text": None if idx == 0 else db.query(TeamVariant)
-                    .filter_by(match_id=match_id, variant_no=idx + 1)
-                    .one()
-                    .why_text,
-                }
-                for idx in range(len(variants))
-            ]
+            "job_id": job.id,
+            "status": job.status,
+            "progress": job.progress,
+            "error": job.error,
+            **(job.result_json or {}),
         }
     )
 
@@ -213,6 +408,7 @@ def select(match_id: int):
         current.current_teams_json = teams_json
         current.is_custom = False
         current.why_now_worse_text = None
+    invalidate_checkpoints(db, match)
     db.commit()
     return ok()
 
@@ -256,8 +452,11 @@ def set_custom(match_id: int):
     save_state(db, match.context_id, state)
 
     current = db.query(TeamCurrent).filter_by(match_id=match_id).one_or_none()
+    # The guest cap and the top-k set depend on who plays, so each split is scored on a context of its own
+    # roster; the why-text describes the custom one.
+    ctx = build_split_context(state, teams["A"] + teams["B"], match.venue)
     base_eval = evaluate_split(state, variant.teams_json["A"], variant.teams_json["B"], match.venue)
-    custom_eval = evaluate_split(state, teams["A"], teams["B"], match.venue)
+    custom_eval = evaluate_split(state, teams["A"], teams["B"], match.venue, ctx=ctx)
     why_text = _build_custom_reason(base_eval, custom_eval, member_rows, user_rows, teams, current, state)
     preserved_names = {}
     if current:
@@ -279,10 +478,78 @@ def set_custom(match_id: int):
             why_now_worse_text=why_text,
         )
         db.add(current)
+    invalidate_checkpoints(db, match)
     db.commit()
     return ok({"why_text": why_text})
 
 
+@bp.post("/swaps")
+def swaps(match_id: int):
+    user = require_user()
+    db = get_db()
+    match = db.query(Match).filter_by(id=match_id).one_or_none()
+    if match is None:
+        return err("match_not_found", 404)
+    if not (is_admin(user) or _is_organizer(db, match_id, user.tg_id)):
+        return err("forbidden", 403)
+    data = request.get_json(silent=True) or {}
+    try:
+        top_n = min(max(int(data.get("top_n", 3)), 1), MAX_SWAP_SUGGESTIONS)
+    except (TypeError, ValueError):
+        return err("invalid_payload", 400)
+    if data.get("teams"):
+        teams = _normalize_team_payload(data)
+        if teams is None:
+            return err("invalid_payload", 400)
+    else:
+        current = db.query(TeamCurrent).filter_by(match_id=match_id).one_or_none()
+        if current:
+            source = current.current_teams_json
+        else:
+            recommended = (
+                db.query(TeamVariant)
+                .filter_by(match_id=match_id, is_recommended=True)
+                .order_by(TeamVariant.variant_no.asc())
+                .first()
+            )
+            source = recommended.teams_json if recommended else {}
+        teams = {"A": [str(p) for p in source.get("A", [])], "B": [str(p) for p in source.get("B", [])]}
+    if not teams["A"] or not teams["B"]:
+        return err("teams_not_found", 404)
+
+    variants = db.query(TeamVariant).filter_by(match_id=match_id).all()
+    other_splits = [
+        {"team_a": [str(p) for p in v.teams_json.get("A", [])], "team_b": [str(p) for p in v.teams_json.get("B", [])]}
+        for v in variants
+    ]
+    state = load_state(db, match.context_id)
+    for name in teams["A"] + teams["B"]:
+        state.ensure_player(name, match.venue, state.config.global_start_rating, False)
+    suggestions = suggest_quick_swaps(
+        state,
+        {"team_a": teams["A"], "team_b": teams["B"]},
+        other_splits,
+        match.venue,
+        top_n=top_n,
+    )
+    return ok(
+        {
+            "swaps": [
+                {
+                    "swap": list(item["swap"]),
+                    "teams": {"A": item["team_a"], "B": item["team_b"]},
+                    "d_hat": item["d_hat"],
+                    "score": item["score"],
+                    "score_delta": item["score_delta"],
+                    "abs_diff_delta": item["abs_diff_delta"],
+                    "comp_delta": item["comp_delta"],
+                }
+                for item in suggestions
+            ]
+        }
+    )
+
+
 @bp.post("/revert")
 def revert(match_id: int):
     user = require_user()
@@ -305,5 +572,6 @@ def revert(match_id: int):
     current.current_teams_json = variant.teams_json
     current.is_custom = False
     current.why_now_worse_text = None
+    invalidate_checkpoints(db, match)
     db.commit()
     return ok()
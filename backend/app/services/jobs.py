@@ -0,0 +1,134 @@
+import logging
+from datetime import datetime
+from typing import Callable
+
+from sqlalchemy import or_
+
+from ..models import Job
+
+ACTIVE = ("queued", "running")
+
+logger = logging.getLogger(__name__)
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class JobError(Exception):
+    # Expected failures; the message is the error code stored on the job.
+    pass
+
+
+def enqueue(db, kind: str, context_id: int, params: dict | None = None) -> Job:
+    # The same work for a context that is still queued or running is shared instead of queued twice.
+    active = (
+        db.query(Job)
+        .filter(Job.kind == kind, Job.context_id == context_id, Job.status.in_(ACTIVE))
+        .order_by(Job.id.asc())
+        .all()
+    )
+    for job in active:
+        if job.params_json == params:
+            return job
+    job = Job(
+        kind=kind,
+        context_id=context_id,
+        status="queued",
+        progress=0.0,
+        cursor=0,
+        cancel_requested=False,
+        params_json=params,
+    )
+    db.add(job)
+    db.commit()
+    return job
+
+
+def job_payload(job: Job) -> dict:
+    return {
+        "job_id": job.id,
+        "kind": job.kind,
+        "context_id": job.context_id,
+        "status": job.status,
+        "progress": job.progress,
+        "error": job.error,
+        "result": job.result_json,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+    }
+
+
+def request_cancel(db, job: Job) -> None:
+    # A queued job is cancelled right away; a running one stops at its next checkpoint.
+    if job.status == "queued":
+        job.status = "cancelled"
+        job.finished_at = datetime.utcnow()
+    elif job.status == "running":
+        job.cancel_requested = True
+    db.commit()
+
+
+def claim_next(db) -> Job | None:
+    # The conditional update makes the claim safe when more than one worker polls the table.
+    while True:
+        now = datetime.utcnow()
+        job_id = (
+            db.query(Job.id)
+            .filter(Job.status == "queued", or_(Job.run_after.is_(None), Job.run_after <= now))
+            .order_by(Job.id.asc())
+            .limit(1)
+            .scalar()
+        )
+        if job_id is None:
+            return None
+        claimed = (
+            db.query(Job)
+            .filter_by(id=job_id, status="queued")
+            .update({"status": "running", "started_at": now, "updated_at": now}, synchronize_session=False)
+        )
+        db.commit()
+        if claimed:
+            return db.query(Job).filter_by(id=job_id).one()
+
+
+def requeue_interrupted(db) -> int:
+    # Jobs left running by a worker that died are picked up again and resume from their cursor.
+    count = db.query(Job).filter_by(status="running").update({"status": "queued"}, synchronize_session=False)
+    db.commit()
+    return count
+
+
+def checkpoint(db, job: Job, cursor: int, total: int) -> None:
+    # Commits the work done so far together with the job's cursor, then honours a pending cancel.
+    job.cursor = cursor
+    job.progress = round(cursor / total, 3) if total else 1.0
+    job.updated_at = datetime.utcnow()
+    db.commit()
+    if db.query(Job.cancel_requested).filter_by(id=job.id).scalar():
+        raise JobCancelled()
+
+
+def run_job(db, job: Job, handler: Callable | None) -> None:
+    # handler(db, job) does the work, calling checkpoint() as it goes, and returns the job result.
+    try:
+        if handler is None:
+            raise LookupError(f"unknown job kind {job.kind}")
+        result = handler(db, job)
+    except JobCancelled:
+        job.status = "cancelled"
+    except JobError as exc:
+        db.rollback()
+        job.status = "failed"
+        job.error = str(exc)
+    except Exception as exc:
+        logger.exception("job %s (%s) failed", job.id, job.kind)
+        db.rollback()
+        job.status = "failed"
+        job.error = "unknown_job_kind" if isinstance(exc, LookupError) else "internal_error"
+    else:
+        job.status = "done"
+        job.progress = 1.0
+        job.result_json = result
+    job.updated_at = job.finished_at = datetime.utcnow()
+    db.commit()
@@ -1,4 +1,5 @@
 from datetime import datetime
+import hashlib
 
 from team_model.team_model import ExpandedFeedback, Match as TeamMatch, QuickFeedback
 from team_model.team_model import MatchEvent as TeamMatchEvent
@@ -214,6 +215,11 @@ def build_feedback(db, match_id: int) -> tuple[QuickFeedback | None, ExpandedFee
     return quick, expanded
 
 
+def feedback_digest(db, match_id: int) -> str:
+    # Hash of the parsed feedback the model actually sees; answers build_feedback ignores do not change it.
+    return hashlib.sha1(repr(build_feedback(db, match_id)).encode("utf-8")).hexdigest()
+
+
 def finish_segment(db, match_id: int, is_butt_game: bool | None = None) -> None:
     segment = get_active_segment(db, match_id)
     if segment:
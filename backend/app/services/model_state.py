@@ -5,6 +5,16 @@ from team_model.team_model import Config as TeamConfig
 from team_model.team_model import ModelState as TeamModelState
 
 from ..models import ModelState
+from . import team_cache
+
+
+class StateConflict(Exception):
+    # The saved state changed after this session loaded it; the caller's changes were built on an old version.
+    pass
+
+
+def _loaded_versions(db) -> dict:
+    return db.info.setdefault("model_state_versions", {})
 
 
 def load_state(db, context_id: int) -> TeamModelState:
@@ -14,12 +24,42 @@ def load_state(db, context_id: int) -> TeamModelState:
         record = ModelState(context_id=context_id, state_blob=pickle.dumps(state), updated_at=datetime.utcnow())
         db.add(record)
         db.commit()
-        return state
-    return pickle.loads(record.state_blob)
+    else:
+        state = pickle.loads(record.state_blob)
+    _loaded_versions(db)[context_id] = record.updated_at
+    team_cache.remember_config(context_id, team_cache.version_token(record.updated_at), state.config)
+    return state
 
 
-def save_state(db, context_id: int, state: TeamModelState) -> None:
-    record = db.query(ModelState).filter_by(context_id=context_id).one()
-    record.state_blob = pickle.dumps(state)
-    record.updated_at = datetime.utcnow()
+def save_state(db, context_id: int, state: TeamModelState, expected_version: datetime | None = None) -> None:
+    # Writes only over the version this session loaded (or `expected_version`, an updated_at value), so a
+    # save built on an older state raises StateConflict instead of dropping what was saved in between.
+    expected = expected_version or _loaded_versions(db).pop(context_id, None)
+    updated_at = datetime.utcnow()
+    query = db.query(ModelState).filter(ModelState.context_id == context_id)
+    if expected is not None:
+        query = query.filter(ModelState.updated_at == expected)
+    saved = query.update({"state_blob": pickle.dumps(state), "updated_at": updated_at}, synchronize_session=False)
+    if not saved:
+        db.rollback()
+        raise StateConflict(f"model state of context {context_id} changed since it was loaded")
     db.commit()
+    team_cache.invalidate(context_id)
+    team_cache.remember_config(context_id, team_cache.version_token(updated_at), state.config)
+
+
+def state_version(db, context_id: int) -> str | None:
+    # Reads only the timestamp column; every save_state bumps it.
+    row = db.query(ModelState.updated_at).filter_by(context_id=context_id).one_or_none()
+    return team_cache.version_token(row[0]) if row else None
+
+
+def ensure_players(state: TeamModelState, participants: list[str], venue: str) -> bool:
+    # Returns True when the state changed and has to be saved.
+    changed = False
+    for name in participants:
+        player = state.players.get(name)
+        if player is None or venue not in player.venue_ratings:
+            changed = True
+        state.ensure_player(name, venue, state.config.global_start_rating, False)
+    return changed
@@ -0,0 +1,183 @@
+from typing import Callable
+
+from sqlalchemy import func, select
+
+from team_model.team_model import ChangeJournal
+from team_model.team_model import Config as TeamConfig
+from team_model.team_model import ModelState as TeamModelState
+from team_model.team_model import update_from_match_with_breakdown
+
+from ..models import InteractionLog, Job, Match, ModelCheckpoint, RatingLog
+from ..routes.feedback import log_interaction_changes, log_interaction_diffs
+from ..routes.teams import run_generate_job
+from .jobs import ACTIVE, JobCancelled, checkpoint
+from .match import build_feedback, build_team_model_match
+from .model_state import StateConflict, load_state, save_state
+from .recompute import pending_match_ids
+from .replay import (
+    apply_match,
+    finished_match_ids,
+    latest_checkpoint,
+    replay_context,
+    store_checkpoint,
+    store_match_archive,
+)
+
+# A feedback recompute that loses the race to another save replays again on the newer state this often.
+RECOMPUTE_ATTEMPTS = 3
+
+
+def _apply_match(db, context_id: int, state: TeamModelState, match_id: int) -> None:
+    team_match = build_team_model_match(db, match_id)
+    quick_feedback, expanded_feedback = build_feedback(db, match_id)
+    journal = ChangeJournal()
+    update_from_match_with_breakdown(
+        state,
+        team_match,
+        quick_feedback=quick_feedback,
+        expanded_feedback=expanded_feedback,
+        journal=journal,
+    )
+    store_match_archive(db, state, match_id, journal)
+
+
+def _log_ratings(db, context_id: int, state: TeamModelState, match_id: int) -> None:
+    apply_match(db, state, match_id)
+
+
+def _log_interactions(db, context_id: int, state: TeamModelState, match_id: int) -> None:
+    # The journal keeps the result's changes apart from what the feedback added, so both sources are
+    # logged from a single update.
+    team_match = build_team_model_match(db, match_id)
+    quick_feedback, expanded_feedback = build_feedback(db, match_id)
+    journal = ChangeJournal()
+    update_from_match_with_breakdown(
+        state,
+        team_match,
+        quick_feedback=quick_feedback,
+        expanded_feedback=expanded_feedback,
+        journal=journal,
+    )
+    log_interaction_changes(db, context_id, journal.interaction_changes("match"), match_id=match_id, source="match")
+    log_interaction_changes(db, context_id, journal.interaction_changes("feedback"), match_id=match_id, source="feedback")
+
+
+LOG_REBUILDS = {RatingLog: "rebuild_rating_logs", InteractionLog: "rebuild_interaction_logs"}
+
+
+def _in_context(model, context_id: int):
+    if model is RatingLog:
+        return RatingLog.match_id.in_(select(Match.id).where(Match.context_id == context_id))
+    return InteractionLog.context_id == context_id
+
+
+def published(db, query, model):
+    # A log rebuild writes its new generation above the job's watermark and drops the old one only when it
+    # finishes, so readers keep seeing the old generation until then.
+    staged = (
+        db.query(Job.context_id, Job.watermark)
+        .filter(Job.kind == LOG_REBUILDS[model], Job.status.in_(ACTIVE), Job.watermark.isnot(None))
+        .all()
+    )
+    for context_id, watermark in staged:
+        query = query.filter(~(_in_context(model, context_id) & (model.id > watermark)))
+    return query
+
+
+def _staged_logs(db, model, job: Job, match_ids: list[int]):
+    return db.query(model).filter(_in_context(model, job.context_id), model.id > job.watermark, model.match_id.in_(match_ids))
+
+
+def _replay_job(db, job: Job, step: Callable, redo: Callable | None = None) -> tuple[TeamModelState, int]:
+    # Walks the finished history one match at a time and commits after each, together with a replay
+    # checkpoint and the job cursor. A resumed job restarts from the newest checkpoint before its cursor.
+    context_id = job.context_id
+    match_ids = finished_match_ids(db, context_id)
+    state, start = latest_checkpoint(db, context_id, match_ids, job.cursor) if job.cursor else (None, 0)
+    if state is None:
+        state = TeamModelState.empty(TeamConfig())
+    if redo is not None:
+        redo(match_ids[start:])
+    db.query(ModelCheckpoint).filter(
+        ModelCheckpoint.context_id == context_id, ModelCheckpoint.position >= start
+    ).delete(synchronize_session=False)
+    checkpoint(db, job, start, len(match_ids))
+    for position in range(start, len(match_ids)):
+        step(db, context_id, state, match_ids[position])
+        store_checkpoint(db, context_id, match_ids, position, state)
+        checkpoint(db, job, position + 1, len(match_ids))
+    return state, len(match_ids)
+
+
+def rebuild_state(db, job: Job) -> dict:
+    # Every match is replayed with its feedback, as finish_match and feedback recomputes apply it, so the
+    # rebuilt state and its checkpoints match theirs (the old synchronous rebuild dropped all feedback).
+    # Loading first makes the final save fail with StateConflict, rather than drop a match finished meanwhile.
+    load_state(db, job.context_id)
+    state, count = _replay_job(db, job, _apply_match)
+    save_state(db, job.context_id, state)
+    return {"matches": count}
+
+
+def recompute_feedback(db, job: Job) -> dict:
+    # One replay from the earliest match that got feedback. The interaction logs and the state are committed
+    # together; a conflicting save (a match finished meanwhile) rolls both back and replays again.
+    match_ids = pending_match_ids(db, job)
+    for attempt in range(1, RECOMPUTE_ATTEMPTS + 1):
+        affected = [match_id for match_id in finished_match_ids(db, job.context_id) if match_id in match_ids]
+        first = affected[0] if affected else None
+        prev_state = load_state(db, job.context_id)
+        state, count = replay_context(db, job.context_id, first)
+        log_interaction_diffs(db, job.context_id, prev_state, state, match_id=first, source="feedback")
+        try:
+            save_state(db, job.context_id, state)
+        except StateConflict:
+            if attempt == RECOMPUTE_ATTEMPTS:
+                raise
+            continue
+        return {"matches": count}
+
+
+def _rebuild_logs(db, job: Job, step: Callable, model) -> dict:
+    # The old logs stay in place while the new generation is written; finishing swaps them in the same
+    # commit that marks the job done, and a cancelled or failed run deletes what it wrote.
+    if job.watermark is None:
+        job.watermark = db.query(func.max(model.id)).scalar() or 0
+    written = finished_match_ids(db, job.context_id)
+
+    def redo(match_ids: list[int]) -> None:
+        # A resumed run first drops what it wrote for the matches it is about to replay again.
+        _staged_logs(db, model, job, match_ids).delete(synchronize_session=False)
+
+    try:
+        _, count = _replay_job(db, job, step, redo)
+    except JobCancelled:
+        _staged_logs(db, model, job, written).delete(synchronize_session=False)
+        db.commit()
+        raise
+    except Exception:
+        db.rollback()
+        _staged_logs(db, model, job, written).delete(synchronize_session=False)
+        db.commit()
+        raise
+    db.query(model).filter(_in_context(model, job.context_id), model.id <= job.watermark).delete(
+        synchronize_session=False
+    )
+    return {"matches": count}
+
+
+def rebuild_rating_logs(db, job: Job) -> dict:
+    return _rebuild_logs(db, job, _log_ratings, RatingLog)
+
+
+def rebuild_interaction_logs(db, job: Job) -> dict:
+    return _rebuild_logs(db, job, _log_interactions, InteractionLog)
+
+
+HANDLERS = {
+    "rebuild_state": rebuild_state,
+    "rebuild_rating_logs": rebuild_rating_logs,
+    "rebuild_interaction_logs": rebuild_interaction_logs,
+    "recompute_feedback": recompute_feedback,
+    "generate_teams": run_generate_job,
+}
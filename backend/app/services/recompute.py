@@ -0,0 +1,113 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+
+from ..models import Job, RecomputeStat
+from .jobs import ACTIVE
+
+KIND = "recompute_feedback"
+
+
+def request_recompute(db, context_id: int, match_id: int, delay: float) -> int:
+    # Feedback for a context is collected into one queued job that the worker holds back until `delay` seconds
+    # after the first request, then replays once for the union of matches. Returns the job id, which is the
+    # feedback version recompute_progress() reports once it is applied. A job the worker has claimed is not
+    # extended, since its run may already have read the feedback; the request starts the next job instead.
+    while True:
+        job = (
+            db.query(Job)
+            .filter_by(kind=KIND, context_id=context_id, status="queued")
+            .order_by(Job.id.desc())
+            .first()
+        )
+        now = datetime.utcnow()
+        if job is None:
+            job = Job(
+                kind=KIND,
+                context_id=context_id,
+                status="queued",
+                progress=0.0,
+                cursor=0,
+                cancel_requested=False,
+                params_json={"match_ids": [match_id]},
+                run_after=now + timedelta(seconds=delay),
+            )
+            db.add(job)
+            db.commit()
+            return job.id
+        match_ids = sorted(set(job.params_json["match_ids"]) | {match_id})
+        # updated_at guards against another request extending the same job in between.
+        extended = (
+            db.query(Job)
+            .filter_by(id=job.id, status="queued", updated_at=job.updated_at)
+            .update({"params_json": {"match_ids": match_ids}, "updated_at": now}, synchronize_session=False)
+        )
+        db.commit()
+        if extended:
+            return job.id
+
+
+def skip_recompute(db, context_id: int) -> int:
+    # Counts a feedback submission that left the model inputs unchanged; returns the latest feedback version,
+    # which already covers it.
+    while True:
+        counted = (
+            db.query(RecomputeStat)
+            .filter_by(context_id=context_id)
+            .update({"skipped": RecomputeStat.skipped + 1}, synchronize_session=False)
+        )
+        if not counted:
+            db.add(RecomputeStat(context_id=context_id, skipped=1))
+        try:
+            db.commit()
+        except IntegrityError:
+            # Another request created the row first; count on it instead.
+            db.rollback()
+            continue
+        return latest_version(db, context_id)
+
+
+def pending_match_ids(db, job: Job) -> set[int]:
+    # The job's own matches plus those of recomputes that failed or were cancelled since the last applied
+    # one, so the next run makes up for them.
+    applied = _latest(db, job.context_id, "done")
+    failed = (
+        db.query(Job.params_json)
+        .filter(
+            Job.kind == KIND,
+            Job.context_id == job.context_id,
+            Job.status.in_(("failed", "cancelled")),
+            Job.id > applied,
+            Job.id < job.id,
+        )
+        .all()
+    )
+    match_ids = set(job.params_json["match_ids"])
+    for (params,) in failed:
+        match_ids.update(params["match_ids"])
+    return match_ids
+
+
+def _latest(db, context_id: int, *statuses: str) -> int:
+    query = db.query(func.max(Job.id)).filter(Job.kind == KIND, Job.context_id == context_id)
+    if statuses:
+        query = query.filter(Job.status.in_(statuses))
+    return query.scalar() or 0
+
+
+def latest_version(db, context_id: int) -> int:
+    return _latest(db, context_id)
+
+
+def recompute_progress(db, context_id: int) -> dict:
+    # Versions are job ids and recomputes replay in id order, so every version up to applied_version is in
+    # the saved state. A failed recompute is not retried on its own; the next feedback request picks it up.
+    applied = _latest(db, context_id, "done")
+    return {
+        "requested_version": latest_version(db, context_id),
+        "applied_version": applied,
+        "pending": _latest(db, context_id, *ACTIVE) > 0,
+        "failed": _latest(db, context_id, "failed") > applied,
+        "skipped": db.query(RecomputeStat.skipped).filter_by(context_id=context_id).scalar() or 0,
+    }
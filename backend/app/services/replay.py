@@ -0,0 +1,168 @@
+import hashlib
+import pickle
+import zlib
+
+from team_model.team_model import ChangeJournal
+from team_model.team_model import Config as TeamConfig
+from team_model.team_model import ModelState as TeamModelState
+from team_model.team_model import update_from_match_with_breakdown
+from team_model.team_model.types import GLOBAL_KEY
+
+from ..models import InteractionArchive, Match, ModelCheckpoint, RatingLog
+from .match import build_feedback, build_team_model_match
+
+
+def finished_match_ids(db, context_id: int) -> list[int]:
+    rows = (
+        db.query(Match.id)
+        .filter_by(context_id=context_id, status="finished")
+        .order_by(Match.created_at.asc())
+        .all()
+    )
+    return [row[0] for row in rows]
+
+
+def history_hash(match_ids: list[int]) -> str:
+    return hashlib.sha1(",".join(str(match_id) for match_id in match_ids).encode("utf-8")).hexdigest()
+
+
+def latest_checkpoint(db, context_id: int, match_ids: list[int], before: int) -> tuple[TeamModelState | None, int]:
+    # A checkpoint holds the state right after its match; it is only usable while the finished-match
+    # history up to that match is unchanged.
+    rows = (
+        db.query(ModelCheckpoint.id, ModelCheckpoint.match_id, ModelCheckpoint.position, ModelCheckpoint.history_hash)
+        .filter(ModelCheckpoint.context_id == context_id, ModelCheckpoint.position < before)
+        .order_by(ModelCheckpoint.position.desc())
+        .all()
+    )
+    for row_id, match_id, position, digest in rows:
+        if match_ids[position] == match_id and digest == history_hash(match_ids[: position + 1]):
+            blob = db.query(ModelCheckpoint.state_blob).filter_by(id=row_id).scalar()
+            return pickle.loads(zlib.decompress(blob)), position + 1
+    return None, 0
+
+
+def store_checkpoint(db, context_id: int, match_ids: list[int], position: int, state: TeamModelState) -> None:
+    db.add(
+        ModelCheckpoint(
+            context_id=context_id,
+            match_id=match_ids[position],
+            position=position,
+            history_hash=history_hash(match_ids[: position + 1]),
+            state_blob=zlib.compress(pickle.dumps(state)),
+        )
+    )
+
+
+def archive_interactions(db, context_id: int, archived: dict, match_id: int | None = None) -> None:
+    # `archived` maps (kind, venue, key) to the last value of a pair a compaction removed.
+    for (kind, venue, key), value in archived.items():
+        player_a, player_b = sorted(key) if kind == "synergy" else key
+        db.add(
+            InteractionArchive(
+                context_id=context_id,
+                match_id=match_id,
+                venue=venue,
+                kind=kind,
+                player_a=player_a,
+                player_b=player_b,
+                value=value,
+            )
+        )
+
+
+def store_match_archive(db, state: TeamModelState, match_id: int, journal: ChangeJournal) -> None:
+    # What the match's online compaction removed replaces the match's earlier rows, so replays do not
+    # archive a pair twice or keep one a changed history no longer drops.
+    if not state.config.interaction_compact_online:
+        return
+    context_id = db.query(Match.context_id).filter_by(id=match_id).scalar()
+    db.query(InteractionArchive).filter_by(context_id=context_id, match_id=match_id).delete(synchronize_session=False)
+    archive_interactions(db, context_id, journal.archived, match_id)
+
+
+def apply_match(db, state: TeamModelState, match_id: int) -> ChangeJournal:
+    # Applies one finished match with its feedback and writes its rating logs and archived pairs. The
+    # returned journal also holds the match's interaction changes for callers that log them.
+    team_match = build_team_model_match(db, match_id)
+    quick, expanded = build_feedback(db, match_id)
+    journal = ChangeJournal()
+    deltas, breakdown = update_from_match_with_breakdown(
+        state, team_match, quick_feedback=quick, expanded_feedback=expanded, journal=journal
+    )
+    store_match_archive(db, state, match_id, journal)
+    venue = team_match.venue
+    goals: dict[str, int] = {}
+    assists: dict[str, int] = {}
+    for ev in team_match.events:
+        if ev.event_type == "goal":
+            goals[ev.player] = goals.get(ev.player, 0) + 1
+        elif ev.event_type == "assist":
+            assists[ev.player] = assists.get(ev.player, 0) + 1
+    for player_id, delta in deltas.items():
+        pre_global, post_global = journal.ratings[(player_id, GLOBAL_KEY)]
+        pre_venue, post_venue = journal.ratings[(player_id, venue)]
+        db.add(
+            RatingLog(
+                match_id=match_id,
+                player_id=player_id,
+                venue=venue,
+                delta=delta,
+                pre_global=pre_global,
+                post_global=post_global,
+                pre_venue=pre_venue,
+                post_venue=post_venue,
+                goals=goals.get(player_id, 0),
+                assists=assists.get(player_id, 0),
+                details_json=breakdown.get(player_id),
+            )
+        )
+    return journal
+
+
+def replay_context(db, context_id: int, from_match_id: int | None = None) -> tuple[TeamModelState, int]:
+    # Replays finished matches from `from_match_id` (or from the start) forward, resuming from the newest
+    # valid checkpoint before it. Rating logs and checkpoints are rewritten for the replayed matches only.
+    # Returns the final state and the number of replayed matches.
+    match_ids = finished_match_ids(db, context_id)
+    start = match_ids.index(from_match_id) if from_match_id in match_ids else 0
+    state, start = latest_checkpoint(db, context_id, match_ids, start) if start else (None, 0)
+    if state is None:
+        state = TeamModelState.empty(TeamConfig())
+    replayed = match_ids[start:]
+    if replayed:
+        db.query(RatingLog).filter(RatingLog.match_id.in_(replayed)).delete(synchronize_session=False)
+    db.query(ModelCheckpoint).filter(
+        ModelCheckpoint.context_id == context_id, ModelCheckpoint.position >= start
+    ).delete(synchronize_session=False)
+    for position, match_id in enumerate(replayed, start=start):
+        apply_match(db, state, match_id)
+        store_checkpoint(db, context_id, match_ids, position, state)
+    return state, len(replayed)
+
+
+def context_history(db, context_id: int) -> list[tuple]:
+    # The finished history as team_model inputs, (match, quick feedback, expanded feedback), oldest first.
+    return [
+        (build_team_model_match(db, match_id), *build_feedback(db, match_id))
+        for match_id in finished_match_ids(db, context_id)
+    ]
+
+
+def invalidate_checkpoints(db, match: Match | None = None, context_id: int | None = None) -> None:
+    # Call before changing a finished match's inputs (teams, events, segments, members): checkpoints from
+    # that match on no longer describe its history. Without a match, the whole context (or every context)
+    # is dropped.
+    query = db.query(ModelCheckpoint)
+    if match is None:
+        if context_id is not None:
+            query = query.filter(ModelCheckpoint.context_id == context_id)
+        query.delete(synchronize_session=False)
+        return
+    if match.status != "finished":
+        return
+    match_ids = finished_match_ids(db, match.context_id)
+    position = match_ids.index(match.id) if match.id in match_ids else 0
+    query.filter(
+        ModelCheckpoint.context_id == match.context_id, ModelCheckpoint.position >= position
+    ).delete(synchronize_session=False)
@@ -0,0 +1,91 @@
+import hashlib
+from collections import OrderedDict
+from dataclasses import asdict
+from datetime import datetime
+from threading import Lock
+from typing import Callable
+
+MAX_ENTRIES = 256
+
+_entries: OrderedDict[tuple, object] = OrderedDict()
+# Context -> (version, config hash) of the newest state loaded; older versions are not worth caching for.
+_config_hashes: dict[int, tuple[str, str]] = {}
+# Context -> (version, dense interaction view) teamgen slices its split tables from; one per context.
+_matrices: dict[int, tuple[str, object]] = {}
+_lock = Lock()
+
+
+def version_token(updated_at: datetime | None) -> str | None:
+    return updated_at.isoformat() if updated_at else None
+
+
+def config_hash(cfg) -> str:
+    return hashlib.sha1(repr(sorted(asdict(cfg).items())).encode("utf-8")).hexdigest()
+
+
+def remember_config(context_id: int, version: str | None, cfg) -> None:
+    if version is None:
+        return
+    with _lock:
+        current = _config_hashes.get(context_id)
+        # Tokens are ISO timestamps, so a request still holding an older state cannot push the newer one out.
+        if current is not None and current[0] > version:
+            return
+        _config_hashes[context_id] = (version, config_hash(cfg))
+        if current is not None and current[0] != version:
+            for key in [key for key in _entries if key[0] == context_id]:
+                del _entries[key]
+
+
+def cache_key(context_id: int, version: str | None, venue: str, participants: list[str], *options) -> tuple | None:
+    # The config lives inside the pickled state, so its hash is only known once that version has been loaded.
+    with _lock:
+        current = _config_hashes.get(context_id)
+    if current is None or current[0] != version:
+        return None
+    cfg_hash = current[1]
+    return (context_id, version, cfg_hash, venue, tuple(sorted(participants)), options)
+
+
+def get_cached(key: tuple | None):
+    if key is None:
+        return None
+    with _lock:
+        value = _entries.get(key)
+        if value is not None:
+            _entries.move_to_end(key)
+        return value
+
+
+def put_cached(key: tuple | None, value) -> None:
+    if key is None:
+        return
+    with _lock:
+        _entries[key] = value
+        _entries.move_to_end(key)
+        while len(_entries) > MAX_ENTRIES:
+            _entries.popitem(last=False)
+
+
+def cached_matrix(context_id: int, version: str | None, build: Callable[[], object]):
+    # The view only depends on the state's interactions, so every roster and venue of a version shares it.
+    if version is None:
+        return build()
+    with _lock:
+        current = _matrices.get(context_id)
+    if current is not None and current[0] == version:
+        return current[1]
+    matrix = build()
+    with _lock:
+        current = _matrices.get(context_id)
+        if current is None or current[0] < version:
+            _matrices[context_id] = (version, matrix)
+    return matrix
+
+
+def invalidate(context_id: int) -> None:
+    with _lock:
+        for key in [key for key in _entries if key[0] == context_id]:
+            del _entries[key]
+        _config_hashes.pop(context_id, None)
+        _matrices.pop(context_id, None)
@@ -0,0 +1,57 @@
+import argparse
+
+from team_model.team_model import Config as TeamConfig
+from team_model.team_model.sweep import SWEEP_RANGES, format_table, grid_configs, load_history, random_configs, run_sweep
+
+from .config import Config
+from .db import SessionLocal, get_db
+from .services.replay import context_history
+
+
+def _grid_arg(text: str) -> tuple[str, list[float]]:
+    name, _, values = text.partition("=")
+    if name not in TeamConfig.__dataclass_fields__ or not values:
+        raise argparse.ArgumentTypeError(f"expected FIELD=V1,V2,... with a team model Config field, got {text!r}")
+    try:
+        return name, [float(value) for value in values.split(",")]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"values must be numbers: {text!r}") from None
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Rank team model Config variants by how well d_hat predicts past results.")
+    parser.add_argument("--context", type=int, default=Config.DEFAULT_CONTEXT_ID)
+    variants = parser.add_mutually_exclusive_group(required=True)
+    variants.add_argument("--grid", action="append", type=_grid_arg, metavar="FIELD=V1,V2", help="repeat per field")
+    variants.add_argument("--random", type=int, metavar="N", help="sample N configs within SWEEP_RANGES")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=Config.SWEEP_WORKERS, help="replay processes (SWEEP_WORKERS)")
+    parser.add_argument("--top", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    db = get_db()
+    try:
+        history = load_history(context_history(db, args.context))
+    finally:
+        SessionLocal.remove()
+    if not history:
+        print(f"context {args.context} has no finished matches")
+        return 1
+
+    base = TeamConfig()
+    if args.grid:
+        values = dict(args.grid)
+        configs = grid_configs(base, values)
+    else:
+        values = SWEEP_RANGES
+        configs = random_configs(base, args.random, seed=args.seed)
+    ranked = run_sweep(history, [base, *configs], workers=args.workers)
+    rank = next(idx for idx, (cfg, _) in enumerate(ranked, start=1) if cfg is base)
+    mae = ranked[rank - 1][1]["mae"]
+    print(f"{len(history)} matches, {len(ranked)} configs; default Config ranks {rank} (mae {mae:.3f})")
+    print(format_table(ranked, list(values), args.top))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
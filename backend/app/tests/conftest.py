@@ -0,0 +1,44 @@
+import importlib
+import os
+import pkgutil
+import sys
+
+import pytest
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.compiler import compiles
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+try:
+    importlib.import_module("team_model.team_model")
+except ModuleNotFoundError:
+    # pytest puts backend/team_model on the path for the model's own tests, so `team_model` is the model
+    # package itself. The app imports it as team_model.team_model; alias the same modules under that name.
+    import team_model
+
+    for info in pkgutil.iter_modules(team_model.__path__):
+        importlib.import_module(f"team_model.{info.name}")
+    for name, module in list(sys.modules.items()):
+        if name == "team_model" or name.startswith("team_model."):
+            sys.modules.setdefault("team_model." + name, module)
+
+
+@compiles(JSONB, "sqlite")
+def _jsonb_on_sqlite(element, compiler, **kw):
+    # The app targets Postgres; the seeded SQLite copy stores the same documents as JSON.
+    return "JSON"
+
+
+@pytest.fixture()
+def seeded():
+    # The demo data from app.seed in the app's own session, on the in-memory database.
+    from app.db import SessionLocal, engine
+    from app.models import Base
+    from app.seed import seed
+
+    Base.metadata.create_all(engine)
+    seed()
+    session = SessionLocal()
+    yield session
+    SessionLocal.remove()
+    Base.metadata.drop_all(engine)
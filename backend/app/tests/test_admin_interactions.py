@@ -0,0 +1,27 @@
+import json
+from urllib.parse import urlencode
+
+from flask import Flask
+
+from app.config import Config
+from app.routes import admin
+from app.services.model_state import load_state
+
+HEADERS = {"X-Telegram-InitData": urlencode({"user": json.dumps({"id": 1, "first_name": "Admin"})})}
+
+
+def test_top_lists_who_dominates_the_player(seeded, monkeypatch):
+    monkeypatch.setattr(Config, "DEV_AUTH_BYPASS", True)
+    monkeypatch.setattr(Config, "ADMIN_TG_ID", 1)
+    app = Flask(__name__)
+    app.register_blueprint(admin.bp, url_prefix="/api/admin")
+    client = app.test_client()
+    domination = load_state(seeded, 1).interactions.domination["__global__"]
+    victim = max({dominated for _, dominated in domination}, key=lambda name: sum(b == name for _, b in domination))
+    incoming = {a: value for (a, b), value in domination.items() if b == victim and value > 0}
+
+    url = f"/api/admin/interactions/{victim}/top?venue=__global__&k=50"
+    body = client.get(f"{url}&kind=dominated_by", headers=HEADERS).get_json()
+    assert incoming and {row["player"]: row["value"] for row in body["positive"]} == incoming
+    outgoing = client.get(f"{url}&kind=domination", headers=HEADERS).get_json()
+    assert {row["player"] for row in outgoing["positive"]} == {b for (a, b), v in domination.items() if a == victim and v > 0}
@@ -0,0 +1,185 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.models import Feedback, InteractionLog, Job, RatingLog
+from app.services import jobs, rebuild
+from app.services.match import build_team_model_match
+from app.services.model_state import load_state
+from app.services.replay import finished_match_ids, replay_context
+from team_model.team_model import Config as TeamConfig
+from team_model.team_model import ModelState as TeamModelState
+from team_model.team_model import update_from_match
+
+
+@pytest.fixture()
+def db():
+    engine = create_engine("sqlite://")
+    Job.__table__.create(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+def _steps(total: int, seen: list, stop_at: int | None = None):
+    def handler(db, job):
+        for step in range(job.cursor, total):
+            seen.append(step)
+            if step == stop_at:
+                raise KeyboardInterrupt
+            jobs.checkpoint(db, job, step + 1, total)
+        return {"steps": total}
+
+    return handler
+
+
+def test_enqueue_shares_active_job_and_runs_to_done(db):
+    job = jobs.enqueue(db, "rebuild_state", 1)
+    assert jobs.enqueue(db, "rebuild_state", 1).id == job.id
+    assert jobs.enqueue(db, "rebuild_state", 2).id != job.id
+    claimed = jobs.claim_next(db)
+    assert claimed.id == job.id and claimed.status == "running"
+    seen = []
+    jobs.run_job(db, claimed, _steps(4, seen))
+    assert seen == [0, 1, 2, 3]
+    assert jobs.job_payload(claimed) | {"created_at": None, "finished_at": None} == {
+        "job_id": job.id,
+        "kind": "rebuild_state",
+        "context_id": 1,
+        "status": "done",
+        "progress": 1.0,
+        "error": None,
+        "result": {"steps": 4},
+        "created_at": None,
+        "finished_at": None,
+    }
+    assert jobs.enqueue(db, "rebuild_state", 1).id != job.id
+
+
+def test_cancel_stops_running_job_at_next_checkpoint(db):
+    job = jobs.enqueue(db, "rebuild_rating_logs", 1)
+    queued = jobs.enqueue(db, "rebuild_interaction_logs", 1)
+    jobs.request_cancel(db, queued)
+    assert queued.status == "cancelled"
+    claimed = jobs.claim_next(db)
+    seen = []
+
+    def handler(db, job):
+        jobs.checkpoint(db, job, 1, 4)
+        db.query(Job).filter_by(id=job.id).update({"cancel_requested": True})
+        db.commit()
+        seen.append("cancel")
+        jobs.checkpoint(db, job, 2, 4)
+        seen.append("unreachable")
+
+    jobs.run_job(db, claimed, handler)
+    assert claimed.id == job.id
+    assert seen == ["cancel"]
+    assert (claimed.status, claimed.cursor, claimed.progress) == ("cancelled", 2, 0.5)
+    assert jobs.claim_next(db) is None
+
+
+def test_interrupted_job_resumes_from_cursor(db):
+    jobs.enqueue(db, "rebuild_state", 1)
+    job = jobs.claim_next(db)
+    seen = []
+    with pytest.raises(KeyboardInterrupt):
+        jobs.run_job(db, job, _steps(5, seen, stop_at=2))
+    assert jobs.requeue_interrupted(db) == 1
+    job = jobs.claim_next(db)
+    jobs.run_job(db, job, _steps(5, seen))
+    assert seen == [0, 1, 2, 2, 3, 4]
+    assert job.status == "done"
+
+
+def test_unknown_kind_fails(db):
+    jobs.enqueue(db, "nope", 1)
+    job = jobs.claim_next(db)
+    jobs.run_job(db, job, None)
+    assert (job.status, job.error) == ("failed", "unknown_job_kind")
+
+
+def _rating_rows(db) -> list[tuple]:
+    query = rebuild.published(db, db.query(RatingLog), RatingLog)
+    return sorted((log.match_id, log.player_id, log.venue, log.pre_global, log.post_global) for log in query)
+
+
+def _rebuild(db, kind: str, interrupt_at: int | None = None, cancel_at: int | None = None, monkeypatch=None):
+    jobs.enqueue(db, kind, 1)
+    job = jobs.claim_next(db)
+    if interrupt_at or cancel_at:
+        calls = []
+        apply_match = rebuild.apply_match
+
+        def counting(db, state, match_id):
+            calls.append(match_id)
+            if len(calls) == interrupt_at:
+                raise KeyboardInterrupt
+            if len(calls) == cancel_at:
+                db.query(Job).filter_by(id=job.id).update({"cancel_requested": True})
+            return apply_match(db, state, match_id)
+
+        monkeypatch.setattr(rebuild, "apply_match", counting)
+    jobs.run_job(db, job, rebuild.HANDLERS[kind])
+    monkeypatch and monkeypatch.undo()
+    return job
+
+
+def test_cancelled_log_rebuild_keeps_previous_logs(seeded, monkeypatch):
+    done = _rebuild(seeded, "rebuild_rating_logs")
+    assert done.status == "done" and done.result_json == {"matches": 7}
+    expected = _rating_rows(seeded)
+    assert len(expected) == seeded.query(RatingLog).count() > 0
+
+    cancelled = _rebuild(seeded, "rebuild_rating_logs", cancel_at=3, monkeypatch=monkeypatch)
+    assert (cancelled.status, cancelled.cursor) == ("cancelled", 3)
+    assert _rating_rows(seeded) == expected
+    assert seeded.query(RatingLog).count() == len(expected)
+
+
+def test_interrupted_log_rebuild_resumes_behind_old_logs(seeded, monkeypatch):
+    _rebuild(seeded, "rebuild_rating_logs")
+    expected = _rating_rows(seeded)
+    with pytest.raises(KeyboardInterrupt):
+        _rebuild(seeded, "rebuild_rating_logs", interrupt_at=4, monkeypatch=monkeypatch)
+    seeded.rollback()
+    # The three matches written so far stay hidden behind the old generation.
+    assert seeded.query(RatingLog).count() > len(expected)
+    assert _rating_rows(seeded) == expected
+
+    assert jobs.requeue_interrupted(seeded) == 1
+    job = jobs.claim_next(seeded)
+    assert job.cursor == 3
+    jobs.run_job(seeded, job, rebuild.HANDLERS[job.kind])
+    assert job.status == "done"
+    assert _rating_rows(seeded) == expected
+    assert seeded.query(RatingLog).count() == len(expected)
+
+
+def test_interaction_and_state_rebuilds_run_to_done(seeded):
+    first = _rebuild(seeded, "rebuild_interaction_logs")
+    count = seeded.query(InteractionLog).count()
+    second = _rebuild(seeded, "rebuild_interaction_logs")
+    assert first.status == second.status == "done"
+    assert seeded.query(InteractionLog).count() == count > 0
+    assert _rebuild(seeded, "rebuild_state").result_json == {"matches": 7}
+
+
+def test_state_rebuild_replays_feedback(seeded):
+    # Unlike the synchronous rebuild it replaced, the job replays each match with its feedback, so it
+    # reproduces the state feedback recomputes and finished matches leave behind.
+    match_id = finished_match_ids(seeded, 1)[-1]
+    team_a = build_team_model_match(seeded, match_id).team_a
+    answers = {"best": team_a[0], "expanded_pairs": {"syn_team_a": team_a[0], "syn_team_b": team_a[1]}}
+    seeded.add(Feedback(match_id=match_id, tg_id=int(team_a[0]), mode_18plus=False, answers_json=answers))
+    seeded.commit()
+    without_feedback = TeamModelState.empty(TeamConfig())
+    for finished in finished_match_ids(seeded, 1):
+        update_from_match(without_feedback, build_team_model_match(seeded, finished))
+
+    jobs.enqueue(seeded, "rebuild_state", 1)
+    job = jobs.claim_next(seeded)
+    jobs.run_job(seeded, job, rebuild.HANDLERS[job.kind])
+    rebuilt = load_state(seeded, 1)
+    assert rebuilt.interactions == replay_context(seeded, 1)[0].interactions
+    assert rebuilt.interactions != without_feedback.interactions
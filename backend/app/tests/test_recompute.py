@@ -0,0 +1,147 @@
+import json
+from datetime import datetime, timedelta
+from urllib.parse import urlencode
+
+import pytest
+from flask import Flask
+
+from app.config import Config
+from app.models import Job, Match, ModelState
+from app.routes import feedback
+from app.services import jobs, rebuild, recompute
+from app.services.model_state import StateConflict, load_state, save_state
+from app.services.replay import finished_match_ids
+
+
+def _due(db, job_id: int) -> None:
+    # Closes the collection window instead of sleeping through it.
+    db.query(Job).filter_by(id=job_id).update({"run_after": datetime.utcnow() - timedelta(seconds=1)})
+    db.commit()
+
+
+def _run_next(db) -> Job:
+    job = jobs.claim_next(db)
+    jobs.run_job(db, job, rebuild.HANDLERS[job.kind])
+    return job
+
+
+def _checkpointed(db) -> list[int]:
+    # A full rebuild leaves a checkpoint per match, so recomputes replay only from the affected one.
+    jobs.enqueue(db, "rebuild_state", 1)
+    assert _run_next(db).status == "done"
+    return finished_match_ids(db, 1)
+
+
+def test_burst_of_requests_is_one_persisted_recompute(seeded):
+    first, second, third = _checkpointed(seeded)[-3:]
+    versions = {recompute.request_recompute(seeded, 1, match_id, 30) for match_id in (third, second, third, first)}
+    assert len(versions) == 1
+    version = versions.pop()
+    assert recompute.request_recompute(seeded, 2, first, 30) != version
+    job = seeded.query(Job).filter_by(id=version).one()
+    assert job.params_json == {"match_ids": sorted([first, second, third])}
+    assert recompute.recompute_progress(seeded, 1) == {
+        "requested_version": version,
+        "applied_version": 0,
+        "pending": True,
+        "failed": False,
+        "skipped": 0,
+    }
+    # Held back until the window closes.
+    assert jobs.claim_next(seeded) is None
+
+    _due(seeded, version)
+    done = _run_next(seeded)
+    assert (done.id, done.status, done.result_json) == (version, "done", {"matches": 3})
+    assert recompute.recompute_progress(seeded, 1)["applied_version"] == version
+
+
+def test_claimed_recompute_is_not_extended(seeded):
+    match_id = finished_match_ids(seeded, 1)[-1]
+    version = recompute.request_recompute(seeded, 1, match_id, 0)
+    _due(seeded, version)
+    claimed = jobs.claim_next(seeded)
+    later = recompute.request_recompute(seeded, 1, match_id, 0)
+    assert later > claimed.id
+    jobs.run_job(seeded, claimed, rebuild.HANDLERS[claimed.kind])
+    assert recompute.recompute_progress(seeded, 1)["pending"] is True
+
+
+def test_failed_recompute_is_made_up_by_the_next(seeded, monkeypatch):
+    match_ids = _checkpointed(seeded)
+    failed = recompute.request_recompute(seeded, 1, match_ids[2], 0)
+    _due(seeded, failed)
+
+    def broken(*args):
+        raise RuntimeError("db down")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(rebuild, "replay_context", broken)
+        assert _run_next(seeded).status == "failed"
+    assert recompute.recompute_progress(seeded, 1)["failed"] is True
+
+    version = recompute.request_recompute(seeded, 1, match_ids[-1], 0)
+    job = seeded.query(Job).filter_by(id=version).one()
+    assert recompute.pending_match_ids(seeded, job) == {match_ids[2], match_ids[-1]}
+    _due(seeded, version)
+    assert _run_next(seeded).result_json == {"matches": len(match_ids) - 2}
+    assert recompute.recompute_progress(seeded, 1) == {
+        "requested_version": version,
+        "applied_version": version,
+        "pending": False,
+        "failed": False,
+        "skipped": 0,
+    }
+
+
+def test_save_over_a_newer_state_conflicts(seeded):
+    state = load_state(seeded, 1)
+    saved = seeded.query(ModelState).filter_by(context_id=1).one()
+    blob = saved.state_blob
+    # Another writer (a finished match) saves in between.
+    seeded.query(ModelState).filter_by(context_id=1).update({"updated_at": datetime.utcnow() + timedelta(seconds=1)})
+    seeded.commit()
+    with pytest.raises(StateConflict):
+        save_state(seeded, 1, state)
+    assert seeded.query(ModelState.state_blob).filter_by(context_id=1).scalar() == blob
+
+
+def test_recompute_replays_again_after_a_conflicting_save(seeded, monkeypatch):
+    match_id = _checkpointed(seeded)[-1]
+    version = recompute.request_recompute(seeded, 1, match_id, 0)
+    _due(seeded, version)
+    calls = []
+    replay_context = rebuild.replay_context
+
+    def racing(db, context_id, from_match_id):
+        calls.append(from_match_id)
+        if len(calls) == 1:
+            # Stands in for finish_match saving while the first replay runs.
+            db.query(ModelState).filter_by(context_id=context_id).update({"updated_at": datetime.utcnow()})
+        return replay_context(db, context_id, from_match_id)
+
+    monkeypatch.setattr(rebuild, "replay_context", racing)
+    job = _run_next(seeded)
+    assert calls == [match_id, match_id]
+    assert (job.status, job.result_json) == ("done", {"matches": 1})
+
+
+def test_resubmitted_feedback_is_counted_instead_of_queued(seeded, monkeypatch):
+    monkeypatch.setattr(Config, "DEV_AUTH_BYPASS", True)
+    match_id = finished_match_ids(seeded, 1)[-1]
+    seeded.query(Match).filter_by(id=match_id).update({"finished_at": datetime.utcnow()})
+    seeded.commit()
+    app = Flask(__name__)
+    app.register_blueprint(feedback.bp, url_prefix="/api/matches/<int:match_id>")
+    client = app.test_client()
+    headers = {"X-Telegram-InitData": urlencode({"user": json.dumps({"id": 1, "first_name": "Admin"})})}
+    url = f"/api/matches/{match_id}/feedback"
+    body = {"answers_json": {"best": "2", "worst": "3"}}
+
+    first = client.post(url, json=body, headers=headers).get_json()
+    assert "recompute_skipped" not in first
+    second = client.post(url, json=body, headers=headers).get_json()
+    assert second == {"ok": True, "recompute_version": first["recompute_version"], "recompute_skipped": True}
+    assert seeded.query(Job).filter_by(kind=recompute.KIND).count() == 1
+    status = client.get(f"{url}/recompute", headers=headers).get_json()
+    assert (status["requested_version"], status["skipped"]) == (first["recompute_version"], 1)
@@ -0,0 +1,71 @@
+import importlib.util
+import pathlib
+
+from team_model import Config
+
+BASE_DIR = pathlib.Path(__file__).resolve().parents[2]
+CACHE_PATH = BASE_DIR / "app" / "services" / "team_cache.py"
+spec = importlib.util.spec_from_file_location("app_team_cache", CACHE_PATH)
+team_cache = importlib.util.module_from_spec(spec)
+assert spec.loader is not None
+spec.loader.exec_module(team_cache)
+
+
+def test_key_needs_known_config_and_ignores_roster_order():
+    assert team_cache.cache_key(1, "v1", "hall", ["b", "a"], "generate") is None
+    team_cache.remember_config(1, "v1", Config())
+    key = team_cache.cache_key(1, "v1", "hall", ["b", "a"], "generate")
+    assert key == team_cache.cache_key(1, "v1", "hall", ["a", "b"], "generate")
+    assert key != team_cache.cache_key(1, "v1", "hall", ["a", "b"], "generate", 3)
+    team_cache.remember_config(1, "v2", Config(teamgen_top_penalty=10.0))
+    assert key[:3] != team_cache.cache_key(1, "v2", "hall", ["a", "b"], "generate")[:3]
+
+
+def test_lru_eviction_and_invalidation(monkeypatch):
+    monkeypatch.setattr(team_cache, "MAX_ENTRIES", 2)
+    team_cache.remember_config(2, "v1", Config())
+    keys = [team_cache.cache_key(2, "v1", "hall", [str(i)]) for i in range(3)]
+    team_cache.put_cached(keys[0], "first")
+    team_cache.put_cached(keys[1], "second")
+    assert team_cache.get_cached(keys[0]) == "first"
+    team_cache.put_cached(keys[2], "third")
+    assert team_cache.get_cached(keys[1]) is None
+    assert team_cache.get_cached(keys[0]) == "first"
+
+    team_cache.invalidate(2)
+    assert team_cache.get_cached(keys[0]) is None
+    assert team_cache.cache_key(2, "v1", "hall", ["0"]) is None
+
+
+def test_only_the_newest_version_per_context_is_kept():
+    team_cache.remember_config(3, "2026-01-02T00:00:00", Config())
+    key = team_cache.cache_key(3, "2026-01-02T00:00:00", "hall", ["a"])
+    team_cache.put_cached(key, "old")
+    # A request still holding the previous state does not push the newer one out.
+    team_cache.remember_config(3, "2026-01-01T00:00:00", Config())
+    assert team_cache.cache_key(3, "2026-01-01T00:00:00", "hall", ["a"]) is None
+    assert team_cache.get_cached(key) == "old"
+
+    team_cache.remember_config(3, "2026-01-03T00:00:00", Config())
+    assert team_cache.cache_key(3, "2026-01-02T00:00:00", "hall", ["a"]) is None
+    assert team_cache.get_cached(key) is None
+    assert team_cache._config_hashes[3][0] == "2026-01-03T00:00:00"
+
+
+def test_matrix_is_built_once_per_state_version():
+    built = []
+
+    def build():
+        built.append(object())
+        return built[-1]
+
+    first = team_cache.cached_matrix(4, "2026-01-02T00:00:00", build)
+    assert team_cache.cached_matrix(4, "2026-01-02T00:00:00", build) is first
+    # A request still holding an older state gets its own view without replacing the newer one.
+    assert team_cache.cached_matrix(4, "2026-01-01T00:00:00", build) is not first
+    assert team_cache.cached_matrix(4, "2026-01-02T00:00:00", build) is first
+    newer = team_cache.cached_matrix(4, "2026-01-03T00:00:00", build)
+    assert newer is not first and team_cache.cached_matrix(4, "2026-01-03T00:00:00", build) is newer
+    team_cache.invalidate(4)
+    assert team_cache.cached_matrix(4, "2026-01-03T00:00:00", build) is not newer
+    assert len(built) == 4
@@ -0,0 +1,60 @@
+import json
+from urllib.parse import urlencode
+
+from flask import Flask
+
+from app.config import Config
+from app.models import Job, Match, MatchMember, TeamVariant
+from app.routes import teams
+from app.worker import run_pending
+
+HEADERS = {"X-Telegram-InitData": urlencode({"user": json.dumps({"id": 1, "first_name": "Admin"})})}
+
+
+def _client(monkeypatch):
+    monkeypatch.setattr(Config, "DEV_AUTH_BYPASS", True)
+    monkeypatch.setattr(Config, "ADMIN_TG_ID", 1)
+    app = Flask(__name__)
+    app.register_blueprint(teams.bp, url_prefix="/api/matches/<int:match_id>/teams")
+    return app.test_client()
+
+
+def _match_with_players(db) -> tuple[int, list[str]]:
+    match = db.query(Match).filter_by(context_id=1).order_by(Match.id.desc()).first()
+    members = db.query(MatchMember.tg_id).filter(MatchMember.match_id == match.id, MatchMember.role.in_(["player", "organizer"]))
+    return match.id, [str(tg_id) for (tg_id,) in members]
+
+
+def test_async_generation_is_queued_for_the_worker(seeded, monkeypatch):
+    client = _client(monkeypatch)
+    match_id, _ = _match_with_players(seeded)
+    url = f"/api/matches/{match_id}/teams"
+
+    queued = client.post(f"{url}/generate", json={"async": True}, headers=HEADERS)
+    assert queued.status_code == 202
+    job_id = queued.get_json()["job_id"]
+    assert client.post(f"{url}/generate", json={"async": True}, headers=HEADERS).get_json()["job_id"] == job_id
+    assert client.get(f"{url}/jobs/{job_id}", headers=HEADERS).get_json()["status"] == "queued"
+    other = client.post(f"{url}/generate", json={"async": True, "solver": "exhaustive"}, headers=HEADERS)
+    assert other.get_json()["job_id"] != job_id
+
+    assert run_pending(seeded) == 2
+    done = client.get(f"{url}/jobs/{job_id}", headers=HEADERS).get_json()
+    assert (done["status"], done["progress"], done["error"]) == ("done", 1.0, None)
+    assert [variant["variant_no"] for variant in done["variants"]] == [1, 2, 3]
+    assert seeded.query(TeamVariant).filter_by(match_id=match_id).count() == 3
+    assert client.get(f"/api/matches/{match_id + 1}/teams/jobs/{job_id}", headers=HEADERS).status_code == 404
+
+
+def test_expected_generation_failures_are_stored_on_the_job(seeded, monkeypatch):
+    client = _client(monkeypatch)
+    match_id, players = _match_with_players(seeded)
+    url = f"/api/matches/{match_id}/teams"
+    pair = players[:2]
+    body = {"async": True, "constraints": {"together": [pair], "apart": [pair]}}
+
+    job_id = client.post(f"{url}/generate", json=body, headers=HEADERS).get_json()["job_id"]
+    run_pending(seeded)
+    job = seeded.query(Job).filter_by(id=job_id).one()
+    assert (job.status, job.error) == ("failed", "conflicting_constraints")
+    assert client.get(f"{url}/jobs/{job_id}", headers=HEADERS).get_json()["error"] == "conflicting_constraints"
@@ -0,0 +1,9 @@
+from app.routes.teams import _constraints_payload
+
+
+def test_constraints_payload_rejects_non_list_groups():
+    participants = ["1", "2", "3", "4"]
+    for raw in ({"together": 5}, {"apart": "12"}, {"A": 1}, {"together": [5]}, {"apart": [["1"]]}, {"B": ["9"]}):
+        assert _constraints_payload({"constraints": raw}, participants) is None
+    constraints = _constraints_payload({"constraints": {"together": [[1, 2]], "A": ["3"]}}, participants)
+    assert constraints.together == (("1", "2"),) and constraints.team_a == ("3",)
@@ -0,0 +1,69 @@
+import argparse
+import logging
+import time
+
+from .config import Config
+from .db import SessionLocal, get_db
+from .seed import ensure_schema
+from .services.jobs import claim_next, requeue_interrupted, run_job
+from .services.rebuild import HANDLERS
+
+logger = logging.getLogger(__name__)
+
+
+def run_pending(db) -> int:
+    # Runs queued jobs until none are left; returns how many were run.
+    count = 0
+    while True:
+        job = claim_next(db)
+        if job is None:
+            return count
+        logger.info("job %s (%s) for context %s started", job.id, job.kind, job.context_id)
+        run_job(db, job, HANDLERS.get(job.kind))
+        logger.info("job %s finished: %s", job.id, job.status)
+        count += 1
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Run queued background jobs (admin rebuilds, async team generation).")
+    parser.add_argument("--once", action="store_true", help="run what is queued and exit")
+    parser.add_argument("--poll", type=float, default=Config.JOB_POLL_SECONDS, help="seconds between polls")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    while True:
+        try:
+            ensure_schema()
+            break
+        except Exception:
+            # The web process may be creating the same tables on a fresh database.
+            if args.once:
+                raise
+            logger.exception("schema check failed, retrying")
+            time.sleep(args.poll)
+    db = get_db()
+    try:
+        # A single worker owns the queue, so anything still marked running was cut off by a restart.
+        resumed = requeue_interrupted(db)
+        if resumed:
+            logger.info("resuming %s interrupted job(s)", resumed)
+        while True:
+            try:
+                run_pending(db)
+            except Exception:
+                # A lost DB connection must not end the worker: nothing else would pick up the queue.
+                if args.once:
+                    raise
+                logger.exception("job queue poll failed")
+                db.rollback()
+            if args.once:
+                return 0
+            time.sleep(args.poll)
+    except KeyboardInterrupt:
+        return 0
+    finally:
+        SessionLocal.remove()
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,5 +1,28 @@
 import os
+import subprocess
+import sys
 
 bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
 workers = 1
 timeout = 60
+
+
+# Admin rebuilds are queued in the `jobs` table and run by `python -m app.worker`. The master starts it
+# next to the web workers and stops it on shutdown; set RUN_JOB_WORKER=0 when the worker runs elsewhere.
+_job_worker = None
+
+
+def when_ready(server):
+    global _job_worker
+    if os.getenv("RUN_JOB_WORKER", "1") == "1":
+        _job_worker = subprocess.Popen([sys.executable, "-m", "app.worker"])
+        server.log.info("job worker started (pid %s)", _job_worker.pid)
+
+
+def on_exit(server):
+    if _job_worker is not None and _job_worker.poll() is None:
+        _job_worker.terminate()
+        try:
+            _job_worker.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            _job_worker.kill()
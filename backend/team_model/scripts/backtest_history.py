@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""Backtest d_hat against real results on an exported history dataset (one chronological replay, no DB)."""
+from __future__ import annotations
+
+import argparse
+import json
+import pathlib
+import sys
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from team_model import Config
+from team_model.backtest import backtest, history_from_rows
+from team_model.sweep import load_history
+
+
+def check_budgets(report: dict, max_mae: float | None, budget_replay_ms: float | None) -> list[str]:
+    failures = []
+    if max_mae is not None and report["mae"] > max_mae:
+        failures.append(f"mae {report['mae']:.3f} > {max_mae:.3f}")
+    replay_ms = report["predict_ms"] + report["update_ms"]
+    if budget_replay_ms is not None and replay_ms > budget_replay_ms:
+        failures.append(f"replay {replay_ms:.2f} ms per match > budget {budget_replay_ms:.2f} ms")
+    return failures
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("dataset", type=pathlib.Path, help="JSON rows from `python -m app.export_history`")
+    parser.add_argument("--max-mae", type=float, default=None, help="fail when the MAE is above this")
+    parser.add_argument("--budget-replay-ms", type=float, default=None, help="per-match predict + update budget")
+    args = parser.parse_args(argv)
+
+    cfg = Config()
+    history = load_history(history_from_rows(json.loads(args.dataset.read_text(encoding="utf-8"))), cfg)
+    report = backtest(history, cfg)
+    print(
+        f"{report['matches']} matches  mae {report['mae']:.3f} (draw baseline {report['baseline_mae']:.3f})  "
+        f"scale {report['scale']:.5f}  sign accuracy {report['sign_accuracy']:.2f}"
+    )
+    print(f"replay: predict {report['predict_ms']:.2f} ms + update {report['update_ms']:.2f} ms per match")
+    print(f"{'|d_hat|':>12} {'matches':>8} {'mean d_hat':>11} {'margin':>8} {'fav won':>8} {'draws':>6}")
+    for row in report["calibration"]:
+        high = f"{row['high']:g}" if row["high"] is not None else "inf"
+        print(
+            f"{row['low']:>5g}-{high:<6} {row['matches']:>8} {row['mean_d_hat']:>11.1f} {row['mean_margin']:>8.2f} "
+            f"{row['favourite_won']:>8.2f} {row['draws']:>6.2f}"
+        )
+
+    failures = check_budgets(report, args.max_mae, args.budget_replay_ms)
+    for failure in failures:
+        print(f"BUDGET EXCEEDED: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""Compare dict-backed and matrix-backed interaction storage at league scale."""
+from __future__ import annotations
+
+import argparse
+import pathlib
+import pickle
+import random
+import sys
+import time
+import tracemalloc
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from team_model import Config, ModelState
+from team_model.dense import DenseInteractionState
+from team_model.engine import build_split_context
+from team_model.interactions import add_domination, add_synergy
+from team_model.types import PlayerState
+
+VENUES = ["зал1", "зал2", "улица"]
+
+
+def build_model(size: int, density: float, seed: int = 7) -> tuple[ModelState, list[str]]:
+    rnd = random.Random(seed)
+    model = ModelState.empty(Config())
+    names = [f"P{i:03d}" for i in range(size)]
+    for name in names:
+        rating = rnd.uniform(850.0, 1200.0)
+        model.players[name] = PlayerState(name, rating, {venue: rating for venue in VENUES})
+    for venue in VENUES:
+        for _ in range(int(density * size * (size - 1) / 2)):
+            a, b = rnd.sample(names, 2)
+            add_synergy(model.interactions, venue, a, b, rnd.choice([-1.0, -0.5, 0.5, 1.0]))
+            a, b = rnd.sample(names, 2)
+            add_domination(model.interactions, venue, a, b, rnd.choice([-0.5, 0.5, 1.0]))
+    return model, names
+
+
+def _retained_bytes(build) -> tuple[object, int]:
+    tracemalloc.start()
+    value = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return value, current
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[200, 300])
+    parser.add_argument("--density", type=float, default=0.2)
+    parser.add_argument("--lookups", type=int, default=100_000)
+    parser.add_argument("--roster", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'players':>7} {'storage':<6} {'memory KB':>10} {'pickle KB':>10} {'ns/lookup':>10} {'context ms':>10}")
+    for size in args.sizes:
+        model, names = build_model(size, args.density)
+        blob = pickle.dumps(model.interactions)
+        sparse, sparse_bytes = _retained_bytes(lambda: pickle.loads(blob))
+        dense, dense_bytes = _retained_bytes(lambda: DenseInteractionState.from_sparse(pickle.loads(blob)))
+        rnd = random.Random(1)
+        pairs = [tuple(rnd.sample(names, 2)) for _ in range(args.lookups)]
+        roster = rnd.sample(names, args.roster)
+        for label, interactions, matrix, retained in (("dict", sparse, None, sparse_bytes), ("dense", dense, dense, dense_bytes)):
+            started = time.perf_counter()
+            for a, b in pairs:
+                interactions.get_syn(VENUES[0], a, b)
+                interactions.get_dom(VENUES[0], a, b)
+            lookup_ns = (time.perf_counter() - started) * 1e9 / (2 * len(pairs))
+            started = time.perf_counter()
+            build_split_context(model, roster, VENUES[0], matrix)
+            context_ms = (time.perf_counter() - started) * 1000.0
+            print(
+                f"{size:>7} {label:<6} {retained / 1024:>10.0f} {len(pickle.dumps(interactions)) / 1024:>10.0f} "
+                f"{lookup_ns:>10.0f} {context_ms:>10.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""Benchmark multi-team partition generation for rotation nights."""
+from __future__ import annotations
+
+import pathlib
+import random
+import statistics
+import sys
+import time
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from team_model import Config, ModelState
+from team_model.interactions import add_domination, add_synergy
+from team_model.partition import count_partitions, generate_partitions
+from team_model.types import PlayerState
+
+VENUE = "зал1"
+CASES = [(15, 3), (20, 4), (24, 4), (24, 3)]
+RUNS = 5
+
+
+def build_model(size: int, seed: int = 7) -> tuple[ModelState, list[str]]:
+    rnd = random.Random(seed)
+    model = ModelState.empty(Config())
+    names = [f"P{i:02d}" for i in range(size)]
+    for name in names:
+        rating = rnd.uniform(850.0, 1200.0)
+        model.players[name] = PlayerState(name, rating, {VENUE: rating})
+    for _ in range(size * 3):
+        a, b = rnd.sample(names, 2)
+        add_synergy(model.interactions, VENUE, a, b, rnd.choice([-1.0, -0.5, 0.5, 1.0]))
+        a, b = rnd.sample(names, 2)
+        add_domination(model.interactions, VENUE, a, b, rnd.choice([-0.5, 0.5, 1.0]))
+    return model, names
+
+
+def main() -> None:
+    print(f"{'players':>7} {'teams':>5} {'partitions':>14} {'p50 ms':>8} {'max ms':>8} {'best score':>10}")
+    for size, teams in CASES:
+        model, names = build_model(size)
+        timings = []
+        for _ in range(RUNS):
+            started = time.perf_counter()
+            variants = generate_partitions(model, names, VENUE, teams, top_n=3)
+            timings.append((time.perf_counter() - started) * 1000.0)
+        print(
+            f"{size:>7} {teams:>5} {count_partitions(size, teams):>14} "
+            f"{statistics.median(timings):>8.1f} {max(timings):>8.1f} {variants[0]['score']:>10.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
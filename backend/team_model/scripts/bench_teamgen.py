@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""Benchmark two-team generation, split evaluation and quick swaps on synthetic rosters."""
+from __future__ import annotations
+
+import argparse
+import pathlib
+import random
+import sys
+import time
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from team_model import Config, ModelState
+from team_model.engine import build_split_context
+from team_model.interactions import add_domination, add_synergy
+from team_model.pruning import count_splits
+from team_model.teamgen import evaluate_split, generate_teams, suggest_quick_swaps
+from team_model.types import PlayerState
+
+VENUES = ["зал1", "зал2", "улица"]
+SIZES = [10, 14, 18, 22, 26, 30]
+
+
+def build_state(size: int, density: float, venues: int, seed: int = 7) -> tuple[ModelState, list[str]]:
+    # density is the share of all player pairs that get a synergy and a domination entry per venue.
+    rnd = random.Random(seed)
+    model = ModelState.empty(Config())
+    names = [f"P{i:02d}" for i in range(size)]
+    venue_names = VENUES[: max(1, venues)]
+    for name in names:
+        base = rnd.uniform(850.0, 1200.0)
+        ratings = {venue: base + rnd.uniform(-40.0, 40.0) for venue in venue_names}
+        model.players[name] = PlayerState(
+            name,
+            base,
+            ratings,
+            role_tendencies={"attack": rnd.random(), "defense": rnd.random()},
+        )
+    pairs = int(density * size * (size - 1) / 2)
+    for venue in venue_names:
+        for _ in range(pairs):
+            a, b = rnd.sample(names, 2)
+            add_synergy(model.interactions, venue, a, b, rnd.choice([-1.0, -0.5, 0.5, 1.0]))
+            a, b = rnd.sample(names, 2)
+            add_domination(model.interactions, venue, a, b, rnd.choice([-0.5, 0.5, 1.0]))
+    return model, names
+
+
+def percentile(values: list[float], share: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(share * (len(ordered) - 1))))]
+
+
+def _timed(fn, runs: int) -> list[float]:
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000.0)
+    return timings
+
+
+def run_case(size: int, density: float, venues: int, runs: int, solver: str = "auto", workers: int = 1) -> dict:
+    model, names = build_state(size, density, venues)
+    venue = VENUES[0]
+    rows = {}
+
+    variants = generate_teams(model, names, venue, top_n=3, solver=solver)
+    timings = _timed(lambda: generate_teams(model, names, venue, top_n=3, solver=solver), runs)
+    exhaustive = solver == "exhaustive" or (
+        solver == "auto" and count_splits(size, size // 2) <= model.config.teamgen_exhaustive_max_splits
+    )
+    rows["generate_teams"] = (timings, count_splits(size, size // 2) if exhaustive else None)
+    if workers > 1:
+        # The first call starts the long-lived pool; like the app, only later calls are timed.
+        generate_teams(model, names, venue, top_n=3, solver=solver, workers=workers)
+        timings = _timed(lambda: generate_teams(model, names, venue, top_n=3, solver=solver, workers=workers), runs)
+        rows[f"generate_teams x{workers}"] = (timings, rows["generate_teams"][1])
+
+    ctx = build_split_context(model, names, venue)
+    best = variants[0]
+    timings = _timed(lambda: evaluate_split(model, best["team_a"], best["team_b"], venue, ctx=ctx), runs * 20)
+    rows["evaluate_split"] = (timings, 1)
+
+    timings = _timed(lambda: suggest_quick_swaps(model, best, variants[1:], venue, ctx=ctx), runs)
+    rows["suggest_quick_swaps"] = (timings, len(best["team_a"]) * len(best["team_b"]))
+
+    report = {}
+    for name, (timings, candidates) in rows.items():
+        p50 = percentile(timings, 0.5)
+        report[name] = {
+            "p50_ms": p50,
+            "p95_ms": percentile(timings, 0.95),
+            "candidates_per_s": candidates / (p50 / 1000.0) if candidates and p50 > 0 else None,
+        }
+    return report
+
+
+def check_budgets(results: dict[int, dict], budgets: dict[str, float]) -> list[str]:
+    failures = []
+    for size, report in results.items():
+        for name, budget in budgets.items():
+            p95 = report[name]["p95_ms"]
+            if p95 > budget:
+                failures.append(f"{name} at {size} players: p95 {p95:.1f} ms > budget {budget:.1f} ms")
+    return failures
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    parser.add_argument("--density", type=float, default=0.3)
+    parser.add_argument("--venues", type=int, default=2)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--solver", default="auto")
+    parser.add_argument("--workers", type=int, default=1, help="also time generate_teams on a pool of N processes")
+    parser.add_argument("--budget-generate-ms", type=float, default=None, help="p95 budget for generate_teams")
+    parser.add_argument("--budget-evaluate-ms", type=float, default=None, help="p95 budget for evaluate_split")
+    parser.add_argument("--budget-swaps-ms", type=float, default=None, help="p95 budget for suggest_quick_swaps")
+    args = parser.parse_args(argv)
+
+    budgets = {
+        name: budget
+        for name, budget in (
+            ("generate_teams", args.budget_generate_ms),
+            ("evaluate_split", args.budget_evaluate_ms),
+            ("suggest_quick_swaps", args.budget_swaps_ms),
+        )
+        if budget is not None
+    }
+    print(f"{'players':>7} {'function':<20} {'p50 ms':>9} {'p95 ms':>9} {'cand/s':>12}")
+    results = {}
+    for size in args.sizes:
+        results[size] = run_case(size, args.density, args.venues, args.runs, args.solver, args.workers)
+        for name, row in results[size].items():
+            rate = f"{row['candidates_per_s']:>12.0f}" if row["candidates_per_s"] else f"{'-':>12}"
+            print(f"{size:>7} {name:<20} {row['p50_ms']:>9.2f} {row['p95_ms']:>9.2f} {rate}")
+
+    failures = check_budgets(results, budgets)
+    for failure in failures:
+        print(f"BUDGET EXCEEDED: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,9 +1,12 @@
 from .config import Config
+from .constraints import TeamConstraints
 from .learning import update_from_match, update_from_match_with_breakdown
+from .partition import generate_partitions
 from .teamgen import generate_teams
-from .types import ExpandedFeedback, Match, MatchEvent, ModelState, PlayerState, QuickFeedback, Segment
+from .types import ChangeJournal, ExpandedFeedback, Match, MatchEvent, ModelState, PlayerState, QuickFeedback, Segment
 
 __all__ = [
+    "ChangeJournal",
     "Config",
     "ExpandedFeedback",
     "Match",
@@ -12,6 +15,8 @@ __all__ = [
     "PlayerState",
     "QuickFeedback",
     "Segment",
+    "TeamConstraints",
+    "generate_partitions",
     "generate_teams",
     "update_from_match",
     "update_from_match_with_breakdown",
@@ -0,0 +1,127 @@
+from dataclasses import asdict
+import time
+from typing import List, Sequence, Tuple
+
+from .config import Config
+from .learning import ensure_participants, update_from_match_with_breakdown
+from .sweep import HistoryMatch, score_predictions
+from .teamgen import evaluate_split
+from .types import (
+    AnchorVote,
+    DominationFeedback,
+    ExpandedFeedback,
+    FanResponse,
+    Match,
+    MatchEvent,
+    ModelState,
+    PairwiseComparison,
+    QuickFeedback,
+    RoleFeedback,
+    Segment,
+    SynergyFeedback,
+)
+
+# Upper edges of the |d_hat| buckets, in rating points; the last bucket is open-ended.
+CALIBRATION_EDGES = (25.0, 50.0, 100.0, 200.0)
+
+HistoryItem = Tuple[Match, QuickFeedback | None, ExpandedFeedback | None]
+
+
+def history_to_rows(items: Sequence[HistoryItem]) -> List[dict]:
+    # Plain JSON-ready rows, so a context's history can be exported once and backtested without the DB.
+    rows = []
+    for match, quick, expanded in items:
+        row = asdict(match)
+        row["guests"] = sorted(match.guests)
+        row["quick_feedback"] = asdict(quick) if quick else None
+        row["expanded_feedback"] = asdict(expanded) if expanded else None
+        rows.append(row)
+    return rows
+
+
+def history_from_rows(rows: Sequence[dict]) -> List[HistoryItem]:
+    items = []
+    for row in rows:
+        match = Match(
+            venue=row["venue"],
+            team_a=list(row["team_a"]),
+            team_b=list(row["team_b"]),
+            segments=[Segment(**seg) for seg in row["segments"]],
+            events=[MatchEvent(**event) for event in row.get("events", [])],
+            guests=set(row.get("guests", [])),
+        )
+        quick = row.get("quick_feedback")
+        if quick is not None:
+            quick = QuickFeedback(
+                anchors={name: AnchorVote(**vote) for name, vote in quick["anchors"].items()},
+                pairwise=[PairwiseComparison(**item) for item in quick["pairwise"]],
+                fan_responses=[FanResponse(**item) for item in quick["fan_responses"]],
+            )
+        expanded = row.get("expanded_feedback")
+        if expanded is not None:
+            expanded = ExpandedFeedback(
+                fan_responses=[FanResponse(**item) for item in expanded["fan_responses"]],
+                synergies=[SynergyFeedback(**item) for item in expanded["synergies"]],
+                dominations=[DominationFeedback(**item) for item in expanded["dominations"]],
+                role_impressions=[RoleFeedback(**item) for item in expanded["role_impressions"]],
+            )
+        items.append((match, quick, expanded))
+    return items
+
+
+def calibration(predicted: List[float], actual: List[float], edges: Sequence[float] = CALIBRATION_EDGES) -> List[dict]:
+    # Buckets by predicted imbalance. Goal diffs are turned towards the favoured team, so a calibrated model
+    # shows the margin and the favourite's win share growing bucket by bucket.
+    buckets = [[] for _ in range(len(edges) + 1)]
+    for d_hat, goal_diff in zip(predicted, actual):
+        idx = next((i for i, edge in enumerate(edges) if abs(d_hat) < edge), len(edges))
+        buckets[idx].append((abs(d_hat), goal_diff if d_hat >= 0 else -goal_diff))
+    report = []
+    for idx, bucket in enumerate(buckets):
+        if not bucket:
+            continue
+        margins = [margin for _, margin in bucket]
+        report.append(
+            {
+                "low": edges[idx - 1] if idx else 0.0,
+                "high": edges[idx] if idx < len(edges) else None,
+                "matches": len(bucket),
+                "mean_d_hat": sum(d_hat for d_hat, _ in bucket) / len(bucket),
+                "mean_margin": sum(margins) / len(margins),
+                "favourite_won": sum(1 for margin in margins if margin > 0) / len(margins),
+                "draws": sum(1 for margin in margins if margin == 0) / len(margins),
+            }
+        )
+    return report
+
+
+def backtest(history: List[HistoryMatch], cfg: Config | None = None) -> dict:
+    # One chronological pass over a single state: each match is predicted with evaluate_split as of just
+    # before it, then learned from, so nothing is copied per match.
+    state = ModelState.empty(cfg or Config())
+    predicted = []
+    predict_seconds = update_seconds = 0.0
+    for item in history:
+        match = item.match
+        started = time.perf_counter()
+        ensure_participants(state, match)
+        predicted.append(evaluate_split(state, match.team_a, match.team_b, match.venue)["d_hat"])
+        predicted_at = time.perf_counter()
+        update_from_match_with_breakdown(
+            state,
+            match,
+            quick_feedback=item.quick_feedback,
+            expanded_feedback=item.expanded_feedback,
+        )
+        update_seconds += time.perf_counter() - predicted_at
+        predict_seconds += predicted_at - started
+    actual = [item.goal_diff for item in history]
+    report = score_predictions(predicted, actual)
+    # Always predicting a draw: the error d_hat has to beat.
+    report["baseline_mae"] = sum(abs(goal_diff) for goal_diff in actual) / len(actual) if actual else 0.0
+    report["calibration"] = calibration(predicted, actual)
+    report["predictions"] = predicted
+    count = max(1, len(history))
+    report["predict_ms"] = predict_seconds * 1000 / count
+    report["update_ms"] = update_seconds * 1000 / count
+    return report
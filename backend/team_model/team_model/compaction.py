@@ -0,0 +1,125 @@
+from dataclasses import dataclass, field
+from typing import Iterable
+
+from .config import Config
+from .overlay import OverlayInteractions
+from .types import InteractionState, ModelState
+
+
+@dataclass
+class CompactionReport:
+    decayed: int = 0
+    pruned: int = 0
+    archived: int = 0
+    # Entries removed because a player went inactive, with their values before decay.
+    archive: InteractionState = field(default_factory=InteractionState)
+
+    def archived_entries(self) -> dict[tuple, float]:
+        # (kind, venue, key) -> value, the shape ChangeJournal.archived uses.
+        return {
+            (kind, venue, key): value
+            for kind in ("synergy", "domination")
+            for venue, pairs in getattr(self.archive, kind).items()
+            for key, value in pairs.items()
+        }
+
+    @property
+    def removed(self) -> int:
+        return self.pruned + self.archived
+
+    def as_dict(self) -> dict[str, int]:
+        return {"decayed": self.decayed, "pruned": self.pruned, "archived": self.archived, "removed": self.removed}
+
+
+def note_match(model: ModelState, participants: Iterable[str]) -> None:
+    model.match_count += 1
+    for name in participants:
+        player = model.players.get(name)
+        if player is not None:
+            player.last_match = model.match_count
+
+
+def decay_factor(cfg: Config, matches: int = 0, days: float = 0.0) -> float:
+    factor = cfg.interaction_decay_per_match ** matches
+    if cfg.interaction_half_life_days > 0 and days > 0:
+        factor *= 0.5 ** (days / cfg.interaction_half_life_days)
+    return factor
+
+
+def inactive_players(model: ModelState, inactive_matches: int) -> set[str]:
+    if inactive_matches <= 0:
+        return set()
+    return {name for name, player in model.players.items() if model.match_count - player.last_match >= inactive_matches}
+
+
+def compact_interactions(
+    interactions: InteractionState,
+    factor: float = 1.0,
+    epsilon: float = 0.0,
+    inactive: set[str] | frozenset = frozenset(),
+) -> CompactionReport:
+    if isinstance(interactions, OverlayInteractions):
+        # The overlay applies the pass to base entries as they are read, so there is nothing to count.
+        interactions.compact(factor, epsilon, inactive)
+        return CompactionReport()
+    if not isinstance(interactions, InteractionState):
+        raise TypeError("compaction works on dict-backed interactions")
+    report = CompactionReport()
+    journal = interactions.journal
+    # The pending decay scale is folded in by the same pass.
+    scale = interactions.scale
+    factor *= scale
+    interactions.scale = 1.0
+    tables = (
+        ("synergy", interactions.synergy, report.archive.synergy),
+        ("domination", interactions.domination, report.archive.domination),
+    )
+    for kind, table, archive in tables:
+        for venue in list(table):
+            kept = {}
+            for key, value in table[venue].items():
+                if inactive and any(name in inactive for name in key):
+                    archive.setdefault(venue, {})[key] = value * scale
+                    report.archived += 1
+                    if journal is not None:
+                        journal.record_interaction(kind, venue, key, value * scale, 0.0)
+                    continue
+                before = value * scale
+                if factor != 1.0:
+                    value *= factor
+                    report.decayed += 1
+                pruned = abs(value) < epsilon
+                if journal is not None and (pruned or value != before):
+                    journal.record_interaction(kind, venue, key, before, 0.0 if pruned else value)
+                if pruned:
+                    report.pruned += 1
+                    continue
+                kept[key] = value
+            if kept:
+                table[venue] = kept
+            else:
+                del table[venue]
+    interactions.invalidate_effective()
+    return report
+
+
+def compact_online(model: ModelState) -> CompactionReport | None:
+    # Called once per match: the match's decay goes into the lazy scale, and only every
+    # interaction_compact_every matches does a full pass fold it in, prune and archive.
+    cfg: Config = model.config
+    model.interactions.decay(decay_factor(cfg, matches=1))
+    if model.match_count % max(1, cfg.interaction_compact_every):
+        return None
+    return compact_state(model)
+
+
+def compact_state(model: ModelState, matches: int = 0, days: float = 0.0) -> CompactionReport:
+    # One pass with the model's config: decay for the elapsed matches/days, drop entries under the epsilon
+    # and archive pairs involving players who have not played for interaction_inactive_matches matches.
+    cfg: Config = model.config
+    return compact_interactions(
+        model.interactions,
+        decay_factor(cfg, matches, days),
+        cfg.interaction_prune_epsilon,
+        inactive_players(model, cfg.interaction_inactive_matches),
+    )
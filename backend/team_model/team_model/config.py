@@ -57,7 +57,20 @@ class Config:
     teamgen_top_k: int = 4
     teamgen_top_max_per_team: int = 2
     teamgen_top_penalty: float = 50.0
+    teamgen_exhaustive_max_splits: int = 200_000
+    teamgen_time_budget_ms: float = 200.0
+    teamgen_parallel_min_splits: int = 20_000
 
     auto_synergy_win: float = 0.5
     auto_domination_win: float = 0.3
     auto_synergy_goal_assist: float = 0.4
+
+    # Interaction compaction; the defaults keep every entry forever.
+    interaction_decay_per_match: float = 1.0
+    interaction_half_life_days: float = 0.0
+    interaction_prune_epsilon: float = 0.0
+    interaction_inactive_matches: int = 0
+    interaction_compact_online: bool = False
+    # With online compaction each match only moves the lazy decay scale; every this many matches a full pass
+    # folds it in, prunes and archives.
+    interaction_compact_every: int = 20
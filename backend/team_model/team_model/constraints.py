@@ -0,0 +1,177 @@
+from dataclasses import dataclass
+from typing import Iterator, List, Tuple
+
+import numpy as np
+
+from .engine import CHUNK_SIZE, SplitContext
+
+
+@dataclass(frozen=True)
+class TeamConstraints:
+    together: Tuple[Tuple[str, ...], ...] = ()
+    apart: Tuple[Tuple[str, str], ...] = ()
+    team_a: Tuple[str, ...] = ()
+    team_b: Tuple[str, ...] = ()
+
+    def is_empty(self) -> bool:
+        return not (self.together or self.apart or self.team_a or self.team_b)
+
+    def players(self) -> set[str]:
+        names = {name for group in self.together for name in group}
+        names.update(name for pair in self.apart for name in pair)
+        return names | set(self.team_a) | set(self.team_b)
+
+
+@dataclass(frozen=True)
+class Block:
+    # Players in `first` share a side; players in `second` sit on the other one.
+    first: int
+    first_size: int
+    second: int
+    second_size: int
+
+
+def _find(parent: List[int], idx: int) -> int:
+    while parent[idx] != idx:
+        parent[idx] = parent[parent[idx]]
+        idx = parent[idx]
+    return idx
+
+
+def build_blocks(ctx: SplitContext, constraints: TeamConstraints) -> List[Block]:
+    # Union-find merges "together" groups, then "apart" edges 2-colour the merged groups.
+    # The block holding the anchor (index 0) comes first with the anchor in `first`.
+    unknown = constraints.players() - set(ctx.names)
+    if unknown:
+        raise ValueError(f"unknown_player: {sorted(unknown)[0]}")
+    n = len(ctx.names)
+    parent = list(range(n))
+    groups = [list(group) for group in constraints.together] + [list(constraints.team_a), list(constraints.team_b)]
+    for group in groups:
+        for name in group[1:]:
+            parent[_find(parent, ctx.index[name])] = _find(parent, ctx.index[group[0]])
+
+    edges: dict[int, set[int]] = {}
+    pairs = list(constraints.apart)
+    if constraints.team_a and constraints.team_b:
+        pairs.append((constraints.team_a[0], constraints.team_b[0]))
+    for a, b in pairs:
+        ra, rb = _find(parent, ctx.index[a]), _find(parent, ctx.index[b])
+        if ra == rb:
+            raise ValueError("conflicting_constraints")
+        edges.setdefault(ra, set()).add(rb)
+        edges.setdefault(rb, set()).add(ra)
+
+    colour: dict[int, int] = {}
+    blocks: List[Block] = []
+    for start in range(n):
+        root = _find(parent, start)
+        if root in colour:
+            continue
+        colour[root] = 0
+        stack = [root]
+        members = [root]
+        while stack:
+            node = stack.pop()
+            for other in edges.get(node, ()):
+                if other not in colour:
+                    colour[other] = 1 - colour[node]
+                    stack.append(other)
+                    members.append(other)
+                elif colour[other] == colour[node]:
+                    raise ValueError("conflicting_constraints")
+        masks = [0, 0]
+        sizes = [0, 0]
+        for idx in range(n):
+            root_idx = _find(parent, idx)
+            if root_idx in members:
+                masks[colour[root_idx]] |= 1 << idx
+                sizes[colour[root_idx]] += 1
+        # Players are visited in index order, so the first block holds the anchor in colour 0.
+        blocks.append(Block(masks[0], sizes[0], masks[1], sizes[1]))
+    return blocks
+
+
+def constrained_masks(blocks: List[Block], team_size: int) -> Iterator[np.ndarray]:
+    # Team A masks (anchor side) of exactly team_size players; each non-anchor block is placed one of two ways
+    # and partial assignments that can no longer reach team_size are dropped before expanding further.
+    if not blocks or blocks[0].first_size > team_size:
+        return
+    low = [0] * (len(blocks) + 1)
+    high = [0] * (len(blocks) + 1)
+    for idx in range(len(blocks) - 1, 0, -1):
+        block = blocks[idx]
+        low[idx] = low[idx + 1] + min(block.first_size, block.second_size)
+        high[idx] = high[idx + 1] + max(block.first_size, block.second_size)
+
+    def expand(masks: np.ndarray, sizes: np.ndarray, idx: int) -> Iterator[np.ndarray]:
+        if idx == len(blocks):
+            done = masks[sizes == team_size]
+            if len(done):
+                yield done
+            return
+        if len(masks) > CHUNK_SIZE:
+            for start in range(0, len(masks), CHUNK_SIZE):
+                yield from expand(masks[start : start + CHUNK_SIZE], sizes[start : start + CHUNK_SIZE], idx)
+            return
+        block = blocks[idx]
+        masks = np.concatenate((masks | block.first, masks | block.second))
+        sizes = np.concatenate((sizes + block.first_size, sizes + block.second_size))
+        reachable = (sizes + low[idx + 1] <= team_size) & (sizes + high[idx + 1] >= team_size)
+        if reachable.any():
+            yield from expand(masks[reachable], sizes[reachable], idx + 1)
+
+    yield from expand(np.array([blocks[0].first], dtype=np.int64), np.array([blocks[0].first_size]), 1)
+
+
+def count_constrained(blocks: List[Block], team_size: int) -> int:
+    if not blocks:
+        return 0
+    ways = {blocks[0].first_size: 1}
+    for block in blocks[1:]:
+        grown: dict[int, int] = {}
+        for size, count in ways.items():
+            for extra in (block.first_size, block.second_size):
+                if size + extra <= team_size:
+                    grown[size + extra] = grown.get(size + extra, 0) + count
+        ways = grown
+    return ways.get(team_size, 0)
+
+
+def block_placements(blocks: List[Block], team_size: int, n: int) -> List[Tuple[int, int]]:
+    # (team A, team B) masks for every way to place the constrained blocks; single free players are left to
+    # the search. The anchor block keeps its orientation, and placements that overfill a side are dropped.
+    placements = [(blocks[0].first, blocks[0].second)] if blocks else []
+    for block in blocks[1:]:
+        if block.first_size + block.second_size < 2:
+            continue
+        placements = [
+            (mask_a | side_a, mask_b | side_b)
+            for mask_a, mask_b in placements
+            for side_a, side_b in ((block.first, block.second), (block.second, block.first))
+        ]
+    return [
+        (mask_a, mask_b)
+        for mask_a, mask_b in placements
+        if mask_a.bit_count() <= team_size and mask_b.bit_count() <= n - team_size
+    ]
+
+
+def valid_masks(blocks: List[Block], masks: np.ndarray) -> np.ndarray:
+    keep = np.ones(len(masks), dtype=bool)
+    for idx, block in enumerate(blocks):
+        if block.first_size + block.second_size < 2 and idx > 0:
+            continue
+        placed = masks & (block.first | block.second)
+        keep &= (placed == block.first) | ((placed == block.second) & (idx > 0))
+    return keep
+
+
+def orient(candidate: dict, constraints: TeamConstraints) -> dict:
+    # Splits keep the anchor in team_a; flip them when the fixed sides ask for the other orientation.
+    flip = (constraints.team_a and constraints.team_a[0] not in candidate["team_a"]) or (
+        constraints.team_b and constraints.team_b[0] in candidate["team_a"]
+    )
+    if not flip:
+        return candidate
+    return {**candidate, "team_a": candidate["team_b"], "team_b": candidate["team_a"], "d_hat": -candidate["d_hat"]}
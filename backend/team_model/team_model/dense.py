@@ -0,0 +1,192 @@
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+from .types import GLOBAL_KEY, InteractionState
+
+_MIN_CAPACITY = 16
+
+
+class DenseInteractionState:
+    # A matrix view for teamgen, not a ModelState storage: learning, change journals, overlays and compaction
+    # only work on the dict-backed InteractionState, so a view is built with from_sparse() and passed to
+    # build_split_context(), and rebuilt once the state it came from has moved on.
+    # Same get/add API as InteractionState, but players are interned to indices once and every venue keeps
+    # an n x n synergy array (symmetric) and a domination array (row dominates column). `seen` marks cells
+    # that were ever written, so converting back reproduces the sparse dicts entry for entry.
+
+    def __init__(self) -> None:
+        self.names: List[str] = []
+        self.index: Dict[str, int] = {}
+        self._capacity = 0
+        self._syn: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self._dom: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+
+    def _intern(self, name: str) -> int:
+        idx = self.index.get(name)
+        if idx is not None:
+            return idx
+        idx = len(self.names)
+        self.names.append(name)
+        self.index[name] = idx
+        if idx >= self._capacity:
+            self._grow(max(_MIN_CAPACITY, 2 * self._capacity))
+        return idx
+
+    def _grow(self, capacity: int) -> None:
+        for table in (self._syn, self._dom):
+            for venue, (values, seen) in table.items():
+                table[venue] = (_padded(values, capacity), _padded(seen, capacity))
+        self._capacity = capacity
+
+    def _venue(self, table: Dict[str, Tuple[np.ndarray, np.ndarray]], venue: str) -> Tuple[np.ndarray, np.ndarray]:
+        if venue not in table:
+            table[venue] = (np.zeros((self._capacity, self._capacity)), np.zeros((self._capacity, self._capacity), dtype=bool))
+        return table[venue]
+
+    def get_syn(self, venue: str, player_a: str, player_b: str) -> float:
+        arrays = self._syn.get(venue)
+        i, j = self.index.get(player_a), self.index.get(player_b)
+        if arrays is None or i is None or j is None:
+            return 0.0
+        return arrays[0].item(i, j)
+
+    def add_syn(self, venue: str, player_a: str, player_b: str, value: float) -> None:
+        if player_a == player_b:
+            return
+        i, j = self._intern(player_a), self._intern(player_b)
+        values, seen = self._venue(self._syn, venue)
+        values[i, j] = values[j, i] = values[i, j] + value
+        seen[i, j] = seen[j, i] = True
+
+    def get_dom(self, venue: str, dominator: str, dominated: str) -> float:
+        arrays = self._dom.get(venue)
+        i, j = self.index.get(dominator), self.index.get(dominated)
+        if arrays is None or i is None or j is None:
+            return 0.0
+        return arrays[0].item(i, j)
+
+    def add_dom(self, venue: str, dominator: str, dominated: str, value: float) -> None:
+        if dominator == dominated:
+            return
+        i, j = self._intern(dominator), self._intern(dominated)
+        values, seen = self._venue(self._dom, venue)
+        values[i, j] += value
+        seen[i, j] = True
+
+    def _batch(self, updates: Iterable[Tuple[str, str, float]]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        rows, cols, values = [], [], []
+        for player_a, player_b, value in updates:
+            if player_a != player_b:
+                rows.append(self._intern(player_a))
+                cols.append(self._intern(player_b))
+                values.append(value)
+        return np.array(rows, dtype=np.int64), np.array(cols, dtype=np.int64), np.array(values, dtype=float)
+
+    def add_syn_many(self, venues: Tuple[str, ...], updates: Iterable[Tuple[str, str, float]]) -> None:
+        # np.add.at applies repeated cells in order, so sums match one add_syn call per update.
+        rows, cols, data = self._batch(updates)
+        if not len(rows):
+            return
+        # Both mirrored cells get each update in one interleaved pass, keeping the per-cell order.
+        mirrored = (np.column_stack((rows, cols)).ravel(), np.column_stack((cols, rows)).ravel())
+        data = np.repeat(data, 2)
+        for venue in venues:
+            values, seen = self._venue(self._syn, venue)
+            np.add.at(values, mirrored, data)
+            seen[mirrored] = True
+
+    def add_dom_many(self, venues: Tuple[str, ...], updates: Iterable[Tuple[str, str, float]]) -> None:
+        rows, cols, data = self._batch(updates)
+        if not len(rows):
+            return
+        for venue in venues:
+            values, seen = self._venue(self._dom, venue)
+            np.add.at(values, (rows, cols), data)
+            seen[rows, cols] = True
+
+    def venues(self) -> List[str]:
+        return sorted(set(self._syn) | set(self._dom))
+
+    def combined(self, venue: str, names: List[str], venue_weight: float, global_weight: float) -> Tuple[np.ndarray, np.ndarray]:
+        # Blended venue + global synergy and domination for `names`, in their order (unknown players are zero).
+        known = [self.index.get(name) for name in names]
+        rows = np.array([idx if idx is not None else 0 for idx in known], dtype=np.int64)
+        present = np.array([idx is not None for idx in known], dtype=bool)
+        mask = present[:, None] & present[None, :]
+        result = []
+        for table in (self._syn, self._dom):
+            blended = []
+            for key in (venue, GLOBAL_KEY):
+                arrays = table.get(key)
+                block = arrays[0][np.ix_(rows, rows)] if arrays is not None else np.zeros((len(names), len(names)))
+                blended.append(np.where(mask, block, 0.0))
+            result.append(venue_weight * blended[0] + global_weight * blended[1])
+        return result[0], result[1]
+
+    @classmethod
+    def from_sparse(cls, interactions: InteractionState) -> "DenseInteractionState":
+        dense = cls()
+        names = set()
+        for pairs in interactions.synergy.values():
+            for key in pairs:
+                names.update(key)
+        for pairs in interactions.domination.values():
+            for key in pairs:
+                names.update(key)
+        for name in sorted(names):
+            dense._intern(name)
+        for venue, pairs in interactions.synergy.items():
+            values, seen = dense._venue(dense._syn, venue)
+            for key, value in pairs.items():
+                i, j = (dense.index[name] for name in sorted(key))
+                values[i, j] = values[j, i] = value * interactions.scale
+                seen[i, j] = seen[j, i] = True
+        for venue, pairs in interactions.domination.items():
+            values, seen = dense._venue(dense._dom, venue)
+            for (a, b), value in pairs.items():
+                values[dense.index[a], dense.index[b]] = value * interactions.scale
+                seen[dense.index[a], dense.index[b]] = True
+        return dense
+
+    def to_sparse(self) -> InteractionState:
+        interactions = InteractionState()
+        for venue, (values, seen) in self._syn.items():
+            rows, cols = np.nonzero(np.triu(seen))
+            interactions.synergy[venue] = {
+                frozenset({self.names[i], self.names[j]}): float(values[i, j]) for i, j in zip(rows, cols)
+            }
+        for venue, (values, seen) in self._dom.items():
+            rows, cols = np.nonzero(seen)
+            interactions.domination[venue] = {(self.names[i], self.names[j]): float(values[i, j]) for i, j in zip(rows, cols)}
+        return interactions
+
+    def __getstate__(self) -> dict:
+        # Pickles only the written cells as (row, col, value) columns instead of the padded arrays.
+        def pack(table, upper):
+            packed = {}
+            for venue, (values, seen) in table.items():
+                rows, cols = np.nonzero(np.triu(seen) if upper else seen)
+                packed[venue] = (rows.astype(np.int32), cols.astype(np.int32), values[rows, cols])
+            return packed
+
+        return {"names": list(self.names), "syn": pack(self._syn, True), "dom": pack(self._dom, False)}
+
+    def __setstate__(self, state: dict) -> None:
+        self.__init__()
+        for name in state["names"]:
+            self._intern(name)
+        for venue, (rows, cols, data) in state["syn"].items():
+            values, seen = self._venue(self._syn, venue)
+            values[rows, cols] = values[cols, rows] = data
+            seen[rows, cols] = seen[cols, rows] = True
+        for venue, (rows, cols, data) in state["dom"].items():
+            values, seen = self._venue(self._dom, venue)
+            values[rows, cols] = data
+            seen[rows, cols] = True
+
+
+def _padded(array: np.ndarray, capacity: int) -> np.ndarray:
+    grown = np.zeros((capacity, capacity), dtype=array.dtype)
+    grown[: array.shape[0], : array.shape[1]] = array
+    return grown
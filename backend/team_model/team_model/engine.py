@@ -0,0 +1,253 @@
+from dataclasses import dataclass
+from itertools import combinations, islice
+from typing import Iterator, List, Tuple
+
+import numpy as np
+
+from .config import Config
+from .dense import DenseInteractionState
+from .interactions import _combined_dom, _combined_syn
+from .ratings import effective_rating
+from .types import ModelState
+from .utils import mean
+
+CHUNK_SIZE = 65536
+
+
+@dataclass(frozen=True)
+class SplitContext:
+    # Everything the split scorers need for one (model, roster, venue), built once per request.
+    names: Tuple[str, ...]
+    venue: str
+    rating_map: dict[str, float]
+    index: dict[str, int]
+    ratings: np.ndarray
+    syn: np.ndarray
+    dom: np.ndarray
+    attack: np.ndarray
+    defense: np.ndarray
+    is_top: np.ndarray
+
+    def indices(self, team: List[str]) -> np.ndarray:
+        return np.array([self.index[name] for name in team], dtype=np.int64)
+
+
+def team_rating_map(model: ModelState, participants: List[str], venue: str, cfg: Config) -> dict[str, float]:
+    players = [model.players[name] for name in participants]
+    avg_rating = mean(effective_rating(p, venue, cfg) for p in players)
+    rating_map: dict[str, float] = {}
+    for name in participants:
+        player = model.players[name]
+        rating = effective_rating(player, venue, cfg)
+        rating_map[name] = min(rating, avg_rating) if player.is_guest else rating
+    return rating_map
+
+
+def build_split_context(
+    model: ModelState,
+    participants: List[str],
+    venue: str,
+    matrix: DenseInteractionState | None = None,
+) -> SplitContext:
+    # `matrix` is an optional DenseInteractionState view of model.interactions; the blended tables are then
+    # sliced out of it instead of looked up pair by pair.
+    cfg: Config = model.config
+    rating_map = team_rating_map(model, participants, venue, cfg)
+    names = tuple(sorted(participants))
+    n = len(names)
+    if matrix is not None:
+        weights = (cfg.rating_eff_venue_weight, cfg.rating_eff_global_weight)
+        syn, dom = matrix.combined(venue, list(names), *weights)
+    else:
+        syn = np.zeros((n, n))
+        dom = np.zeros((n, n))
+        for i, a in enumerate(names):
+            for j, b in enumerate(names):
+                if i == j:
+                    continue
+                syn[i, j] = _combined_syn(model.interactions, venue, a, b, cfg)
+                dom[i, j] = _combined_dom(model.interactions, venue, a, b, cfg)
+
+    roles = [model.players[name].role_tendencies for name in names]
+    top_k = max(0, cfg.teamgen_top_k)
+    top_players = {name for name, _ in sorted(rating_map.items(), key=lambda item: item[1], reverse=True)[:top_k]}
+    return SplitContext(
+        names=names,
+        venue=venue,
+        rating_map=rating_map,
+        index={name: idx for idx, name in enumerate(names)},
+        ratings=np.array([rating_map[name] for name in names], dtype=float),
+        syn=syn,
+        dom=dom,
+        attack=np.array([r.get("attack", 0.0) for r in roles], dtype=float),
+        defense=np.array([r.get("defense", 0.0) for r in roles], dtype=float),
+        is_top=np.array([name in top_players for name in names], dtype=bool),
+    )
+
+
+def split_masks(n: int, team_size: int, prefix: Tuple[int, ...] = ()) -> Iterator[np.ndarray]:
+    # Team A always holds index 0 (the alphabetically first player), so every split is enumerated once.
+    # A prefix fixes the next members of team A (ascending), which is how the space is sharded.
+    if n < 2 or team_size < 1 or len(prefix) > team_size - 1:
+        return
+    start = prefix[-1] + 1 if prefix else 1
+    base = 1
+    for idx in prefix:
+        base |= 1 << idx
+    rest = combinations(range(start, n), team_size - 1 - len(prefix))
+    while True:
+        chunk = list(islice(rest, CHUNK_SIZE))
+        if not chunk:
+            return
+        idx = np.array(chunk, dtype=np.int64).reshape(len(chunk), team_size - 1 - len(prefix))
+        yield np.bitwise_or.reduce(np.left_shift(1, idx), axis=1, initial=base)
+
+
+def mask_to_indices(masks: np.ndarray, n: int) -> Tuple[np.ndarray, np.ndarray]:
+    member = (masks[:, None] >> np.arange(n, dtype=np.int64)) & 1 == 1
+    size_a = int(member[0].sum())
+    idx_a = np.nonzero(member)[1].reshape(len(masks), size_a)
+    idx_b = np.nonzero(~member)[1].reshape(len(masks), n - size_a)
+    return idx_a, idx_b
+
+
+def mask_to_names(mask: int, names: Tuple[str, ...]) -> Tuple[List[str], List[str]]:
+    team_a = [name for i, name in enumerate(names) if mask >> i & 1]
+    team_b = [name for i, name in enumerate(names) if not mask >> i & 1]
+    return team_a, team_b
+
+
+def rank_masks(masks: np.ndarray, d_hat: np.ndarray, score: np.ndarray, n: int) -> np.ndarray:
+    # Sort by (score, |d_hat|, team_a). A lexicographically smaller team_a has its lowest differing bit set,
+    # which is the same as a larger bit-reversed mask.
+    bits = (masks[:, None] >> np.arange(n, dtype=np.int64)) & 1
+    reversed_masks = (bits << np.arange(n - 1, -1, -1, dtype=np.int64)).sum(axis=1)
+    return np.lexsort((-reversed_masks, np.abs(d_hat), score))
+
+
+def keep_best(masks: np.ndarray, d_hat: np.ndarray, score: np.ndarray, n: int, keep: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # Ranked prefix of length `keep`; splits tied with the cut-off score stay in until the full sort key decides.
+    if len(masks) > keep:
+        cutoff = np.partition(score, keep - 1)[keep - 1]
+        within = score <= cutoff
+        masks, d_hat, score = masks[within], d_hat[within], score[within]
+    order = rank_masks(masks, d_hat, score, n)[:keep]
+    return masks[order], d_hat[order], score[order]
+
+
+def _ordered_sum(values: np.ndarray, idx: np.ndarray) -> np.ndarray:
+    # Accumulate column by column to keep the float summation order of the scalar code.
+    acc = np.zeros(idx.shape[0])
+    for j in range(idx.shape[1]):
+        acc = acc + values[idx[:, j]]
+    return acc
+
+
+def _pair_sum(matrix: np.ndarray, idx: np.ndarray) -> np.ndarray:
+    acc = np.zeros(idx.shape[0])
+    for i in range(idx.shape[1]):
+        for j in range(i + 1, idx.shape[1]):
+            acc = acc + matrix[idx[:, i], idx[:, j]]
+    return acc
+
+
+def _cross_sum(matrix: np.ndarray, idx_a: np.ndarray, idx_b: np.ndarray) -> np.ndarray:
+    acc = np.zeros(idx_a.shape[0])
+    for i in range(idx_a.shape[1]):
+        for j in range(idx_b.shape[1]):
+            acc = acc + matrix[idx_a[:, i], idx_b[:, j]]
+            acc = acc + matrix[idx_b[:, j], idx_a[:, i]]
+    return acc
+
+
+def score_indices(ctx: SplitContext, idx_a: np.ndarray, idx_b: np.ndarray, cfg: Config) -> dict[str, np.ndarray]:
+    # One row per split; players are summed in the column order of idx_a / idx_b.
+    d_hat = _ordered_sum(ctx.ratings, idx_a) - _ordered_sum(ctx.ratings, idx_b)
+    syn_a = _pair_sum(ctx.syn, idx_a) * cfg.teamgen_synergy_weight
+    syn_b = _pair_sum(ctx.syn, idx_b) * cfg.teamgen_synergy_weight
+    dom = _cross_sum(ctx.dom, idx_a, idx_b) * cfg.teamgen_domination_weight
+    role = (
+        np.abs(_ordered_sum(ctx.attack, idx_a) - _ordered_sum(ctx.attack, idx_b))
+        + np.abs(_ordered_sum(ctx.defense, idx_a) - _ordered_sum(ctx.defense, idx_b))
+    ) * cfg.teamgen_role_weight
+    if max(0, cfg.teamgen_top_k) > 0:
+        top_a = ctx.is_top[idx_a].sum(axis=1)
+        top_b = ctx.is_top[idx_b].sum(axis=1)
+        overflow = np.maximum(0, top_a - cfg.teamgen_top_max_per_team) + np.maximum(0, top_b - cfg.teamgen_top_max_per_team)
+        top = overflow * cfg.teamgen_top_penalty
+    else:
+        top = np.zeros(idx_a.shape[0])
+    score = np.abs(d_hat) + (syn_a + syn_b + dom + role + top)
+    return {"d_hat": d_hat, "score": score, "syn": syn_a + syn_b, "dom": dom, "role": role, "top": top}
+
+
+def score_masks(ctx: SplitContext, masks: np.ndarray, cfg: Config) -> Tuple[np.ndarray, np.ndarray]:
+    idx_a, idx_b = mask_to_indices(masks, len(ctx.names))
+    scored = score_indices(ctx, idx_a, idx_b, cfg)
+    return scored["d_hat"], scored["score"]
+
+
+def split_components(ctx: SplitContext, idx_a: np.ndarray, idx_b: np.ndarray, cfg: Config) -> dict[str, float]:
+    syn = ctx.syn[np.ix_(idx_a, idx_a)].sum() / 2 + ctx.syn[np.ix_(idx_b, idx_b)].sum() / 2
+    dom = ctx.dom[np.ix_(idx_a, idx_b)].sum() + ctx.dom[np.ix_(idx_b, idx_a)].sum()
+    role = abs(ctx.attack[idx_a].sum() - ctx.attack[idx_b].sum()) + abs(
+        ctx.defense[idx_a].sum() - ctx.defense[idx_b].sum()
+    )
+    top = 0.0
+    if max(0, cfg.teamgen_top_k) > 0:
+        overflow = max(0, int(ctx.is_top[idx_a].sum()) - cfg.teamgen_top_max_per_team)
+        overflow += max(0, int(ctx.is_top[idx_b].sum()) - cfg.teamgen_top_max_per_team)
+        top = overflow * cfg.teamgen_top_penalty
+    return {
+        "d_hat": float(ctx.ratings[idx_a].sum() - ctx.ratings[idx_b].sum()),
+        "syn": float(syn * cfg.teamgen_synergy_weight),
+        "dom": float(dom * cfg.teamgen_domination_weight),
+        "role": float(role * cfg.teamgen_role_weight),
+        "top": float(top),
+    }
+
+
+def swap_components(ctx: SplitContext, idx_a: np.ndarray, idx_b: np.ndarray, cfg: Config) -> dict[str, np.ndarray]:
+    # Entry [i, j] describes the split after swapping idx_a[i] with idx_b[j]. Every term is updated from
+    # per-player sums against the base teams, so each swap costs O(1) after an O(n^2) setup.
+    base = split_components(ctx, idx_a, idx_b, cfg)
+    out_a = idx_a[:, None]
+    in_b = idx_b[None, :]
+
+    d_hat = base["d_hat"] - 2 * ctx.ratings[out_a] + 2 * ctx.ratings[in_b]
+
+    syn = ctx.syn * cfg.teamgen_synergy_weight
+    syn_to_a = syn[:, idx_a].sum(axis=1)
+    syn_to_b = syn[:, idx_b].sum(axis=1)
+    syn_delta = (syn_to_a[in_b] - syn[in_b, out_a] - syn_to_a[out_a]) + (syn_to_b[out_a] - syn[out_a, in_b] - syn_to_b[in_b])
+
+    cross = (ctx.dom + ctx.dom.T) * cfg.teamgen_domination_weight
+    cross_to_a = cross[:, idx_a].sum(axis=1)
+    cross_to_b = cross[:, idx_b].sum(axis=1)
+    dom_delta = cross_to_b[in_b] + cross_to_a[out_a] - cross_to_b[out_a] - cross_to_a[in_b] + 2 * cross[out_a, in_b]
+
+    def moved(values: np.ndarray) -> np.ndarray:
+        team_a = values[idx_a].sum() - values[out_a] + values[in_b]
+        team_b = values[idx_b].sum() - values[in_b] + values[out_a]
+        return team_a - team_b
+
+    role = (np.abs(moved(ctx.attack)) + np.abs(moved(ctx.defense))) * cfg.teamgen_role_weight
+
+    if max(0, cfg.teamgen_top_k) > 0:
+        is_top = ctx.is_top.astype(int)
+        top_a = is_top[idx_a].sum() - is_top[out_a] + is_top[in_b]
+        top_b = is_top[idx_b].sum() - is_top[in_b] + is_top[out_a]
+        overflow = np.maximum(0, top_a - cfg.teamgen_top_max_per_team) + np.maximum(0, top_b - cfg.teamgen_top_max_per_team)
+        top = overflow * cfg.teamgen_top_penalty
+    else:
+        top = np.zeros(d_hat.shape)
+
+    components = {
+        "d_hat": d_hat,
+        "syn": base["syn"] + syn_delta,
+        "dom": base["dom"] + dom_delta,
+        "role": role,
+        "top": top,
+    }
+    components["score"] = np.abs(d_hat) + components["syn"] + components["dom"] + role + top
+    return components
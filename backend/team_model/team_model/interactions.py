@@ -1,7 +1,5 @@
 from .config import Config
-from .types import InteractionState, RoleFeedback
-
-GLOBAL_KEY = "__global__"
+from .types import GLOBAL_KEY, InteractionState, RoleFeedback
 
 
 def add_synergy(interactions: InteractionState, venue: str, player_a: str, player_b: str, value: float) -> None:
@@ -14,17 +12,31 @@ def add_domination(interactions: InteractionState, venue: str, dominator: str, d
     interactions.add_dom(GLOBAL_KEY, dominator, dominated, value)
 
 
+def add_synergies(interactions: InteractionState, venue: str, updates: list[tuple[str, str, float]]) -> None:
+    interactions.add_syn_many((venue, GLOBAL_KEY), updates)
+
+
+def add_dominations(interactions: InteractionState, venue: str, updates: list[tuple[str, str, float]]) -> None:
+    interactions.add_dom_many((venue, GLOBAL_KEY), updates)
+
+
 def apply_role_feedback(player_roles: dict, feedback: RoleFeedback) -> None:
     player_roles[feedback.role] = player_roles.get(feedback.role, 0.0) + feedback.weight
 
 
 def _combined_syn(interactions: InteractionState, venue: str, player_a: str, player_b: str, cfg: Config) -> float:
+    if isinstance(interactions, InteractionState):
+        table = interactions.effective_syn(venue, cfg.rating_eff_venue_weight, cfg.rating_eff_global_weight)
+        return table.get(frozenset({player_a, player_b}), 0.0) * interactions.scale
     venue_val = interactions.get_syn(venue, player_a, player_b)
     global_val = interactions.get_syn(GLOBAL_KEY, player_a, player_b)
     return cfg.rating_eff_venue_weight * venue_val + cfg.rating_eff_global_weight * global_val
 
 
 def _combined_dom(interactions: InteractionState, venue: str, dominator: str, dominated: str, cfg: Config) -> float:
+    if isinstance(interactions, InteractionState):
+        table = interactions.effective_dom(venue, cfg.rating_eff_venue_weight, cfg.rating_eff_global_weight)
+        return table.get((dominator, dominated), 0.0) * interactions.scale
     venue_val = interactions.get_dom(venue, dominator, dominated)
     global_val = interactions.get_dom(GLOBAL_KEY, dominator, dominated)
     return cfg.rating_eff_venue_weight * venue_val + cfg.rating_eff_global_weight * global_val
@@ -1,12 +1,23 @@
 from collections import defaultdict
 
+from .compaction import compact_online, note_match
 from .config import Config
 from .feedback import anchor_delta, compute_fan_rating_deltas, compute_pairwise_deltas, compute_quick_adjustments
 from .match_segments import segment_weight, weighted_goal_diff
 from .ratings import avg_match_rating, effective_rating
-from .types import ExpandedFeedback, FanResponse, Match, MatchEvent, ModelState, QuickFeedback
+from .types import (
+    GLOBAL_KEY,
+    ChangeJournal,
+    ExpandedFeedback,
+    FanResponse,
+    InteractionState,
+    Match,
+    MatchEvent,
+    ModelState,
+    QuickFeedback,
+)
 from .utils import clamp
-from .interactions import add_domination, add_synergy, apply_role_feedback
+from .interactions import add_domination, add_dominations, add_synergies, add_synergy, apply_role_feedback
 
 
 def _event_base(event_type: str, cfg: Config) -> float:
@@ -60,23 +71,48 @@ def _guest_multiplier(guest_matches: int, cfg: Config) -> float:
     return 1.0
 
 
-def _apply_interactions(model: ModelState, match: Match, quick: QuickFeedback | None, expanded: ExpandedFeedback | None) -> None:
+def _apply_interactions(
+    model: ModelState,
+    match: Match,
+    quick: QuickFeedback | None,
+    expanded: ExpandedFeedback | None,
+    journal: ChangeJournal | None = None,
+) -> None:
     venue = match.venue
-    _apply_match_interactions(model, match)
-    if quick:
-        for response in quick.fan_responses:
-            _apply_fan_interaction(model, venue, response)
-    if expanded:
-        for response in expanded.fan_responses:
-            _apply_fan_interaction(model, venue, response)
-        for syn in expanded.synergies:
-            add_synergy(model.interactions, venue, syn.player_a, syn.player_b, syn.value)
-        for dom in expanded.dominations:
-            add_domination(model.interactions, venue, dom.dominator, dom.dominated, dom.value)
-        for role in expanded.role_impressions:
-            player = model.players.get(role.player)
-            if player:
-                apply_role_feedback(player.role_tendencies, role)
+    if journal is not None:
+        if not isinstance(model.interactions, InteractionState):
+            raise TypeError("change journals work on dict-backed interactions")
+        journal.source = "match"
+        model.interactions.journal = journal
+    try:
+        note_match(model, match.participants)
+        if model.config.interaction_compact_online:
+            # Older interaction mass fades by one match before this match's interactions are added. Pairs
+            # of inactive players removed by the periodic full pass go to the journal for the caller to archive.
+            report = compact_online(model)
+            if report is not None and journal is not None:
+                journal.archived.update(report.archived_entries())
+        _apply_match_interactions(model, match)
+        if journal is not None:
+            journal.source = "feedback"
+        if quick:
+            for response in quick.fan_responses:
+                _apply_fan_interaction(model, venue, response)
+        if expanded:
+            for response in expanded.fan_responses:
+                _apply_fan_interaction(model, venue, response)
+            for syn in expanded.synergies:
+                add_synergy(model.interactions, venue, syn.player_a, syn.player_b, syn.value)
+            for dom in expanded.dominations:
+                add_domination(model.interactions, venue, dom.dominator, dom.dominated, dom.value)
+            for role in expanded.role_impressions:
+                player = model.players.get(role.player)
+                if player:
+                    apply_role_feedback(player.role_tendencies, role)
+    finally:
+        if journal is not None:
+            model.interactions.journal = None
+            journal.source = "match"
 
 
 def _apply_match_interactions(model: ModelState, match: Match) -> None:
@@ -88,17 +124,14 @@ def _apply_match_interactions(model: ModelState, match: Match) -> None:
     winners = match.team_a if weighted_diff > 0 else match.team_b
     losers = match.team_b if weighted_diff > 0 else match.team_a
 
-    for i, player_a in enumerate(winners):
-        for player_b in winners[i + 1 :]:
-            add_synergy(model.interactions, venue, player_a, player_b, cfg.auto_synergy_win)
-    for i, player_a in enumerate(losers):
-        for player_b in losers[i + 1 :]:
-            add_synergy(model.interactions, venue, player_a, player_b, -cfg.auto_synergy_win)
-
+    # Collected per match and applied in one batch each; the order of contributions per pair is unchanged.
+    synergies = [(a, b, cfg.auto_synergy_win) for i, a in enumerate(winners) for b in winners[i + 1 :]]
+    synergies += [(a, b, -cfg.auto_synergy_win) for i, a in enumerate(losers) for b in losers[i + 1 :]]
+    dominations = []
     for winner in winners:
         for loser in losers:
-            add_domination(model.interactions, venue, winner, loser, cfg.auto_domination_win)
-            add_domination(model.interactions, venue, loser, winner, -cfg.auto_domination_win)
+            dominations.append((winner, loser, cfg.auto_domination_win))
+            dominations.append((loser, winner, -cfg.auto_domination_win))
 
     assist_queue: dict[tuple[str, int], list[str]] = {}
     for event in match.events:
@@ -109,7 +142,10 @@ def _apply_match_interactions(model: ModelState, match: Match) -> None:
             assistants = assist_queue.get(key)
             if assistants:
                 assister = assistants.pop(0)
-                add_synergy(model.interactions, venue, event.player, assister, cfg.auto_synergy_goal_assist)
+                synergies.append((event.player, assister, cfg.auto_synergy_goal_assist))
+
+    add_synergies(model.interactions, venue, synergies)
+    add_dominations(model.interactions, venue, dominations)
 
 
 def _apply_fan_interaction(model: ModelState, venue: str, response: FanResponse) -> None:
@@ -123,15 +159,11 @@ def _apply_fan_interaction(model: ModelState, venue: str, response: FanResponse)
             player.role_tendencies[response.role] = player.role_tendencies.get(response.role, 0.0) + response.polarity
 
 
-def update_from_match(
-    model: ModelState,
-    match: Match,
-    quick_feedback: QuickFeedback | None = None,
-    expanded_feedback: ExpandedFeedback | None = None,
-) -> dict[str, float]:
+def ensure_participants(model: ModelState, match: Match) -> None:
+    # Adds newcomers with their starting rating and opens the venue for everyone else. Running it again
+    # changes nothing, so the pre-match state can be read before update_from_match is applied.
     cfg: Config = model.config
     venue = match.venue
-
     existing_players = [model.players[p] for p in match.participants if p in model.players]
     avg_existing = avg_match_rating(existing_players, venue, cfg) if existing_players else cfg.global_start_rating
 
@@ -146,6 +178,18 @@ def update_from_match(
         else:
             model.players[name].ensure_venue(venue, cfg.venue_start_rating)
 
+
+def update_from_match(
+    model: ModelState,
+    match: Match,
+    quick_feedback: QuickFeedback | None = None,
+    expanded_feedback: ExpandedFeedback | None = None,
+) -> dict[str, float]:
+    cfg: Config = model.config
+    venue = match.venue
+
+    ensure_participants(model, match)
+
     players = model.all_players(match.participants)
     avg_rating = avg_match_rating(players, venue, cfg)
 
@@ -216,23 +260,14 @@ def update_from_match_with_breakdown(
     match: Match,
     quick_feedback: QuickFeedback | None = None,
     expanded_feedback: ExpandedFeedback | None = None,
+    journal: ChangeJournal | None = None,
 ) -> tuple[dict[str, float], dict[str, dict[str, float]]]:
+    # With a journal, every rating and interaction this match changes is recorded as (before, after),
+    # so callers can log the changes without copying and diffing the whole state.
     cfg: Config = model.config
     venue = match.venue
 
-    existing_players = [model.players[p] for p in match.participants if p in model.players]
-    avg_existing = avg_match_rating(existing_players, venue, cfg) if existing_players else cfg.global_start_rating
-
-    for name in match.participants:
-        is_guest = name in match.guests
-        if name not in model.players:
-            if is_guest:
-                initial = clamp(avg_existing - cfg.guest_initial_offset, cfg.guest_initial_min, cfg.guest_initial_max)
-            else:
-                initial = cfg.global_start_rating
-            model.ensure_player(name, venue, initial, is_guest)
-        else:
-            model.players[name].ensure_venue(venue, cfg.venue_start_rating)
+    ensure_participants(model, match)
 
     players = model.all_players(match.participants)
     avg_rating = avg_match_rating(players, venue, cfg)
@@ -320,10 +355,15 @@ def update_from_match_with_breakdown(
 
     for player in players:
         delta = deltas[player.name]
+        pre_global = player.global_rating
+        pre_venue = player.venue_ratings.get(venue, cfg.venue_start_rating)
         player.global_rating += delta
-        player.venue_ratings[venue] = player.venue_ratings.get(venue, cfg.venue_start_rating) + delta
+        player.venue_ratings[venue] = pre_venue + delta
         if player.is_guest:
             player.guest_matches += 1
+        if journal is not None:
+            journal.record_rating(player.name, GLOBAL_KEY, pre_global, player.global_rating)
+            journal.record_rating(player.name, venue, pre_venue, player.venue_ratings[venue])
 
-    _apply_interactions(model, match, quick_feedback, expanded_feedback)
+    _apply_interactions(model, match, quick_feedback, expanded_feedback, journal)
     return deltas, breakdown
@@ -0,0 +1,148 @@
+import time
+from typing import List, Tuple
+
+import numpy as np
+
+from .config import Config
+from .engine import SplitContext, score_masks, swap_components
+
+ARCHIVE_PER_STEP = 4
+
+
+def _indices(mask: int, n: int) -> np.ndarray:
+    return np.array([idx for idx in range(n) if mask >> idx & 1], dtype=np.int64)
+
+
+def local_search_masks(
+    ctx: SplitContext,
+    cfg: Config,
+    seed: int = 0,
+    placements: List[Tuple[int, int]] | None = None,
+) -> np.ndarray:
+    # Tabu search over pair swaps with random restarts, bounded by cfg.teamgen_time_budget_ms.
+    # Returns every split it visited (plus the best neighbours of each step) as team A masks holding index 0.
+    # `placements` are (team A, team B) masks of players pinned for a restart; restarts take them in turn
+    # and only the remaining players are swapped. By default only the anchor is pinned, to team A.
+    n = len(ctx.names)
+    team_size = n // 2
+    if n < 2 or team_size < 1:
+        return np.zeros(0, dtype=np.int64)
+    pinned = []
+    for mask_a, mask_b in placements or [(1, 0)]:
+        fixed_a, fixed_b = _indices(mask_a, n), _indices(mask_b, n)
+        free = _indices(((1 << n) - 1) & ~(mask_a | mask_b), n)
+        if len(fixed_a) <= team_size <= len(fixed_a) + len(free):
+            pinned.append((fixed_a, fixed_b, free, np.concatenate((fixed_a, fixed_b))))
+    if not pinned:
+        return np.zeros(0, dtype=np.int64)
+    deadline = time.perf_counter() + cfg.teamgen_time_budget_ms / 1000.0
+    rng = np.random.default_rng(seed)
+    bits = np.left_shift(1, np.arange(n, dtype=np.int64))
+    tenure = max(1, n // 4)
+    patience = 2 * n
+    archive: set[int] = set()
+    best_score = np.inf
+
+    restart = 0
+    while True:
+        fixed_a, fixed_b, free, fixed = pinned[restart % len(pinned)]
+        restart += 1
+        rest = rng.permutation(free)
+        open_a = team_size - len(fixed_a)
+        idx_a = np.concatenate((fixed_a, rest[:open_a]))
+        idx_b = np.concatenate((fixed_b, rest[open_a:]))
+        mask = int(bits[idx_a].sum())
+        archive.add(mask)
+        tabu_until = np.zeros(n, dtype=np.int64)
+        local_best = np.inf
+        stall = 0
+        step = 0
+        while stall < patience:
+            if time.perf_counter() >= deadline:
+                return np.fromiter(archive, dtype=np.int64, count=len(archive))
+            score = swap_components(ctx, idx_a, idx_b, cfg)["score"]
+            score[np.isin(idx_a, fixed), :] = np.inf
+            score[:, np.isin(idx_b, fixed)] = np.inf
+            neighbours = mask - bits[idx_a][:, None] + bits[idx_b][None, :]
+            finite = np.isfinite(score)
+            if not finite.any():
+                if len(pinned) > 1:
+                    break
+                return np.fromiter(archive, dtype=np.int64, count=len(archive))
+            order = np.argsort(np.where(finite, score, np.inf), axis=None)[:ARCHIVE_PER_STEP]
+            archive.update(int(m) for m in neighbours.ravel()[order] if m & 1)
+
+            allowed = (tabu_until[idx_a][:, None] <= step) & (tabu_until[idx_b][None, :] <= step)
+            candidates = np.where(allowed | (score < best_score), score, np.inf)
+            flat = int(np.argmin(candidates))
+            if not np.isfinite(candidates.ravel()[flat]):
+                break
+            i, j = divmod(flat, len(idx_b))
+            moved_out, moved_in = idx_a[i], idx_b[j]
+            idx_a[i], idx_b[j] = moved_in, moved_out
+            mask = int(neighbours[i, j])
+            archive.add(mask)
+            tabu_until[moved_out] = tabu_until[moved_in] = step + tenure
+            value = float(score[i, j])
+            best_score = min(best_score, value)
+            if value < local_best - 1e-12:
+                local_best = value
+                stall = 0
+            else:
+                stall += 1
+            step += 1
+
+
+def descent_masks(
+    ctx: SplitContext,
+    cfg: Config,
+    placements: List[Tuple[int, int]] | None = None,
+) -> np.ndarray:
+    # Snake draft by rating, then the best improving pair swap until none is left: a cheap, deterministic
+    # handful of good splits, one descent per placement (pinned as in local_search_masks). Returns every
+    # split stepped through plus the best neighbours of each step, as team A masks holding index 0.
+    n = len(ctx.names)
+    team_size = n // 2
+    if n < 2 or team_size < 1:
+        return np.zeros(0, dtype=np.int64)
+    bits = np.left_shift(1, np.arange(n, dtype=np.int64))
+    visited: set[int] = set()
+    for mask_a, mask_b in placements or [(1, 0)]:
+        fixed_a, fixed_b = _indices(mask_a, n), _indices(mask_b, n)
+        free = _indices(((1 << n) - 1) & ~(mask_a | mask_b), n)
+        open_a = team_size - len(fixed_a)
+        open_b = n - team_size - len(fixed_b)
+        if open_a < 0 or open_b < 0:
+            continue
+        picks_a: List[int] = []
+        picks_b: List[int] = []
+        for rank, idx in enumerate(free[np.argsort(-ctx.ratings[free], kind="stable")]):
+            to_a = rank % 4 in (0, 3)
+            if len(picks_a) == open_a or (not to_a and len(picks_b) < open_b):
+                picks_b.append(int(idx))
+            else:
+                picks_a.append(int(idx))
+        idx_a = np.concatenate((fixed_a, np.array(picks_a, dtype=np.int64)))
+        idx_b = np.concatenate((fixed_b, np.array(picks_b, dtype=np.int64)))
+        fixed = np.concatenate((fixed_a, fixed_b))
+        mask = int(bits[idx_a].sum())
+        visited.add(mask)
+        current = float(score_masks(ctx, np.array([mask], dtype=np.int64), cfg)[1][0])
+        while len(idx_a) and len(idx_b):
+            score = swap_components(ctx, idx_a, idx_b, cfg)["score"]
+            score[np.isin(idx_a, fixed), :] = np.inf
+            score[:, np.isin(idx_b, fixed)] = np.inf
+            neighbours = mask - bits[idx_a][:, None] + bits[idx_b][None, :]
+            order = np.argsort(score, axis=None)[:ARCHIVE_PER_STEP]
+            order = order[np.isfinite(score.ravel()[order])]
+            visited.update(int(m) for m in neighbours.ravel()[order])
+            if len(order) == 0:
+                break
+            i, j = divmod(int(order[0]), len(idx_b))
+            if score[i, j] >= current - 1e-12:
+                break
+            idx_a[i], idx_b[j] = idx_b[j], idx_a[i]
+            mask = int(neighbours[i, j])
+            current = float(score[i, j])
+    masks = np.fromiter(visited, dtype=np.int64, count=len(visited))
+    return masks[(masks & 1) == 1]
@@ -0,0 +1,116 @@
+from collections.abc import MutableMapping
+from dataclasses import replace
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+from .types import InteractionState, ModelState, PlayerState
+
+
+class OverlayPlayers(MutableMapping):
+    # A player is copied out of `base` the first time it is looked up; `base` itself is never mutated.
+
+    def __init__(self, base: Dict[str, PlayerState]) -> None:
+        self.base = base
+        self.written: Dict[str, PlayerState] = {}
+
+    def __getitem__(self, name: str) -> PlayerState:
+        player = self.written.get(name)
+        if player is None:
+            player = self.base[name]
+            venue_ratings, role_tendencies = dict(player.venue_ratings), dict(player.role_tendencies)
+            player = replace(player, venue_ratings=venue_ratings, role_tendencies=role_tendencies)
+            self.written[name] = player
+        return player
+
+    def __setitem__(self, name: str, player: PlayerState) -> None:
+        self.written[name] = player
+
+    def __delitem__(self, name: str) -> None:
+        raise TypeError("players cannot be removed through an overlay")
+
+    def __contains__(self, name: object) -> bool:
+        return name in self.written or name in self.base
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self.written
+        yield from (name for name in self.base if name not in self.written)
+
+    def __len__(self) -> int:
+        return len(self.base) + sum(1 for name in self.written if name not in self.base)
+
+
+class OverlayInteractions:
+    # Reads fall through to `base`; written keys are kept per kind and venue. Compaction passes are recorded
+    # and applied to base values as they are read, so decaying the overlay does not touch every entry.
+
+    def __init__(self, base: InteractionState) -> None:
+        if not isinstance(base, InteractionState):
+            raise TypeError("overlays work on dict-backed interactions")
+        self.base = base
+        self.written: Dict[str, Dict[str, dict]] = {"synergy": {}, "domination": {}}
+        self._passes: List[Tuple[float, float, frozenset]] = []
+
+    def _read(self, kind: str, venue: str, key: object) -> float:
+        table = self.written[kind].get(venue)
+        if table is not None and key in table:
+            return table[key]
+        value = getattr(self.base, kind).get(venue, {}).get(key, 0.0) * self.base.scale
+        for factor, epsilon, inactive in self._passes:
+            value = _compacted(value, key, factor, epsilon, inactive)
+        return value
+
+    def _add_many(self, kind: str, venues: Tuple[str, ...], items: List[tuple]) -> None:
+        # Item by item across venues: the same per-key order as InteractionState.add_*_many.
+        tables = [self.written[kind].setdefault(venue, {}) for venue in venues]
+        for key, value in items:
+            for venue, table in zip(venues, tables):
+                table[key] = self._read(kind, venue, key) + value
+
+    def get_syn(self, venue: str, player_a: str, player_b: str) -> float:
+        return self._read("synergy", venue, frozenset({player_a, player_b}))
+
+    def add_syn(self, venue: str, player_a: str, player_b: str, value: float) -> None:
+        self.add_syn_many((venue,), ((player_a, player_b, value),))
+
+    def add_syn_many(self, venues: Tuple[str, ...], updates: Iterable[Tuple[str, str, float]]) -> None:
+        self._add_many("synergy", venues, [(frozenset((a, b)), value) for a, b, value in updates if a != b])
+
+    def get_dom(self, venue: str, dominator: str, dominated: str) -> float:
+        return self._read("domination", venue, (dominator, dominated))
+
+    def add_dom(self, venue: str, dominator: str, dominated: str, value: float) -> None:
+        self.add_dom_many((venue,), ((dominator, dominated, value),))
+
+    def add_dom_many(self, venues: Tuple[str, ...], updates: Iterable[Tuple[str, str, float]]) -> None:
+        self._add_many("domination", venues, [((a, b), value) for a, b, value in updates if a != b])
+
+    def decay(self, factor: float) -> None:
+        self.compact(factor, 0.0, ())
+
+    def compact(self, factor: float, epsilon: float, inactive: Iterable[str]) -> None:
+        inactive = frozenset(inactive)
+        for tables in self.written.values():
+            for table in tables.values():
+                for key, value in table.items():
+                    table[key] = _compacted(value, key, factor, epsilon, inactive)
+        self._passes.append((factor, epsilon, inactive))
+
+
+def _compacted(value: float, key: object, factor: float, epsilon: float, inactive: frozenset) -> float:
+    # One compaction pass on a single entry; removed entries read as 0.0, as a missing key does.
+    if inactive and any(name in inactive for name in key):
+        return 0.0
+    if factor != 1.0:
+        value *= factor
+    return 0.0 if abs(value) < epsilon else value
+
+
+def overlay_state(base: ModelState) -> ModelState:
+    # A ModelState that update_from_match can run against without changing `base`: only the players and
+    # interaction keys the update touches are copied.
+    return ModelState(
+        players=OverlayPlayers(base.players),
+        interactions=OverlayInteractions(base.interactions),
+        config=base.config,
+        tier_bonus=base.tier_bonus,
+        match_count=base.match_count,
+    )
@@ -0,0 +1,111 @@
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import heapq
+from itertools import combinations, repeat
+from math import comb
+import multiprocessing
+from threading import Lock
+from typing import List, Tuple
+
+import numpy as np
+
+from .config import Config
+from .engine import SplitContext, keep_best, score_masks, split_masks
+
+PREFIX_SIZE = 3
+TASKS_PER_WORKER = 4
+
+# One pool per process, started on first use and kept for later requests. Its workers come from a
+# forkserver (spawn where that is missing), never forked from a threaded web worker.
+_pool: ProcessPoolExecutor | None = None
+_pool_workers = 0
+_pool_lock = Lock()
+
+
+def _start_method() -> str:
+    return "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            context = multiprocessing.get_context(_start_method())
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+            _pool_workers = workers
+        return _pool
+
+
+def shutdown_pool() -> None:
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True)
+        _pool, _pool_workers = None, 0
+
+
+def _empty() -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    return np.zeros(0, dtype=np.int64), np.zeros(0), np.zeros(0)
+
+
+def shard_prefixes(n: int, team_size: int, shards: int) -> List[List[Tuple[int, ...]]]:
+    # Prefixes fix the members of team A after the anchor; they are packed largest first into the lightest shard.
+    depth = max(0, min(PREFIX_SIZE, team_size - 1))
+    sized = []
+    for prefix in combinations(range(1, n), depth):
+        start = prefix[-1] + 1 if prefix else 1
+        size = comb(n - start, team_size - 1 - depth)
+        if size > 0:
+            sized.append((size, prefix))
+    sized.sort(key=lambda item: (-item[0], item[1]))
+    bins: List[List[Tuple[int, ...]]] = [[] for _ in range(max(1, shards))]
+    loads = [(0, idx) for idx in range(len(bins))]
+    for size, prefix in sized:
+        load, idx = heapq.heappop(loads)
+        bins[idx].append(prefix)
+        heapq.heappush(loads, (load + size, idx))
+    return [prefixes for prefixes in bins if prefixes]
+
+
+def _shard_best(
+    prefixes: List[Tuple[int, ...]],
+    ctx: SplitContext,
+    cfg: Config,
+    keep: int,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, bool]:
+    # The pool outlives a single request, so every task carries its context; it is a few small arrays.
+    n = len(ctx.names)
+    pool = _empty()
+    complete = True
+    for prefix in prefixes:
+        for chunk in split_masks(n, n // 2, prefix):
+            d_hat, score = score_masks(ctx, chunk, cfg)
+            merged = [np.concatenate(part) for part in zip(pool, (chunk, d_hat, score))]
+            complete = complete and len(merged[0]) <= keep
+            pool = keep_best(*merged, n, keep)
+    return (*pool, complete)
+
+
+def parallel_best_splits(
+    ctx: SplitContext,
+    cfg: Config,
+    keep: int,
+    workers: int,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, bool]:
+    # Same contract as the serial stream: the best `keep` splits, ranked, plus whether nothing was cut off.
+    n = len(ctx.names)
+    shards = shard_prefixes(n, n // 2, workers * TASKS_PER_WORKER)
+    pool = _get_pool(workers)
+    try:
+        parts = list(pool.map(_shard_best, shards, repeat(ctx), repeat(cfg), repeat(keep)))
+    except BrokenProcessPool:
+        # A worker died (OOM kill, restart); the next call starts a fresh pool.
+        shutdown_pool()
+        raise
+    if not parts:
+        return (*_empty(), True)
+    merged = [np.concatenate(part) for part in zip(*(p[:3] for p in parts))]
+    complete = all(p[3] for p in parts) and len(merged[0]) <= keep
+    return (*keep_best(*merged, n, keep), complete)
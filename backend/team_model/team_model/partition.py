@@ -0,0 +1,278 @@
+from itertools import combinations, permutations
+from math import comb
+import time
+from typing import List, Tuple
+
+import numpy as np
+
+from .config import Config
+from .engine import SplitContext, build_split_context
+from .types import ModelState
+
+TEAM_KEYS = "ABCDEFGH"
+ARCHIVE_PER_STEP = 4
+
+
+def team_sizes(n: int, num_teams: int) -> List[int]:
+    return [n // num_teams + (1 if t < n % num_teams else 0) for t in range(num_teams)]
+
+
+def _size_orders(sizes: List[int]) -> List[Tuple[int, ...]]:
+    return sorted(set(permutations(sizes)), reverse=True)
+
+
+def count_partitions(n: int, num_teams: int) -> int:
+    # Teams are ordered by their smallest member, so each team picks its remaining members from the
+    # players left after the earlier teams; relabelled duplicates are never produced.
+    total = 0
+    for order in _size_orders(team_sizes(n, num_teams)):
+        free = n
+        count = 1
+        for size in order[:-1]:
+            count *= comb(free - 1, size - 1)
+            free -= size
+        total += count
+    return total
+
+
+def canonical_labels(labels: np.ndarray) -> np.ndarray:
+    labels = np.atleast_2d(labels)
+    out = np.empty_like(labels)
+    for row, values in enumerate(labels):
+        _, first = np.unique(values, return_index=True)
+        mapping = np.empty(first.shape[0], dtype=labels.dtype)
+        mapping[np.argsort(first)] = np.arange(first.shape[0], dtype=labels.dtype)
+        out[row] = mapping[values]
+    return out
+
+
+def partition_labels(n: int, num_teams: int) -> np.ndarray:
+    # One row of team labels per partition; the team of the first free player is filled next.
+    rows = []
+    for order in _size_orders(team_sizes(n, num_teams)):
+        labels = np.full((1, n), -1, dtype=np.int64)
+        for team, size in enumerate(order[:-1]):
+            free_idx = np.nonzero(labels == -1)[1].reshape(len(labels), -1)
+            picks = np.array([(0, *rest) for rest in combinations(range(1, free_idx.shape[1]), size - 1)], dtype=np.int64)
+            parent = np.repeat(np.arange(len(labels)), len(picks))
+            labels = labels[parent]
+            chosen = free_idx[parent[:, None], np.tile(picks, (len(free_idx), 1))]
+            np.put_along_axis(labels, chosen, team, axis=1)
+        labels[labels == -1] = len(order) - 1
+        rows.append(labels)
+    return np.concatenate(rows)
+
+
+def _ranges(values: np.ndarray) -> np.ndarray:
+    return values.max(axis=-1) - values.min(axis=-1)
+
+
+def _top_overflow(counts: np.ndarray, cfg: Config) -> np.ndarray:
+    if max(0, cfg.teamgen_top_k) <= 0:
+        return np.zeros(counts.shape[:-1])
+    return np.maximum(0, counts - cfg.teamgen_top_max_per_team).sum(axis=-1) * cfg.teamgen_top_penalty
+
+
+def score_labels(ctx: SplitContext, labels: np.ndarray, num_teams: int, cfg: Config) -> dict[str, np.ndarray]:
+    members = (labels[:, :, None] == np.arange(num_teams)).astype(float)
+    per_team = members.transpose(0, 2, 1)
+    cross = ctx.dom + ctx.dom.T
+    assigned = per_team.sum(axis=1)
+    syn_intra = 0.5 * ((per_team @ ctx.syn) * per_team).sum(axis=(1, 2))
+    cross_intra = 0.5 * ((per_team @ cross) * per_team).sum(axis=(1, 2))
+    cross_total = 0.5 * ((assigned @ cross) * assigned).sum(axis=1)
+    spread = _ranges(per_team @ ctx.ratings)
+    components = {
+        "syn": syn_intra * cfg.teamgen_synergy_weight,
+        "dom": (cross_total - cross_intra) * cfg.teamgen_domination_weight,
+        "role": (_ranges(per_team @ ctx.attack) + _ranges(per_team @ ctx.defense)) * cfg.teamgen_role_weight,
+        "top": _top_overflow(per_team @ ctx.is_top.astype(float), cfg),
+    }
+    score = spread + components["syn"] + components["dom"] + components["role"] + components["top"]
+    return {"spread": spread, "score": score, **components}
+
+
+def _swap_scores(ctx: SplitContext, labels: np.ndarray, num_teams: int, cfg: Config) -> np.ndarray:
+    # Score of the partition after swapping players p and q, for every pair at once.
+    n = len(labels)
+    members = (labels[:, None] == np.arange(num_teams)).astype(float)
+    own = members[:, None, :]
+    other = members[None, :, :]
+
+    def moved(values: np.ndarray) -> np.ndarray:
+        sums = members.T @ values
+        shift = (values[None, :] - values[:, None])[:, :, None]
+        return sums[None, None, :] + shift * own - shift * other
+
+    def intra_delta(matrix: np.ndarray) -> np.ndarray:
+        to_team = matrix @ members
+        gain = to_team[np.arange(n)[None, :], labels[:, None]]
+        stay = to_team[np.arange(n), labels]
+        return gain + gain.T - 2 * matrix - stay[:, None] - stay[None, :]
+
+    base = score_labels(ctx, labels[None, :], num_teams, cfg)
+    cross = ctx.dom + ctx.dom.T
+    syn = base["syn"][0] + intra_delta(ctx.syn) * cfg.teamgen_synergy_weight
+    dom = base["dom"][0] - intra_delta(cross) * cfg.teamgen_domination_weight
+    role = (_ranges(moved(ctx.attack)) + _ranges(moved(ctx.defense))) * cfg.teamgen_role_weight
+    top = _top_overflow(moved(ctx.is_top.astype(float)), cfg)
+    score = _ranges(moved(ctx.ratings)) + syn + dom + role + top
+    score[labels[:, None] == labels[None, :]] = np.inf
+    return score
+
+
+def _local_partitions(ctx: SplitContext, num_teams: int, cfg: Config, seed: int = 0) -> np.ndarray:
+    n = len(ctx.names)
+    deadline = time.perf_counter() + cfg.teamgen_time_budget_ms / 1000.0
+    rng = np.random.default_rng(seed)
+    tenure = max(1, n // 4)
+    patience = 2 * n
+    archive: set[tuple] = set()
+    best_score = np.inf
+
+    def remember(labels: np.ndarray) -> None:
+        archive.add(tuple(canonical_labels(labels)[0].tolist()))
+
+    while time.perf_counter() < deadline:
+        labels = rng.permutation(np.arange(n) % num_teams)
+        remember(labels)
+        tabu_until = np.zeros(n, dtype=np.int64)
+        local_best = np.inf
+        stall = 0
+        step = 0
+        while stall < patience and time.perf_counter() < deadline:
+            score = _swap_scores(ctx, labels, num_teams, cfg)
+            if not np.isfinite(score).any():
+                break
+            for flat in np.argsort(score, axis=None)[:ARCHIVE_PER_STEP]:
+                p, q = divmod(int(flat), n)
+                if np.isfinite(score[p, q]):
+                    neighbour = labels.copy()
+                    neighbour[p], neighbour[q] = labels[q], labels[p]
+                    remember(neighbour)
+            allowed = (tabu_until[:, None] <= step) & (tabu_until[None, :] <= step)
+            candidates = np.where(allowed | (score < best_score), score, np.inf)
+            flat = int(np.argmin(candidates))
+            p, q = divmod(flat, n)
+            if not np.isfinite(candidates[p, q]):
+                break
+            labels[p], labels[q] = labels[q], labels[p]
+            remember(labels)
+            tabu_until[p] = tabu_until[q] = step + tenure
+            value = float(score[p, q])
+            best_score = min(best_score, value)
+            if value < local_best - 1e-12:
+                local_best = value
+                stall = 0
+            else:
+                stall += 1
+            step += 1
+    return np.array(sorted(archive), dtype=np.int64).reshape(len(archive), n)
+
+
+def _max_assignment(weights: np.ndarray) -> int:
+    # Hungarian algorithm, O(k^3): the largest total weight of a one-to-one matching of rows to columns.
+    k = len(weights)
+    cost = weights.max() - weights
+    u = np.zeros(k + 1)
+    v = np.zeros(k + 1)
+    match = np.zeros(k + 1, dtype=np.int64)  # match[col] = row (1-based), 0 while the column is free
+    way = np.zeros(k + 1, dtype=np.int64)
+    for row in range(1, k + 1):
+        match[0] = row
+        col = 0
+        slack = np.full(k + 1, np.inf)
+        used = np.zeros(k + 1, dtype=bool)
+        while True:
+            used[col] = True
+            current = match[col]
+            best, best_col = np.inf, 0
+            for other in range(1, k + 1):
+                if used[other]:
+                    continue
+                reduced = cost[current - 1, other - 1] - u[current] - v[other]
+                if reduced < slack[other]:
+                    slack[other], way[other] = reduced, col
+                if slack[other] < best:
+                    best, best_col = slack[other], other
+            for other in range(k + 1):
+                if used[other]:
+                    u[match[other]] += best
+                    v[other] -= best
+                else:
+                    slack[other] -= best
+            col = best_col
+            if match[col] == 0:
+                break
+        while col:
+            previous = way[col]
+            match[col] = match[previous]
+            col = previous
+    return int(sum(weights[match[col] - 1, col - 1] for col in range(1, k + 1)))
+
+
+def _moved_players(labels_a: np.ndarray, labels_b: np.ndarray, num_teams: int) -> int:
+    # Team labels are arbitrary, so teams are paired up to keep as many players in place as possible.
+    shared = np.zeros((num_teams, num_teams), dtype=np.int64)
+    np.add.at(shared, (labels_a, labels_b), 1)
+    return len(labels_a) - _max_assignment(shared)
+
+
+def _partition_dict(ctx: SplitContext, labels: np.ndarray, scored: dict[str, np.ndarray], idx: int, num_teams: int) -> dict:
+    teams = [[name for name, label in zip(ctx.names, labels) if label == team] for team in range(num_teams)]
+    return {
+        "teams": teams,
+        "d_hat": float(scored["spread"][idx]),
+        "score": float(scored["score"][idx]),
+        "components": {key: float(scored[key][idx]) for key in ("syn", "dom", "role", "top")},
+    }
+
+
+def evaluate_partition(model: ModelState, teams: List[List[str]], venue: str, ctx: SplitContext | None = None) -> dict:
+    cfg: Config = model.config
+    if ctx is None:
+        ctx = build_split_context(model, [name for team in teams for name in team], venue)
+    labels = np.full(len(ctx.names), -1, dtype=np.int64)
+    for team, members in enumerate(teams):
+        labels[ctx.indices(members)] = team
+    # Players of a shared context who sit this partition out keep label -1 and are not scored.
+    scored = score_labels(ctx, labels[None, :], len(teams), cfg)
+    result = _partition_dict(ctx, labels, scored, 0, len(teams))
+    result["teams"] = [list(team) for team in teams]
+    return result
+
+
+def generate_partitions(
+    model: ModelState,
+    participants: List[str],
+    venue: str,
+    num_teams: int,
+    top_n: int = 3,
+    ctx: SplitContext | None = None,
+) -> List[dict]:
+    cfg: Config = model.config
+    if num_teams < 2 or len(participants) < num_teams:
+        raise ValueError("not_enough_players")
+    if ctx is None:
+        ctx = build_split_context(model, participants, venue)
+    n = len(ctx.names)
+    if count_partitions(n, num_teams) <= cfg.teamgen_exhaustive_max_splits:
+        labels = partition_labels(n, num_teams)
+    else:
+        labels = _local_partitions(ctx, num_teams, cfg)
+    scored = score_labels(ctx, labels, num_teams, cfg)
+    order = np.lexsort((*labels.T[::-1], scored["spread"], scored["score"]))
+
+    min_moved = 2 * max(1, cfg.teamgen_overlap_min_diff)
+    selected: List[int] = []
+    for idx in order:
+        if all(_moved_players(labels[idx], labels[chosen], num_teams) >= min_moved for chosen in selected):
+            selected.append(int(idx))
+            if len(selected) == top_n:
+                break
+    for idx in order:
+        if len(selected) >= top_n:
+            break
+        if int(idx) not in selected:
+            selected.append(int(idx))
+    return [_partition_dict(ctx, labels[idx], scored, idx, num_teams) for idx in selected]
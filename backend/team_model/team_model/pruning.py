@@ -0,0 +1,124 @@
+from math import comb
+
+import numpy as np
+
+from .config import Config
+from .engine import SplitContext, score_masks
+
+BLOCK_SIZE = 1024
+BOUND_EPS = 1e-7
+
+
+def _popcount(masks: np.ndarray, bits: int) -> np.ndarray:
+    return ((masks[:, None] >> np.arange(bits, dtype=np.int64)) & 1).sum(axis=1)
+
+
+def _signs(masks: np.ndarray, bits: int) -> np.ndarray:
+    return 2.0 * ((masks[:, None] >> np.arange(bits, dtype=np.int64)) & 1) - 1.0
+
+
+def _pair_terms(ctx: SplitContext, cfg: Config) -> tuple[np.ndarray, np.ndarray]:
+    same = ctx.syn * cfg.teamgen_synergy_weight
+    cross = (ctx.dom + ctx.dom.T) * cfg.teamgen_domination_weight
+    np.fill_diagonal(same, 0.0)
+    np.fill_diagonal(cross, 0.0)
+    return same, cross
+
+
+def _half_terms(signs: np.ndarray, ratings: np.ndarray, same: np.ndarray, cross: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    # Pair (i, j) costs `same` when both sit on one side and `cross` otherwise: cross + (same - cross) * (1 + s_i s_j) / 2.
+    diff = same - cross
+    base = np.triu(cross, 1).sum() + 0.5 * np.triu(diff, 1).sum()
+    interaction = base + 0.25 * ((signs @ diff) * signs).sum(axis=1)
+    return signs @ ratings, interaction
+
+
+def _empty() -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    return np.zeros(0, dtype=np.int64), np.zeros(0), np.zeros(0)
+
+
+def count_splits(n: int, team_size: int) -> int:
+    if n < 2 or team_size < 1:
+        return 0
+    return comb(n - 1, team_size - 1)
+
+
+def splits_within(
+    ctx: SplitContext,
+    cfg: Config,
+    threshold: float,
+    max_scored: int | None = None,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray] | None:
+    # Meet in the middle: team A masks are combined from a left-half subset (holding the anchor) and a right-half subset.
+    # Only pairs whose lower bound fits under the threshold are scored exactly; None once more than `max_scored` do,
+    # i.e. the bounds do not separate enough to beat scoring every split.
+    n = len(ctx.names)
+    team_size = n // 2
+    if count_splits(n, team_size) == 0:
+        return _empty()
+    half = (n + 1) // 2
+    rest = n - half
+    same, cross = _pair_terms(ctx, cfg)
+    limit = threshold + BOUND_EPS * (1.0 + abs(threshold))
+
+    left = np.arange(1, 1 << half, 2, dtype=np.int64)
+    left_sizes = _popcount(left, half)
+    left_signs = _signs(left, half)
+    left_d, left_inter = _half_terms(left_signs, ctx.ratings[:half], same[:half, :half], cross[:half, :half])
+
+    right = np.arange(1 << rest, dtype=np.int64)
+    right_sizes = _popcount(right, rest)
+    right_d, right_inter = _half_terms(_signs(right, rest), ctx.ratings[half:], same[half:, half:], cross[half:, half:])
+
+    # Cross-half pairs: given the left assignment each right player picks the cheaper side at best.
+    link_diff = same[:half, half:] - cross[:half, half:]
+    link_base = cross[:half, half:].sum() + 0.5 * link_diff.sum()
+    left_bound = left_inter + link_base - 0.5 * np.abs(left_signs @ link_diff).sum(axis=1)
+    top_k = max(0, cfg.teamgen_top_k)
+    if top_k > 0:
+        top_left = ctx.is_top[:half].astype(float)
+        top_a = (left_signs > 0) @ top_left
+        top_b = top_left.sum() - top_a
+        overflow = np.maximum(0, top_a - cfg.teamgen_top_max_per_team) + np.maximum(0, top_b - cfg.teamgen_top_max_per_team)
+        left_bound = left_bound + overflow * cfg.teamgen_top_penalty
+
+    found = []
+    scored = 0
+    for right_size in range(0, min(team_size - 1, rest) + 1):
+        left_ids = np.nonzero(left_sizes == team_size - right_size)[0]
+        right_ids = np.nonzero(right_sizes == right_size)[0]
+        if len(left_ids) == 0 or len(right_ids) == 0:
+            continue
+        right_ids = right_ids[np.argsort(right_d[right_ids], kind="stable")]
+        sorted_d = right_d[right_ids]
+        min_inter = right_inter[right_ids].min()
+        for start in range(0, len(left_ids), BLOCK_SIZE):
+            block = left_ids[start : start + BLOCK_SIZE]
+            width = limit - left_bound[block] - min_inter
+            block = block[width >= 0]
+            width = width[width >= 0]
+            if len(block) == 0:
+                continue
+            lo = np.searchsorted(sorted_d, -left_d[block] - width, side="left")
+            hi = np.searchsorted(sorted_d, -left_d[block] + width, side="right")
+            counts = hi - lo
+            total = int(counts.sum())
+            if total == 0:
+                continue
+            offsets = np.repeat(lo - (np.cumsum(counts) - counts), counts)
+            left_pick = np.repeat(block, counts)
+            right_pick = right_ids[np.arange(total) + offsets]
+            bound = np.abs(left_d[left_pick] + right_d[right_pick]) + left_bound[left_pick] + right_inter[right_pick]
+            keep = bound <= limit
+            masks = left[left_pick[keep]] | (right[right_pick[keep]] << half)
+            if len(masks) == 0:
+                continue
+            scored += len(masks)
+            if max_scored is not None and scored > max_scored:
+                return None
+            d_hat, score = score_masks(ctx, masks, cfg)
+            within = score <= threshold
+            found.append((masks[within], d_hat[within], score[within]))
+    if not found:
+        return _empty()
+    return tuple(np.concatenate(part) for part in zip(*found))
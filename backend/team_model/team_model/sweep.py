@@ -0,0 +1,128 @@
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, replace
+from itertools import product
+import random
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+from .config import Config
+from .engine import team_rating_map
+from .learning import ensure_participants, update_from_match_with_breakdown
+from .match_segments import weighted_goal_diff
+from .types import ExpandedFeedback, Match, ModelState, QuickFeedback
+
+# Bounds for random sampling. teamgen_*_weight only shape the split score, not d_hat, so they are left out.
+SWEEP_RANGES: Dict[str, Tuple[float, float]] = {
+    "cap_pct": (0.04, 0.16),
+    "anchor_step1": (5.0, 30.0),
+    "anchor_step2_to_4": (0.5, 5.0),
+    "anchor_step5_plus": (0.0, 3.0),
+}
+
+TASKS_PER_WORKER = 4
+
+# Set once per worker process by the pool initializer, so tasks only carry their config.
+_worker_history: List["HistoryMatch"] | None = None
+
+
+@dataclass(frozen=True)
+class HistoryMatch:
+    match: Match
+    quick_feedback: QuickFeedback | None
+    expanded_feedback: ExpandedFeedback | None
+    # Weighted goal diff under the base config: every variant is scored against the same targets.
+    goal_diff: float
+
+
+def load_history(
+    items: Iterable[Tuple[Match, QuickFeedback | None, ExpandedFeedback | None]],
+    cfg: Config | None = None,
+) -> List[HistoryMatch]:
+    cfg = cfg or Config()
+    return [
+        HistoryMatch(match, quick, expanded, weighted_goal_diff(match.segments, cfg)) for match, quick, expanded in items
+    ]
+
+
+def match_d_hat(model: ModelState, match: Match) -> float:
+    # The d_hat evaluate_split gives for the played teams, without building the interaction matrices.
+    rating_map = team_rating_map(model, match.participants, match.venue, model.config)
+    return sum(rating_map[name] for name in match.team_a) - sum(rating_map[name] for name in match.team_b)
+
+
+def replay_predictions(history: List[HistoryMatch], cfg: Config) -> List[float]:
+    # One chronological pass: each match is predicted from the state just before it, then learned from.
+    state = ModelState.empty(cfg)
+    predicted = []
+    for item in history:
+        ensure_participants(state, item.match)
+        predicted.append(match_d_hat(state, item.match))
+        update_from_match_with_breakdown(
+            state,
+            item.match,
+            quick_feedback=item.quick_feedback,
+            expanded_feedback=item.expanded_feedback,
+        )
+    return predicted
+
+
+def score_predictions(predicted: List[float], actual: List[float]) -> dict:
+    # d_hat is in rating points, goal diffs in goals; one least-squares scale maps the former onto the latter.
+    spread = sum(d * d for d in predicted)
+    scale = sum(d * y for d, y in zip(predicted, actual)) / spread if spread else 0.0
+    decided = [(d, y) for d, y in zip(predicted, actual) if y != 0]
+    return {
+        "matches": len(actual),
+        "mae": sum(abs(scale * d - y) for d, y in zip(predicted, actual)) / len(actual) if actual else 0.0,
+        "scale": scale,
+        "sign_accuracy": sum(1 for d, y in decided if d * y > 0) / len(decided) if decided else 0.0,
+    }
+
+
+def evaluate_config(history: List[HistoryMatch], cfg: Config) -> dict:
+    return score_predictions(replay_predictions(history, cfg), [item.goal_diff for item in history])
+
+
+def grid_configs(base: Config, values: Dict[str, Sequence[float]]) -> List[Config]:
+    names = list(values)
+    return [replace(base, **dict(zip(names, combo))) for combo in product(*(values[name] for name in names))]
+
+
+def random_configs(
+    base: Config,
+    count: int,
+    ranges: Dict[str, Tuple[float, float]] | None = None,
+    seed: int = 0,
+) -> List[Config]:
+    rnd = random.Random(seed)
+    ranges = ranges or SWEEP_RANGES
+    return [replace(base, **{name: rnd.uniform(low, high) for name, (low, high) in ranges.items()}) for _ in range(count)]
+
+
+def _init_worker(history: List[HistoryMatch]) -> None:
+    global _worker_history
+    _worker_history = history
+
+
+def _evaluate(cfg: Config) -> dict:
+    return evaluate_config(_worker_history, cfg)
+
+
+def run_sweep(history: List[HistoryMatch], configs: List[Config], workers: int = 1) -> List[Tuple[Config, dict]]:
+    # Ranked by MAE, best first; ties keep the order the configs were given in.
+    if workers <= 1 or len(configs) <= 1:
+        scores = [evaluate_config(history, cfg) for cfg in configs]
+    else:
+        chunksize = max(1, len(configs) // (workers * TASKS_PER_WORKER))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(history,)) as executor:
+            scores = list(executor.map(_evaluate, configs, chunksize=chunksize))
+    return sorted(zip(configs, scores), key=lambda item: item[1]["mae"])
+
+
+def format_table(ranked: List[Tuple[Config, dict]], names: Sequence[str], limit: int | None = None) -> str:
+    header = ["rank", "mae", "scale", "sign_acc", *names]
+    rows = [header]
+    for rank, (cfg, score) in enumerate(ranked[:limit], start=1):
+        values = [f"{getattr(cfg, name):g}" for name in names]
+        rows.append([str(rank), f"{score['mae']:.3f}", f"{score['scale']:.5f}", f"{score['sign_accuracy']:.2f}", *values])
+    widths = [max(len(row[col]) for row in rows) for col in range(len(header))]
+    return "\n".join("  ".join(cell.rjust(width) for cell, width in zip(row, widths)) for row in rows)
@@ -1,11 +1,34 @@
-from itertools import combinations
 from typing import List, Tuple
 
+import numpy as np
+
 from .config import Config
-from .interactions import domination_penalty, role_balance_penalty, synergy_penalty
-from .ratings import effective_rating
+from .constraints import (
+    Block,
+    TeamConstraints,
+    block_placements,
+    build_blocks,
+    constrained_masks,
+    count_constrained,
+    orient,
+    valid_masks,
+)
+from .engine import (
+    SplitContext,
+    build_split_context,
+    keep_best,
+    mask_to_names,
+    rank_masks,
+    score_indices,
+    score_masks,
+    split_components,
+    split_masks,
+    swap_components,
+)
+from .local_search import descent_masks, local_search_masks
+from .parallel import parallel_best_splits
+from .pruning import count_splits, splits_within
 from .types import ModelState
-from .utils import mean
 
 
 def _normalized_team(team_a: tuple[str, ...], team_b: tuple[str, ...]) -> tuple[tuple[str, ...], tuple[str, ...]]:
@@ -20,171 +43,286 @@ def _normalize_split(team_a: List[str], team_b: List[str]) -> Tuple[Tuple[str, .
     return _normalized_team(a, b)
 
 
-def _team_rating_map(model: ModelState, participants: List[str], venue: str, cfg: Config) -> dict[str, float]:
-    players = [model.players[name] for name in participants]
-    avg_rating = mean(effective_rating(p, venue, cfg) for p in players)
-    rating_map: dict[str, float] = {}
-    for name in participants:
-        player = model.players[name]
-        rating = effective_rating(player, venue, cfg)
-        rating_map[name] = min(rating, avg_rating) if player.is_guest else rating
-    return rating_map
+def evaluate_split(
+    model: ModelState,
+    team_a: List[str],
+    team_b: List[str],
+    venue: str,
+    ctx: SplitContext | None = None,
+) -> dict:
+    cfg: Config = model.config
+    # The guest cap and the top-k set are taken over the context's roster, so a context built for other
+    # players would score this split on the wrong averages.
+    if ctx is None or len(ctx.names) != len(team_a) + len(team_b) or not set(ctx.names).issuperset(team_a + team_b):
+        ctx = build_split_context(model, team_a + team_b, venue)
+    scored = score_indices(ctx, ctx.indices(team_a)[None, :], ctx.indices(team_b)[None, :], cfg)
+    return {
+        "team_a": list(team_a),
+        "team_b": list(team_b),
+        "d_hat": float(scored["d_hat"][0]),
+        "score": float(scored["score"][0]),
+        "components": {key: float(scored[key][0]) for key in ("syn", "dom", "role", "top")},
+    }
 
 
-def _top_penalty(team_a: List[str], team_b: List[str], rating_map: dict[str, float], cfg: Config) -> float:
-    top_k = max(0, cfg.teamgen_top_k)
-    if top_k <= 0:
-        return 0.0
-    top_players = {name for name, _ in sorted(rating_map.items(), key=lambda item: item[1], reverse=True)[:top_k]}
-    top_overflow = max(0, len(top_players.intersection(team_a)) - cfg.teamgen_top_max_per_team)
-    top_overflow += max(0, len(top_players.intersection(team_b)) - cfg.teamgen_top_max_per_team)
-    return top_overflow * cfg.teamgen_top_penalty
+SOLVERS = ("auto", "exhaustive", "pruned", "local")
 
 
-def evaluate_split(model: ModelState, team_a: List[str], team_b: List[str], venue: str) -> dict:
-    cfg: Config = model.config
-    participants = team_a + team_b
-    rating_map = _team_rating_map(model, participants, venue, cfg)
-    rating_a = sum(rating_map[p] for p in team_a)
-    rating_b = sum(rating_map[p] for p in team_b)
-    d_hat = rating_a - rating_b
-    syn_a = synergy_penalty(model.interactions, venue, team_a, cfg)
-    syn_b = synergy_penalty(model.interactions, venue, team_b, cfg)
-    dom = domination_penalty(model.interactions, venue, team_a, team_b, cfg)
-    role = role_balance_penalty(
-        {p.name: p.role_tendencies for p in model.all_players(participants)},
-        team_a,
-        team_b,
-        cfg,
-    )
-    top = _top_penalty(team_a, team_b, rating_map, cfg)
-    interaction_penalty = syn_a + syn_b + dom + role + top
-    score = abs(d_hat) + interaction_penalty
+CANDIDATE_POOL = 1024
+# The pruned solver streams the full space once its bounds let this share of all splits through, and starts
+# its threshold this far below the one a greedy descent guarantees.
+PRUNED_MAX_SHARE = 0.25
+PRUNED_START_DIVISOR = 64.0
+
+
+def _empty_splits() -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    return np.zeros(0, dtype=np.int64), np.zeros(0), np.zeros(0)
+
+
+def _stream_best_splits(
+    ctx: SplitContext,
+    cfg: Config,
+    keep: int,
+    blocks: List[Block] | None = None,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, bool]:
+    # Only the best `keep` splits survive each chunk, so memory stays flat however many splits there are.
+    n = len(ctx.names)
+    pool = _empty_splits()
+    complete = True
+    chunks = split_masks(n, n // 2) if blocks is None else constrained_masks(blocks, n // 2)
+    for chunk in chunks:
+        d_hat, score = score_masks(ctx, chunk, cfg)
+        merged = [np.concatenate(part) for part in zip(pool, (chunk, d_hat, score))]
+        complete = complete and len(merged[0]) <= keep
+        pool = keep_best(*merged, n, keep)
+    return (*pool, complete)
+
+
+def _candidate(ctx: SplitContext, mask: int, d_hat: float, score: float) -> dict:
+    team_a, team_b = mask_to_names(mask, ctx.names)
     return {
-        "team_a": list(team_a),
-        "team_b": list(team_b),
-        "d_hat": d_hat,
-        "score": score,
-        "components": {
-            "syn": syn_a + syn_b,
-            "dom": dom,
-            "role": role,
-            "top": top,
-        },
+        "team_a": team_a,
+        "team_b": team_b,
+        "d_hat": float(d_hat),
+        "score": float(score),
     }
 
 
-def generate_teams(model: ModelState, participants: List[str], venue: str, top_n: int = 3) -> List[dict]:
-    cfg: Config = model.config
-    rating_map = _team_rating_map(model, participants, venue, cfg)
-
-    def team_rating(name: str) -> float:
-        return rating_map[name]
-
-    participants_sorted = sorted(participants)
-    team_size = len(participants_sorted) // 2
-    base_anchor = participants_sorted[0]
-
-    candidates = []
-    for team_a in combinations(participants_sorted, team_size):
-        if base_anchor not in team_a:
-            continue
-        team_b = tuple(p for p in participants_sorted if p not in team_a)
-        team_a, team_b = _normalized_team(team_a, team_b)
-        rating_a = sum(team_rating(p) for p in team_a)
-        rating_b = sum(team_rating(p) for p in team_b)
-        diff = rating_a - rating_b
-        interaction_penalty = (
-            synergy_penalty(model.interactions, venue, list(team_a), cfg)
-            + synergy_penalty(model.interactions, venue, list(team_b), cfg)
-            + domination_penalty(model.interactions, venue, list(team_a), list(team_b), cfg)
-            + role_balance_penalty(
-                {p.name: p.role_tendencies for p in model.all_players(participants)},
-                list(team_a),
-                list(team_b),
-                cfg,
-            )
-            + _top_penalty(list(team_a), list(team_b), rating_map, cfg)
-        )
-        score = abs(diff) + interaction_penalty
-        candidates.append(
-            {
-                "team_a": list(team_a),
-                "team_b": list(team_b),
-                "d_hat": diff,
-                "score": score,
-            }
-        )
-
-    candidates.sort(key=lambda item: (item["score"], abs(item["d_hat"]), item["team_a"]))
-    selected = []
-    for candidate in candidates:
-        if not selected:
-            selected.append(candidate)
-            if len(selected) == top_n:
-                break
-            continue
-        ok = True
-        for chosen in selected:
-            overlap = len(set(candidate["team_a"]) & set(chosen["team_a"]))
-            min_diff = max(1, cfg.teamgen_overlap_min_diff)
-            if overlap > team_size - min_diff:
-                ok = False
-                break
-        if ok:
-            selected.append(candidate)
-            if len(selected) == top_n:
-                break
-    if len(selected) < top_n:
-        seen = {_normalize_split(c["team_a"], c["team_b"]) for c in selected}
-        for candidate in candidates:
-            norm = _normalize_split(candidate["team_a"], candidate["team_b"])
-            if norm in seen:
-                continue
-            selected.append(candidate)
-            seen.add(norm)
-            if len(selected) == top_n:
-                break
+def _select_diverse(masks: np.ndarray, team_size: int, top_n: int, cfg: Config) -> List[int]:
+    # Positions in the ranked masks; team A overlap is the popcount of the shared bits.
+    min_diff = max(1, cfg.teamgen_overlap_min_diff)
+    ranked = masks.tolist()
+    selected: List[int] = []
+    for idx, mask in enumerate(ranked):
+        if len(selected) == top_n:
+            break
+        if all((mask & ranked[chosen]).bit_count() <= team_size - min_diff for chosen in selected):
+            selected.append(idx)
     return selected
 
 
+def _ranked(ctx: SplitContext, masks: np.ndarray, d_hat: np.ndarray, score: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    order = rank_masks(masks, d_hat, score, len(ctx.names))
+    return masks[order], d_hat[order], score[order]
+
+
+def _exhaustive_splits(
+    ctx: SplitContext,
+    cfg: Config,
+    top_n: int,
+    workers: int = 1,
+    blocks: List[Block] | None = None,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # The pool is an exact prefix of the full ranking; it only has to grow when the diversity rule walks past its end.
+    n = len(ctx.names)
+    team_size = n // 2
+    parallel = blocks is None and workers > 1 and count_splits(n, team_size) >= cfg.teamgen_parallel_min_splits
+    keep = max(CANDIDATE_POOL, top_n)
+    while True:
+        if parallel:
+            masks, d_hat, score, complete = parallel_best_splits(ctx, cfg, keep, workers)
+        else:
+            masks, d_hat, score, complete = _stream_best_splits(ctx, cfg, keep, blocks)
+        if complete or len(_select_diverse(masks, team_size, top_n, cfg)) == top_n:
+            return masks, d_hat, score
+        keep *= 8
+
+
+def _pruned_threshold(
+    ctx: SplitContext,
+    cfg: Config,
+    top_n: int,
+    blocks: List[Block] | None = None,
+) -> float | None:
+    # Any N diverse splits bound the exhaustive diverse top-N from above, so a greedy descent's own top-N
+    # (or its worst split, when it found fewer) is a threshold the ranking prefix should settle within.
+    n = len(ctx.names)
+    placements = None if blocks is None else block_placements(blocks, n // 2, n)
+    masks = descent_masks(ctx, cfg, placements)
+    if blocks is not None:
+        masks = masks[valid_masks(blocks, masks)]
+    if len(masks) == 0:
+        return None
+    masks, _, score = _ranked(ctx, masks, *score_masks(ctx, masks, cfg))
+    selected = _select_diverse(masks, n // 2, top_n, cfg)
+    return float(score[selected[-1]] if len(selected) == top_n else score[-1])
+
+
+def _pruned_splits(
+    ctx: SplitContext,
+    cfg: Config,
+    top_n: int,
+    blocks: List[Block] | None = None,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # Splits scoring below the threshold form a prefix of the exhaustive ranking, so the threshold is raised
+    # until the diverse top-N is settled inside that prefix. When the bounds let too many splits through
+    # (equal ratings, say) the prefix is no cheaper than the whole space, which is then streamed instead.
+    n = len(ctx.names)
+    team_size = n // 2
+    total = count_splits(n, team_size)
+    cap = _pruned_threshold(ctx, cfg, top_n, blocks)
+    if cap is None:
+        return _exhaustive_splits(ctx, cfg, top_n, blocks=blocks)
+    # Descents stop well short of the best splits, so the search starts far below their bound and doubles up to it.
+    threshold = cap / PRUNED_START_DIVISOR if cap > 0 else cap
+    step = max(abs(cap), 1.0)
+    while True:
+        found = splits_within(ctx, cfg, threshold, int(total * PRUNED_MAX_SHARE))
+        if found is None:
+            return _exhaustive_splits(ctx, cfg, top_n, blocks=blocks)
+        masks, d_hat, score = found
+        covered = len(masks) == total
+        if blocks is not None:
+            keep = valid_masks(blocks, masks)
+            masks, d_hat, score = masks[keep], d_hat[keep], score[keep]
+        if covered:
+            return masks, d_hat, score
+        if len(_select_diverse(_ranked(ctx, masks, d_hat, score)[0], team_size, top_n, cfg)) == top_n:
+            return masks, d_hat, score
+        if threshold < cap:
+            threshold = min(cap, 2.0 * threshold)
+        else:
+            threshold += step
+            step *= 2.0
+
+
+def _local_splits(
+    ctx: SplitContext,
+    cfg: Config,
+    blocks: List[Block] | None = None,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    n = len(ctx.names)
+    if blocks is None:
+        masks = local_search_masks(ctx, cfg)
+    else:
+        # Restarts cycle through the block placements and only free players are swapped; neighbours
+        # archived along the way may still break a block, so the result is filtered once more.
+        masks = local_search_masks(ctx, cfg, placements=block_placements(blocks, n // 2, n))
+        masks = masks[valid_masks(blocks, masks)]
+    if len(masks) == 0:
+        return _empty_splits()
+    d_hat, score = score_masks(ctx, masks, cfg)
+    return masks, d_hat, score
+
+
+def _pick_variants(
+    ctx: SplitContext,
+    cfg: Config,
+    splits: Tuple[np.ndarray, np.ndarray, np.ndarray],
+    team_size: int,
+    top_n: int,
+) -> List[dict]:
+    masks, d_hat, score = _ranked(ctx, *splits)
+    selected = _select_diverse(masks, team_size, top_n, cfg)
+    # Not enough diverse variants: top up with the best remaining splits (every mask is a distinct split).
+    for idx in range(len(masks)):
+        if len(selected) >= top_n:
+            break
+        if idx not in selected:
+            selected.append(idx)
+    return [_candidate(ctx, int(masks[idx]), d_hat[idx], score[idx]) for idx in selected]
+
+
+def generate_teams(
+    model: ModelState,
+    participants: List[str],
+    venue: str,
+    top_n: int = 3,
+    solver: str = "auto",
+    ctx: SplitContext | None = None,
+    workers: int = 1,
+    constraints: TeamConstraints | None = None,
+) -> List[dict]:
+    cfg: Config = model.config
+    team_size = len(participants) // 2
+    if ctx is None:
+        ctx = build_split_context(model, participants, venue)
+    blocks = None
+    if constraints is not None and not constraints.is_empty():
+        # Constrained spaces are enumerated block by block while they are small; larger ones get the
+        # budgeted local search with the blocks kept intact.
+        blocks = build_blocks(ctx, constraints)
+        size = count_constrained(blocks, team_size)
+    else:
+        size = count_splits(len(ctx.names), team_size)
+    if solver == "auto":
+        solver = "local" if size > cfg.teamgen_exhaustive_max_splits else "exhaustive"
+    if solver == "exhaustive":
+        splits = _exhaustive_splits(ctx, cfg, top_n, workers, blocks)
+    elif solver == "pruned":
+        splits = _pruned_splits(ctx, cfg, top_n, blocks)
+    elif solver == "local":
+        splits = _local_splits(ctx, cfg, blocks)
+    else:
+        raise ValueError(f"unknown_solver: {solver}")
+
+    variants = _pick_variants(ctx, cfg, splits, team_size, top_n)
+    if blocks is None:
+        return variants
+    return [orient(candidate, constraints) for candidate in variants]
+
+
 def suggest_quick_swaps(
     model: ModelState,
     base_split: dict,
     other_splits: List[dict],
     venue: str,
     top_n: int = 3,
+    ctx: SplitContext | None = None,
 ) -> List[dict]:
-    base_eval = evaluate_split(model, base_split["team_a"], base_split["team_b"], venue)
+    cfg: Config = model.config
+    base_a = list(base_split["team_a"])
+    base_b = list(base_split["team_b"])
+    if ctx is None:
+        ctx = build_split_context(model, base_a + base_b, venue)
+    idx_a = ctx.indices(base_a)
+    idx_b = ctx.indices(base_b)
+    base = split_components(ctx, idx_a, idx_b, cfg)
+    base_score = abs(base["d_hat"]) + base["syn"] + base["dom"] + base["role"] + base["top"]
+    table = swap_components(ctx, idx_a, idx_b, cfg)
+
     forbidden = {_normalize_split(s["team_a"], s["team_b"]) for s in other_splits}
-    forbidden.add(_normalize_split(base_split["team_a"], base_split["team_b"]))
+    forbidden.add(_normalize_split(base_a, base_b))
 
     swaps = []
-    for a in base_split["team_a"]:
-        for b in base_split["team_b"]:
-            team_a = [p for p in base_split["team_a"] if p != a] + [b]
-            team_b = [p for p in base_split["team_b"] if p != b] + [a]
+    for i, a in enumerate(base_a):
+        for j, b in enumerate(base_b):
+            team_a = [p for p in base_a if p != a] + [b]
+            team_b = [p for p in base_b if p != b] + [a]
             if _normalize_split(team_a, team_b) in forbidden:
                 continue
-            eval_split = evaluate_split(model, team_a, team_b, venue)
-            score_delta = eval_split["score"] - base_eval["score"]
-            abs_diff_delta = abs(eval_split["d_hat"]) - abs(base_eval["d_hat"])
-            comp_delta = {
-                "syn": eval_split["components"]["syn"] - base_eval["components"]["syn"],
-                "dom": eval_split["components"]["dom"] - base_eval["components"]["dom"],
-                "role": eval_split["components"]["role"] - base_eval["components"]["role"],
-                "top": eval_split["components"]["top"] - base_eval["components"]["top"],
-            }
+            d_hat = float(table["d_hat"][i, j])
+            score = float(table["score"][i, j])
             swaps.append(
                 {
                     "swap": (a, b),
-                    "team_a": eval_split["team_a"],
-                    "team_b": eval_split["team_b"],
-                    "d_hat": eval_split["d_hat"],
-                    "score": eval_split["score"],
-                    "score_delta": score_delta,
-                    "abs_diff_delta": abs_diff_delta,
-                    "comp_delta": comp_delta,
+                    "team_a": team_a,
+                    "team_b": team_b,
+                    "d_hat": d_hat,
+                    "score": score,
+                    "score_delta": score - base_score,
+                    "abs_diff_delta": abs(d_hat) - abs(base["d_hat"]),
+                    "comp_delta": {key: float(table[key][i, j]) - base[key] for key in ("syn", "dom", "role", "top")},
                 }
             )
 
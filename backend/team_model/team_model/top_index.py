@@ -0,0 +1,64 @@
+from bisect import bisect_left, insort
+from typing import Dict, List, Tuple
+
+
+class RankedPartners:
+    # One player's partners kept sorted by value, so both ends answer top-k queries in O(k).
+    __slots__ = ("order", "values")
+
+    def __init__(self) -> None:
+        self.order: List[Tuple[float, str]] = []
+        self.values: Dict[str, float] = {}
+
+    def set(self, other: str, value: float) -> None:
+        old = self.values.get(other)
+        if old is not None:
+            del self.order[bisect_left(self.order, (old, other))]
+        self.values[other] = value
+        insort(self.order, (value, other))
+
+    def strongest(self, k: int) -> List[Tuple[str, float]]:
+        result = []
+        for value, other in reversed(self.order):
+            if value <= 0 or len(result) >= k:
+                break
+            result.append((other, value))
+        return result
+
+    def weakest(self, k: int) -> List[Tuple[str, float]]:
+        result = []
+        for value, other in self.order:
+            if value >= 0 or len(result) >= k:
+                break
+            result.append((other, value))
+        return result
+
+
+def view_value(table: dict, venues: Tuple[str, ...] | None, key) -> float:
+    # Sum of the pair over the view's venue keys (every key when venues is None), added in table order.
+    total = 0.0
+    for venue in venues if venues is not None else table:
+        value = table.get(venue, {}).get(key)
+        if value is not None:
+            total += value
+    return total
+
+
+def build_index(
+    table: dict, venues: Tuple[str, ...] | None, symmetric: bool, incoming: bool = False
+) -> Dict[str, RankedPartners]:
+    # Directed pairs are indexed under their first player, or under their second with `incoming`.
+    keys = set()
+    for venue in venues if venues is not None else table:
+        keys.update(table.get(venue, {}))
+    index: Dict[str, RankedPartners] = {}
+    for key in keys:
+        value = view_value(table, venues, key)
+        if symmetric:
+            a, b = sorted(key)
+        else:
+            a, b = key[::-1] if incoming else key
+        index.setdefault(a, RankedPartners()).set(b, value)
+        if symmetric:
+            index.setdefault(b, RankedPartners()).set(a, value)
+    return index
@@ -1,5 +1,11 @@
 from dataclasses import dataclass, field
-from typing import Dict, Iterable, List, Optional, Set
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from .top_index import RankedPartners, build_index, view_value
+
+GLOBAL_KEY = "__global__"
+# InteractionState folds its decay scale into the stored values before it gets this small.
+MIN_SCALE = 1e-6
 
 
 @dataclass(frozen=True)
@@ -98,6 +104,7 @@ class PlayerState:
     guest_matches: int = 0
     role_tendencies: Dict[str, float] = field(default_factory=dict)
     tier_bonus: float = 0.0
+    last_match: int = 0  # ModelState.match_count when the player last played
 
     def get_venue_rating(self, venue: str, default: float) -> float:
         return self.venue_ratings.get(venue, default + self.tier_bonus)
@@ -107,30 +114,256 @@ class PlayerState:
             self.venue_ratings[venue] = default + self.tier_bonus
 
 
+@dataclass
+class ChangeJournal:
+    # Filled by update_from_match_with_breakdown(..., journal=...): [before, after] for every rating
+    # (player, venue or GLOBAL_KEY) and every interaction (kind, venue, key) an update touched. Interaction
+    # entries are grouped by `source`, "match" for the result and "feedback" for what the answers added.
+    # One journal can span several updates; `before` is kept from the first change. Decay is not journaled:
+    # it only moves InteractionState.scale, so an entry's logged values are its values when it was touched.
+    ratings: Dict[Tuple[str, str], List[float]] = field(default_factory=dict)
+    interactions: Dict[str, Dict[tuple, List[float]]] = field(default_factory=dict)
+    source: str = "match"
+    # (kind, venue, key) -> last value of the pairs an online compaction removed for inactive players,
+    # for the caller to persist; the state itself no longer holds them.
+    archived: Dict[tuple, float] = field(default_factory=dict)
+
+    def record_rating(self, player: str, key: str, before: float, after: float) -> None:
+        entry = self.ratings.get((player, key))
+        if entry is None:
+            self.ratings[(player, key)] = [before, after]
+        else:
+            entry[1] = after
+
+    def record_interaction(self, kind: str, venue: str, key: object, before: float, after: float) -> None:
+        entries = self.interactions.setdefault(self.source, {})
+        entry = entries.get((kind, venue, key))
+        if entry is None:
+            entries[(kind, venue, key)] = [before, after]
+        else:
+            entry[1] = after
+
+    def interaction_changes(self, source: Optional[str] = None) -> Dict[tuple, Tuple[float, float]]:
+        # (kind, venue, key) -> (before, after) for one source, or across all of them in the order they ran.
+        sources = [source] if source is not None else list(self.interactions)
+        changes: Dict[tuple, Tuple[float, float]] = {}
+        for name in sources:
+            for key, (before, after) in self.interactions.get(name, {}).items():
+                changes[key] = (changes[key][0] if key in changes else before, after)
+        return changes
+
+
+def _add_in_order(tables: List[dict], items: List[tuple]) -> None:
+    if len({id(table) for table in tables}) < len(tables):
+        # The same dict listed twice must see each update twice in a row, as with one call per update.
+        for key, value in items:
+            for table in tables:
+                table[key] = table.get(key, 0.0) + value
+        return
+    for table in tables:
+        get = table.get
+        for key, value in items:
+            table[key] = get(key, 0.0) + value
+
+
 @dataclass
 class InteractionState:
     synergy: Dict[str, Dict[frozenset, float]] = field(default_factory=dict)
     domination: Dict[str, Dict[tuple, float]] = field(default_factory=dict)
+    # Pending decay shared by every entry: a value is its stored number times `scale`. decay() only moves the
+    # scale; fold_scale() and pickling write it into the tables, so loaded states always have scale 1.
+    scale: float = 1.0
+    # Blended venue + global values per venue in stored units, built on first use and kept in step by
+    # add_syn/add_dom. They are never pickled and are dropped whenever the blend weights change.
+    _effective_syn: Dict[str, Dict[frozenset, float]] = field(default_factory=dict, init=False, repr=False, compare=False)
+    _effective_dom: Dict[str, Dict[tuple, float]] = field(default_factory=dict, init=False, repr=False, compare=False)
+    _blend: Optional[Tuple[float, float]] = field(default=None, init=False, repr=False, compare=False)
+    # Per-player sorted partner lists keyed by (kind, venue keys or None for all), maintained the same way.
+    _top: Dict[tuple, Dict[str, RankedPartners]] = field(default_factory=dict, init=False, repr=False, compare=False)
+    # Set only while update_from_match_with_breakdown runs with a journal; never pickled either.
+    journal: Optional[ChangeJournal] = field(default=None, init=False, repr=False, compare=False)
 
     def get_syn(self, venue: str, player_a: str, player_b: str) -> float:
-        return self.synergy.get(venue, {}).get(frozenset({player_a, player_b}), 0.0)
+        return self.synergy.get(venue, {}).get(frozenset({player_a, player_b}), 0.0) * self.scale
 
     def add_syn(self, venue: str, player_a: str, player_b: str, value: float) -> None:
-        if player_a == player_b:
+        self.add_syn_many((venue,), ((player_a, player_b, value),))
+
+    def add_syn_many(self, venues: Tuple[str, ...], updates: Iterable[Tuple[str, str, float]]) -> None:
+        # Adds every (player_a, player_b, value) to each venue key in order, building each pair key once;
+        # derived tables are refreshed once per touched pair at the end.
+        items = self._stored([(frozenset((a, b)), value) for a, b, value in updates if a != b])
+        if not items:
             return
-        self.synergy.setdefault(venue, {})
-        key = frozenset({player_a, player_b})
-        self.synergy[venue][key] = self.synergy[venue].get(key, 0.0) + value
+        tables = [self.synergy.setdefault(venue, {}) for venue in venues]
+        before = self._journal_before(tables, items)
+        _add_in_order(tables, items)
+        if before is not None:
+            self._journal_after("synergy", venues, tables, before)
+        if self._effective_syn or self._top:
+            self._refresh_syn(venues, {key: tuple(sorted(key)) for key, _ in items})
+
+    def _refresh_syn(self, venues: Tuple[str, ...], touched: Dict[frozenset, Tuple[str, str]]) -> None:
+        built = {name for venue in venues for name in self._touched(self._effective_syn, venue)}
+        for name in built:
+            table = self._effective_syn[name]
+            for key, (player_a, player_b) in touched.items():
+                table[key] = self._blend_syn(name, player_a, player_b)
+        for (kind, view), index in self._top.items():
+            if kind == "synergy" and (view is None or any(venue in view for venue in venues)):
+                for key, (player_a, player_b) in touched.items():
+                    value = view_value(self.synergy, view, key)
+                    index.setdefault(player_a, RankedPartners()).set(player_b, value)
+                    index.setdefault(player_b, RankedPartners()).set(player_a, value)
 
     def get_dom(self, venue: str, dominator: str, dominated: str) -> float:
-        return self.domination.get(venue, {}).get((dominator, dominated), 0.0)
+        return self.domination.get(venue, {}).get((dominator, dominated), 0.0) * self.scale
 
     def add_dom(self, venue: str, dominator: str, dominated: str, value: float) -> None:
-        if dominator == dominated:
+        self.add_dom_many((venue,), ((dominator, dominated, value),))
+
+    def add_dom_many(self, venues: Tuple[str, ...], updates: Iterable[Tuple[str, str, float]]) -> None:
+        items = self._stored([((a, b), value) for a, b, value in updates if a != b])
+        if not items:
             return
-        self.domination.setdefault(venue, {})
+        tables = [self.domination.setdefault(venue, {}) for venue in venues]
+        before = self._journal_before(tables, items)
+        _add_in_order(tables, items)
+        if before is not None:
+            self._journal_after("domination", venues, tables, before)
+        if self._effective_dom or self._top:
+            self._refresh_dom(venues, {key for key, _ in items})
+
+    def _refresh_dom(self, venues: Tuple[str, ...], touched: set) -> None:
+        built = {name for venue in venues for name in self._touched(self._effective_dom, venue)}
+        for name in built:
+            table = self._effective_dom[name]
+            for key in touched:
+                table[key] = self._blend_dom(name, *key)
+        for (kind, view), index in self._top.items():
+            if kind in ("domination", "dominated_by") and (view is None or any(venue in view for venue in venues)):
+                for dominator, dominated in touched:
+                    value = view_value(self.domination, view, (dominator, dominated))
+                    if kind == "domination":
+                        index.setdefault(dominator, RankedPartners()).set(dominated, value)
+                    else:
+                        index.setdefault(dominated, RankedPartners()).set(dominator, value)
+
+    def _stored(self, items: List[tuple]) -> List[tuple]:
+        # Added amounts are divided by the pending scale, so they read back at their full size.
+        if self.scale == 1.0:
+            return items
+        return [(key, value / self.scale) for key, value in items]
+
+    def _journal_before(self, tables: List[dict], items: List[tuple]) -> Optional[List[Dict[object, float]]]:
+        if self.journal is None:
+            return None
+        return [{key: table.get(key, 0.0) * self.scale for key, _ in items} for table in tables]
+
+    def _journal_after(self, kind: str, venues: Tuple[str, ...], tables: List[dict], before: List[Dict[object, float]]) -> None:
+        for venue, table, values in zip(venues, tables, before):
+            for key, value in values.items():
+                self.journal.record_interaction(kind, venue, key, value, table[key] * self.scale)
+
+    def _touched(self, tables: dict, venue: str) -> List[str]:
+        # A global entry feeds every venue's blend; a venue entry only its own.
+        return list(tables) if venue == GLOBAL_KEY else [venue] if venue in tables else []
+
+    def _blend_syn(self, venue: str, player_a: str, player_b: str) -> float:
+        venue_weight, global_weight = self._blend
+        key = frozenset({player_a, player_b})
+        return venue_weight * self.synergy.get(venue, {}).get(key, 0.0) + global_weight * self.synergy.get(GLOBAL_KEY, {}).get(key, 0.0)
+
+    def _blend_dom(self, venue: str, dominator: str, dominated: str) -> float:
+        venue_weight, global_weight = self._blend
         key = (dominator, dominated)
-        self.domination[venue][key] = self.domination[venue].get(key, 0.0) + value
+        return venue_weight * self.domination.get(venue, {}).get(key, 0.0) + global_weight * self.domination.get(GLOBAL_KEY, {}).get(key, 0.0)
+
+    def _use_blend(self, venue_weight: float, global_weight: float) -> None:
+        if self._blend != (venue_weight, global_weight):
+            self.invalidate_effective()
+            self._blend = (venue_weight, global_weight)
+
+    def effective_syn(self, venue: str, venue_weight: float, global_weight: float) -> Dict[frozenset, float]:
+        # In stored units, like the tables: multiply by `scale` for the current value.
+        self._use_blend(venue_weight, global_weight)
+        table = self._effective_syn.get(venue)
+        if table is None:
+            keys = set(self.synergy.get(venue, {})) | set(self.synergy.get(GLOBAL_KEY, {}))
+            table = {key: self._blend_syn(venue, *sorted(key)) for key in keys}
+            self._effective_syn[venue] = table
+        return table
+
+    def effective_dom(self, venue: str, venue_weight: float, global_weight: float) -> Dict[tuple, float]:
+        self._use_blend(venue_weight, global_weight)
+        table = self._effective_dom.get(venue)
+        if table is None:
+            keys = set(self.domination.get(venue, {})) | set(self.domination.get(GLOBAL_KEY, {}))
+            table = {key: self._blend_dom(venue, *key) for key in keys}
+            self._effective_dom[venue] = table
+        return table
+
+    def top_partners(self, kind: str, player: str, venues: Optional[Tuple[str, ...]], k: int) -> dict:
+        # Strongest positive and negative synergy partners summed over `venues`; for "domination" the players
+        # `player` dominates (outgoing pairs), for "dominated_by" the players who dominate `player` (incoming).
+        if (kind, venues) not in self._top:
+            table = self.synergy if kind == "synergy" else self.domination
+            self._top[(kind, venues)] = build_index(table, venues, symmetric=kind == "synergy", incoming=kind == "dominated_by")
+        ranked = self._top[(kind, venues)].get(player)
+        if ranked is None:
+            return {"positive": [], "negative": []}
+        # The scale is positive, so the stored order is the current order.
+        return {
+            "positive": [(other, value * self.scale) for other, value in ranked.strongest(k)],
+            "negative": [(other, value * self.scale) for other, value in ranked.weakest(k)],
+        }
+
+    def decay(self, factor: float) -> None:
+        # Every entry fades by `factor` in O(1): the derived tables are left alone, and nothing reaches the
+        # journal or the interaction logs, which only see values as they are when an entry is touched.
+        self.scale *= factor
+        if self.scale < MIN_SCALE:
+            self.fold_scale()
+
+    def fold_scale(self) -> None:
+        if self.scale == 1.0:
+            return
+        for table in (self.synergy, self.domination):
+            for pairs in table.values():
+                for key in pairs:
+                    pairs[key] *= self.scale
+        self.scale = 1.0
+        self.invalidate_effective()
+
+    def invalidate_effective(self) -> None:
+        # Needed after editing `synergy`/`domination` directly instead of through add_syn/add_dom.
+        self._effective_syn = {}
+        self._effective_dom = {}
+        self._top = {}
+
+    def __getstate__(self) -> dict:
+        # Synergy keys are stored as sorted name pairs: a frozenset's iteration order depends on the string
+        # hash seed and insertion history, so pickling it directly is not byte-stable across replays.
+        scale = self.scale
+        synergy = {venue: [(*sorted(key), value * scale) for key, value in pairs.items()] for venue, pairs in self.synergy.items()}
+        domination = self.domination
+        if scale != 1.0:
+            domination = {venue: {key: value * scale for key, value in pairs.items()} for venue, pairs in domination.items()}
+        return {"synergy": synergy, "domination": domination}
+
+    def __setstate__(self, state: dict) -> None:
+        synergy = state["synergy"]
+        for venue, pairs in synergy.items():
+            if isinstance(pairs, list):
+                synergy[venue] = {frozenset((a, b)): value for a, b, value in pairs}
+        self.synergy = synergy
+        self.domination = state["domination"]
+        self.scale = 1.0
+        self._effective_syn = {}
+        self._effective_dom = {}
+        self._blend = None
+        self._top = {}
+        self.journal = None
 
 
 @dataclass
@@ -139,6 +372,7 @@ class ModelState:
     interactions: InteractionState
     config: object
     tier_bonus: Dict[str, float] = field(default_factory=dict)
+    match_count: int = 0
 
     @classmethod
     def empty(cls, config: object) -> "ModelState":
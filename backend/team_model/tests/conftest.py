@@ -0,0 +1,97 @@
+import random
+
+import pytest
+
+from team_model import Config, ExpandedFeedback, Match, MatchEvent, ModelState, QuickFeedback, Segment
+from team_model.types import AnchorVote, DominationFeedback, FanResponse, PairwiseComparison, PlayerState, SynergyFeedback
+
+
+def _random_match(
+    rnd: random.Random,
+    names: list[str],
+    venues: tuple[str, ...] = ("V1", "V2"),
+    goals: tuple[int, int] | None = None,
+    total_goals: int | None = None,
+    events: bool = False,
+) -> Match:
+    # Ten of `names`, five a side, one segment. `total_goals` fixes the sum and draws only team A's share;
+    # otherwise each side scores 0-5 unless `goals` is given.
+    players = rnd.sample(names, 10)
+    if goals is not None:
+        goals_a, goals_b = goals
+    elif total_goals is not None:
+        goals_a = rnd.randint(0, total_goals)
+        goals_b = total_goals - goals_a
+    else:
+        goals_a, goals_b = rnd.randint(0, 5), rnd.randint(0, 5)
+    played = []
+    if events:
+        played = [
+            MatchEvent(player=players[0], team="A", event_type="assist", segment_index=0),
+            MatchEvent(player=players[1], team="A", event_type="goal", segment_index=0),
+        ]
+    return Match(
+        venue=rnd.choice(venues) if len(venues) > 1 else venues[0],
+        team_a=players[:5],
+        team_b=players[5:],
+        segments=[Segment(goals_a=goals_a, goals_b=goals_b, segment_index=0)],
+        events=played,
+    )
+
+
+def _random_history(seed: int, count: int = 25) -> list[tuple]:
+    # (match, quick feedback, expanded feedback or None) items over 14 regulars and a guest: two segments
+    # with a butt game, a goal event and every kind of feedback the replay reads.
+    rnd = random.Random(seed)
+    names = [f"P{i}" for i in range(14)]
+    items = []
+    for _ in range(count):
+        players = rnd.sample(names + ["Guest"], 10)
+        match = Match(
+            venue=rnd.choice(["V1", "V2"]),
+            team_a=players[:5],
+            team_b=players[5:],
+            segments=[
+                Segment(goals_a=rnd.randint(0, 3), goals_b=rnd.randint(0, 3), segment_index=0),
+                Segment(goals_a=rnd.randint(0, 3), goals_b=rnd.randint(0, 3), segment_index=1, is_butt_game=True),
+            ],
+            events=[MatchEvent(player=players[0], team="A", event_type="goal", segment_index=1)],
+            guests={"Guest"},
+        )
+        quick = QuickFeedback(
+            anchors={players[1]: AnchorVote(mvp=1)},
+            pairwise=[PairwiseComparison(stronger=players[2], weaker=players[7])],
+            fan_responses=[FanResponse(player=players[3], polarity=1)],
+        )
+        expanded = ExpandedFeedback(
+            synergies=[SynergyFeedback(player_a=players[0], player_b=players[1])],
+            dominations=[DominationFeedback(dominator=players[5], dominated=players[0], value=0.5)],
+        )
+        items.append((match, quick, expanded if rnd.random() < 0.5 else None))
+    return items
+
+
+def _rated_model(cfg: Config, size: int, seed: int | None = None) -> tuple[ModelState, list[str]]:
+    # Players P00.. with one V1 rating each: drawn from 850-1200 with `seed`, else a fixed spread over 900-1455.
+    rnd = random.Random(seed)
+    model = ModelState.empty(cfg)
+    names = [f"P{i:02d}" for i in range(size)]
+    for i, name in enumerate(names):
+        rating = rnd.uniform(850.0, 1200.0) if seed is not None else 900.0 + 37.0 * ((i * 7) % size)
+        model.players[name] = PlayerState(name, rating, {"V1": rating})
+    return model, names
+
+
+@pytest.fixture
+def random_match():
+    return _random_match
+
+
+@pytest.fixture
+def random_history():
+    return _random_history
+
+
+@pytest.fixture
+def rated_model():
+    return _rated_model
@@ -0,0 +1,40 @@
+import json
+
+import pytest
+
+from scripts.backtest_history import check_budgets, main
+from team_model import Config
+from team_model.backtest import backtest, calibration, history_from_rows, history_to_rows
+from team_model.sweep import load_history, replay_predictions
+
+
+def test_rows_round_trip_through_json(random_history):
+    items = random_history(1)
+    assert history_from_rows(json.loads(json.dumps(history_to_rows(items)))) == items
+
+
+def test_backtest_predicts_from_pre_match_state(random_history):
+    history = load_history(random_history(2))
+    report = backtest(history)
+    assert report["predictions"] == pytest.approx(replay_predictions(history, Config()))
+    assert report["matches"] == len(history) == sum(row["matches"] for row in report["calibration"])
+    assert report["predict_ms"] > 0 and report["update_ms"] > 0
+
+
+def test_calibration_turns_margins_towards_favourite():
+    rows = calibration([10.0, -30.0, -40.0, 300.0], [1.0, 2.0, -1.0, 0.0])
+    buckets = [(row["low"], row["high"], row["matches"]) for row in rows]
+    assert buckets == [(0.0, 25.0, 1), (25.0, 50.0, 2), (200.0, None, 1)]
+    assert rows[1]["mean_margin"] == pytest.approx(-0.5) and rows[1]["favourite_won"] == 0.5
+    assert rows[2]["draws"] == 1.0
+
+
+def test_script_reports_and_enforces_budgets(tmp_path, capsys, random_history):
+    dataset = tmp_path / "history.json"
+    dataset.write_text(json.dumps(history_to_rows(random_history(3))), encoding="utf-8")
+    assert main([str(dataset)]) == 0
+    assert "25 matches" in capsys.readouterr().out
+    assert main([str(dataset), "--max-mae", "0"]) == 1
+    report = {"mae": 1.0, "predict_ms": 1.0, "update_ms": 1.0}
+    assert check_budgets(report, 2.0, 5.0) == []
+    assert len(check_budgets(report, 0.5, 1.0)) == 2
@@ -0,0 +1,41 @@
+import random
+
+from team_model import Config
+from team_model.dense import DenseInteractionState
+from team_model.interactions import GLOBAL_KEY, _combined_syn, add_dominations, add_domination, add_synergies, add_synergy
+from team_model.types import InteractionState
+
+
+def _updates(seed: int) -> list[tuple[str, str, float]]:
+    rnd = random.Random(seed)
+    names = [f"P{i}" for i in range(6)]
+    return [(rnd.choice(names), rnd.choice(names), rnd.choice([0.1, 0.3, -0.7, 1.1])) for _ in range(60)]
+
+
+def test_batches_match_one_call_per_update():
+    cfg = Config()
+    single, batched, dense = InteractionState(), InteractionState(), DenseInteractionState()
+    _combined_syn(batched, "V1", "P0", "P1", cfg)
+    batched.top_partners("synergy", "P0", None, 3)
+    for seed in range(5):
+        syn, dom = _updates(seed), _updates(seed + 100)
+        for a, b, value in syn:
+            add_synergy(single, "V1", a, b, value)
+        for a, b, value in dom:
+            add_domination(single, "V1", a, b, value)
+        for state in (batched, dense):
+            add_synergies(state, "V1", syn)
+            add_dominations(state, "V1", dom)
+
+    assert batched == single
+    assert [list(pairs) for pairs in batched.synergy.values()] == [list(pairs) for pairs in single.synergy.values()]
+    assert dense.to_sparse() == single
+    assert _combined_syn(batched, "V1", "P0", "P1", cfg) == _combined_syn(single, "V1", "P0", "P1", cfg)
+    assert batched.top_partners("synergy", "P0", None, 3) == single.top_partners("synergy", "P0", None, 3)
+
+    same_dict, reference = InteractionState(), InteractionState()
+    same_dict.add_syn_many((GLOBAL_KEY, GLOBAL_KEY), _updates(9))
+    for a, b, value in _updates(9):
+        reference.add_syn(GLOBAL_KEY, a, b, value)
+        reference.add_syn(GLOBAL_KEY, a, b, value)
+    assert same_dict == reference
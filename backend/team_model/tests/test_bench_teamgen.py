@@ -0,0 +1,14 @@
+from scripts.bench_teamgen import build_state, check_budgets, run_case
+
+
+def test_synthetic_state_covers_requested_venues():
+    model, names = build_state(12, 0.5, 3)
+    assert len(names) == 12
+    assert all(len(model.players[name].venue_ratings) == 3 for name in names)
+
+
+def test_budget_regressions_are_reported():
+    results = {10: run_case(10, 0.3, 1, runs=2)}
+    assert set(results[10]) == {"generate_teams", "evaluate_split", "suggest_quick_swaps"}
+    assert check_budgets(results, {"generate_teams": 1e6}) == []
+    assert len(check_budgets(results, {"generate_teams": 0.0, "evaluate_split": 0.0})) == 2
@@ -0,0 +1,92 @@
+import copy
+import random
+
+import pytest
+
+from team_model import ChangeJournal, Config, Match, ModelState
+from team_model.dense import DenseInteractionState
+from team_model.learning import update_from_match_with_breakdown
+from team_model.types import GLOBAL_KEY, ExpandedFeedback, FanResponse, SynergyFeedback
+
+
+def _feedback(rnd: random.Random, match: Match) -> ExpandedFeedback:
+    a, b = rnd.sample(match.participants, 2)
+    return ExpandedFeedback(
+        fan_responses=[FanResponse(player=a, polarity=-1, interaction_type="domination", related_player=b)],
+        synergies=[SynergyFeedback(player_a=a, player_b=b, value=1.0)],
+    )
+
+
+def _diff(before: ModelState, after: ModelState) -> dict:
+    # Current values (stored times the lazy decay scale); rounding-level differences are not changes.
+    changes = {}
+    for kind in ("synergy", "domination"):
+        prev, post = getattr(before.interactions, kind), getattr(after.interactions, kind)
+        for venue in set(prev) | set(post):
+            for key in set(prev.get(venue, {})) | set(post.get(venue, {})):
+                old = prev.get(venue, {}).get(key, 0.0) * before.interactions.scale
+                new = post.get(venue, {}).get(key, 0.0) * after.interactions.scale
+                if abs(old - new) > 1e-12:
+                    changes[(kind, venue, key)] = (old, new)
+    return changes
+
+
+def _changed(journal: ChangeJournal, source: str | None = None) -> dict:
+    return {key: pair for key, pair in journal.interaction_changes(source).items() if abs(pair[0] - pair[1]) > 1e-12}
+
+
+def _same(journaled: dict, diffed: dict) -> bool:
+    return journaled.keys() == diffed.keys() and all(
+        journaled[key] == pytest.approx(diffed[key], abs=1e-12) for key in diffed
+    )
+
+
+@pytest.mark.parametrize("online", [False, True])
+def test_journal_matches_copy_and_diff(online, random_match):
+    rnd = random.Random(5)
+    names = [f"P{i}" for i in range(14)]
+    cfg = Config(
+        interaction_compact_online=online,
+        interaction_decay_per_match=0.95,
+        interaction_prune_epsilon=0.05,
+        interaction_compact_every=7,
+    )
+    state = ModelState.empty(cfg)
+    for _ in range(40):
+        match = random_match(rnd, names, total_goals=4, events=True)
+        feedback = _feedback(rnd, match) if rnd.random() < 0.5 else None
+        match_only = copy.deepcopy(state)
+        update_from_match_with_breakdown(match_only, match)
+        before = copy.deepcopy(state)
+        journal = ChangeJournal()
+        deltas, _ = update_from_match_with_breakdown(state, match, expanded_feedback=feedback, journal=journal)
+
+        # The per-match decay only moves the lazy scale and is never journaled; everything after it is.
+        decayed = copy.deepcopy(before)
+        if online:
+            decayed.interactions.decay(cfg.interaction_decay_per_match)
+        assert _same(_changed(journal), _diff(decayed, state))
+        assert _same(_changed(journal, "match"), _diff(decayed, match_only))
+        assert _same(_changed(journal, "feedback"), _diff(match_only, state))
+        assert state.interactions.journal is None and journal.source == "match"
+        for name in deltas:
+            pre = before.players[name].global_rating if name in before.players else cfg.global_start_rating
+            assert journal.ratings[(name, GLOBAL_KEY)] == [pre, state.players[name].global_rating]
+            assert journal.ratings[(name, match.venue)][1] == state.players[name].venue_ratings[match.venue]
+
+
+def test_journal_spans_updates_and_needs_dict_interactions(random_match):
+    rnd = random.Random(8)
+    names = [f"P{i}" for i in range(10)]
+    state = ModelState.empty(Config())
+    before = copy.deepcopy(state)
+    journal = ChangeJournal()
+    for _ in range(5):
+        update_from_match_with_breakdown(state, random_match(rnd, names, total_goals=4, events=True), journal=journal)
+    assert _changed(journal) == _diff(before, state)
+    assert journal.ratings[("P0", GLOBAL_KEY)] == [Config().global_start_rating, state.players["P0"].global_rating]
+
+    dense = ModelState.empty(Config())
+    dense.interactions = DenseInteractionState()
+    with pytest.raises(TypeError):
+        update_from_match_with_breakdown(dense, random_match(rnd, names, total_goals=4, events=True), journal=ChangeJournal())
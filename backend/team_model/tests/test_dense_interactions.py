@@ -0,0 +1,57 @@
+import pickle
+import random
+
+import numpy as np
+
+from team_model import Config, ModelState
+from team_model.dense import DenseInteractionState
+from team_model.engine import build_split_context
+from team_model.interactions import add_domination, add_synergy
+from team_model.types import InteractionState, PlayerState
+
+
+def _random_ops(seed: int, names: list[str]):
+    rnd = random.Random(seed)
+    ops = []
+    for _ in range(300):
+        a, b = rnd.choice(names), rnd.choice(names)
+        ops.append((rnd.choice(["syn", "dom"]), rnd.choice(["V1", "V2"]), a, b, rnd.choice([-1.0, -0.5, 0.5, 1.0])))
+    return ops
+
+
+def test_dense_matches_dict_api_and_round_trips():
+    names = [f"P{i:02d}" for i in range(40)]
+    sparse, dense = InteractionState(), DenseInteractionState()
+    for kind, venue, a, b, value in _random_ops(3, names):
+        for state in (sparse, dense):
+            (add_synergy if kind == "syn" else add_domination)(state, venue, a, b, value)
+
+    for venue in ("V1", "V2", "__global__", "missing"):
+        for a in names[:12] + ["ghost"]:
+            for b in names[:12]:
+                assert dense.get_syn(venue, a, b) == sparse.get_syn(venue, a, b)
+                assert dense.get_dom(venue, a, b) == sparse.get_dom(venue, a, b)
+
+    assert DenseInteractionState.from_sparse(sparse).to_sparse() == sparse
+    assert dense.to_sparse() == sparse
+    assert pickle.loads(pickle.dumps(dense)).to_sparse() == sparse
+
+
+def test_matrix_view_builds_identical_split_context():
+    rnd = random.Random(5)
+    model = ModelState.empty(Config())
+    names = [f"P{i:02d}" for i in range(14)]
+    for name in names:
+        rating = rnd.uniform(900.0, 1150.0)
+        model.players[name] = PlayerState(name, rating, {"V1": rating})
+    for kind, venue, a, b, value in _random_ops(8, names):
+        (add_synergy if kind == "syn" else add_domination)(model.interactions, venue, a, b, value)
+    model.interactions.decay(0.5)
+
+    matrix = DenseInteractionState.from_sparse(model.interactions)
+    roster = names[:10] + ["P99"]
+    model.players["P99"] = PlayerState("P99", 1000.0, {"V1": 1000.0})
+    expected = build_split_context(model, roster, "V1")
+    actual = build_split_context(model, roster, "V1", matrix)
+    assert np.allclose(expected.syn, actual.syn)
+    assert np.allclose(expected.dom, actual.dom)
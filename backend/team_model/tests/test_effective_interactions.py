@@ -0,0 +1,51 @@
+import pickle
+import random
+
+from team_model import Config
+from team_model.interactions import GLOBAL_KEY, _combined_dom, _combined_syn, add_domination, add_synergy
+from team_model.types import InteractionState
+
+
+def _blend(interactions: InteractionState, venue: str, a: str, b: str, cfg: Config) -> tuple[float, float]:
+    syn = cfg.rating_eff_venue_weight * interactions.get_syn(venue, a, b) + cfg.rating_eff_global_weight * interactions.get_syn(
+        GLOBAL_KEY, a, b
+    )
+    dom = cfg.rating_eff_venue_weight * interactions.get_dom(venue, a, b) + cfg.rating_eff_global_weight * interactions.get_dom(
+        GLOBAL_KEY, a, b
+    )
+    return syn, dom
+
+
+def test_effective_tables_follow_incremental_updates_and_weights():
+    rnd = random.Random(4)
+    names = [f"P{i}" for i in range(8)]
+    interactions = InteractionState()
+    cfg = Config()
+    for step in range(200):
+        a, b = rnd.sample(names, 2)
+        venue = rnd.choice(["V1", "V2"])
+        if rnd.random() < 0.5:
+            add_synergy(interactions, venue, a, b, rnd.choice([-1.0, 0.5, 1.0]))
+        else:
+            add_domination(interactions, venue, a, b, rnd.choice([-0.5, 1.0]))
+        if step == 100:
+            cfg = Config(rating_eff_venue_weight=0.8, rating_eff_global_weight=0.2)
+        a, b = rnd.sample(names, 2)
+        for check in ("V1", "V2", "V3"):
+            expected = _blend(interactions, check, a, b, cfg)
+            assert (_combined_syn(interactions, check, a, b, cfg), _combined_dom(interactions, check, a, b, cfg)) == expected
+
+    copy = pickle.loads(pickle.dumps(interactions))
+    assert copy == interactions
+    assert copy._effective_syn == {} and copy._blend is None
+
+
+def test_direct_edits_need_invalidation():
+    cfg = Config()
+    interactions = InteractionState()
+    add_synergy(interactions, "V1", "a", "b", 1.0)
+    before = _combined_syn(interactions, "V1", "a", "b", cfg)
+    interactions.synergy["V1"][frozenset({"a", "b"})] = 3.0
+    interactions.invalidate_effective()
+    assert _combined_syn(interactions, "V1", "a", "b", cfg) != before
+    assert _combined_syn(interactions, "V1", "a", "b", cfg) == _blend(interactions, "V1", "a", "b", cfg)[0]
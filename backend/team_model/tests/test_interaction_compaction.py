@@ -0,0 +1,89 @@
+import pickle
+import random
+
+from team_model import ChangeJournal, Config, ModelState
+from team_model.compaction import compact_interactions, compact_online, compact_state
+from team_model.interactions import add_domination, add_synergy
+from team_model.learning import update_from_match, update_from_match_with_breakdown
+
+
+def _entries(model: ModelState) -> int:
+    tables = (model.interactions.synergy, model.interactions.domination)
+    return sum(len(pairs) for table in tables for pairs in table.values())
+
+
+def test_decay_prunes_small_entries_and_reports_counts():
+    model = ModelState.empty(Config())
+    add_synergy(model.interactions, "V1", "a", "b", 1.0)
+    add_synergy(model.interactions, "V1", "a", "c", 0.1)
+    add_domination(model.interactions, "V1", "a", "b", 0.3)
+    report = compact_interactions(model.interactions, factor=0.5, epsilon=0.1)
+    assert report.as_dict() == {"decayed": 6, "pruned": 2, "archived": 0, "removed": 2}
+    assert model.interactions.get_syn("V1", "a", "b") == 0.5
+    assert model.interactions.get_dom("__global__", "a", "b") == 0.15
+    assert model.interactions.get_syn("V1", "a", "c") == 0.0
+
+
+def test_online_compaction_bounds_state_with_guest_churn(random_match):
+    rnd = random.Random(2)
+    regulars = [f"R{i}" for i in range(12)]
+    plain = ModelState.empty(Config())
+    cfg = Config(
+        interaction_compact_online=True,
+        interaction_decay_per_match=0.9,
+        interaction_prune_epsilon=0.05,
+        interaction_inactive_matches=10,
+    )
+    compacted = ModelState.empty(cfg)
+    for idx in range(120):
+        names = regulars + [f"G{idx}-{k}" for k in range(4)]
+        match = random_match(rnd, names, venues=("V1",), total_goals=3)
+        update_from_match(plain, match)
+        update_from_match(compacted, match)
+    assert _entries(compacted) < _entries(plain) / 2
+    assert not any(name.startswith("G1-") for pairs in compacted.interactions.synergy.values() for key in pairs for name in key)
+
+    report = compact_state(compacted)
+    assert report.decayed == 0 and report.archived == 0
+    assert compact_state(ModelState.empty(Config())).as_dict()["removed"] == 0
+
+
+def test_online_decay_is_a_lazy_scale_until_the_periodic_pass():
+    cfg = Config(interaction_compact_online=True, interaction_decay_per_match=0.5, interaction_compact_every=3)
+    model = ModelState.empty(cfg)
+    add_synergy(model.interactions, "V1", "a", "b", 1.0)
+    add_domination(model.interactions, "V1", "a", "b", 0.4)
+    effective = model.interactions.effective_syn("V1", 1.0, 0.0)
+    stored = dict(model.interactions.synergy["V1"])
+
+    model.match_count = 1
+    assert compact_online(model) is None
+    assert model.interactions.synergy["V1"] == stored and model.interactions.effective_syn("V1", 1.0, 0.0) is effective
+    add_synergy(model.interactions, "V1", "a", "b", 1.0)
+    assert model.interactions.get_syn("V1", "a", "b") == 1.5
+    assert model.interactions.top_partners("synergy", "a", ("V1",), 1)["positive"] == [("b", 1.5)]
+    restored = pickle.loads(pickle.dumps(model))
+    assert restored.interactions.scale == 1.0 and restored.interactions.get_syn("V1", "a", "b") == 1.5
+
+    model.match_count = 3
+    report = compact_online(model)
+    assert report.decayed == 4 and model.interactions.scale == 1.0
+    assert model.interactions.get_syn("V1", "a", "b") == 0.75
+    assert model.interactions.get_dom("V1", "a", "b") == 0.1
+
+
+def test_online_pass_hands_archived_pairs_to_the_journal(random_match):
+    rnd = random.Random(4)
+    regulars = [f"R{i}" for i in range(8)]
+    cfg = Config(interaction_compact_online=True, interaction_compact_every=5, interaction_inactive_matches=3)
+    model = ModelState.empty(cfg)
+    archived = {}
+    for idx in range(10):
+        journal = ChangeJournal()
+        names = regulars + [f"G{idx}-{k}" for k in range(2)]
+        update_from_match_with_breakdown(model, random_match(rnd, names, venues=("V1",), total_goals=3), journal=journal)
+        assert bool(journal.archived) == (idx in (4, 9))
+        archived.update(journal.archived)
+    guests = {name for (_, _, key) in archived for name in key if name.startswith("G")}
+    assert guests and not any(name.startswith("G0-") for pairs in model.interactions.synergy.values() for key in pairs for name in key)
+    assert all(value != 0.0 for value in archived.values())
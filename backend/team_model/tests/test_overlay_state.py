@@ -0,0 +1,71 @@
+import copy
+import pickle
+import random
+
+import pytest
+
+from team_model import Config, Match, ModelState, Segment
+from team_model.learning import update_from_match, update_from_match_with_breakdown
+from team_model.overlay import overlay_state
+from team_model.types import ExpandedFeedback, SynergyFeedback
+
+
+def _history(cfg: Config, seed: int, random_match) -> tuple[ModelState, list[str], random.Random]:
+    rnd = random.Random(seed)
+    names = [f"P{i}" for i in range(16)]
+    state = ModelState.empty(cfg)
+    for _ in range(30):
+        update_from_match(state, random_match(rnd, names))
+    return state, names, rnd
+
+
+@pytest.mark.parametrize(
+    "cfg",
+    [
+        Config(),
+        Config(
+            interaction_compact_online=True,
+            interaction_decay_per_match=0.9,
+            interaction_prune_epsilon=0.2,
+            interaction_inactive_matches=4,
+        ),
+    ],
+)
+def test_overlay_matches_deepcopy_and_leaves_base_alone(cfg, random_match):
+    base, names, rnd = _history(cfg, 3, random_match)
+    blob = pickle.dumps(base)
+    copied, overlay = copy.deepcopy(base), overlay_state(base)
+    for _ in range(3):
+        match = random_match(rnd, names + ["Guest"])
+        feedback = ExpandedFeedback(synergies=[SynergyFeedback(player_a=match.team_a[0], player_b=match.team_b[0])])
+        expected = update_from_match_with_breakdown(copied, match, expanded_feedback=feedback)
+        assert update_from_match_with_breakdown(overlay, match, expanded_feedback=feedback) == expected
+
+    assert pickle.dumps(base) == blob
+    if not cfg.interaction_compact_online:
+        # Online compaction looks at every player to find inactive ones, which copies them all.
+        assert len(overlay.players.written) < len(copied.players)
+    assert {name: overlay.players[name] for name in copied.players} == copied.players
+    # The copy keeps online decay as a lazy scale, the overlay applies it per read: equal up to rounding.
+    scale = copied.interactions.scale
+    for kind, getter in (("synergy", "get_syn"), ("domination", "get_dom")):
+        for venue, pairs in getattr(copied.interactions, kind).items():
+            for key, value in pairs.items():
+                names_in_key = sorted(key) if kind == "synergy" else key
+                assert getattr(overlay.interactions, getter)(venue, *names_in_key) == pytest.approx(value * scale)
+    for kind, tables in overlay.interactions.written.items():
+        for venue, pairs in tables.items():
+            for key, value in pairs.items():
+                assert getattr(copied.interactions, kind).get(venue, {}).get(key, 0.0) * scale == pytest.approx(value)
+    assert overlay.match_count == copied.match_count
+
+
+def test_overlays_are_independent_projections(random_match):
+    base, names, rnd = _history(Config(), 4, random_match)
+    match = random_match(rnd, names)
+    win = overlay_state(base)
+    loss = overlay_state(base)
+    win_deltas = update_from_match(win, Match(match.venue, match.team_a, match.team_b, [Segment(5, 3, 0)], []))
+    loss_deltas = update_from_match(loss, Match(match.venue, match.team_a, match.team_b, [Segment(1, 4, 0)], []))
+    assert all(win_deltas[name] > 0 > loss_deltas[name] for name in match.team_a)
+    assert base.players[match.team_a[0]].global_rating != win.players[match.team_a[0]].global_rating
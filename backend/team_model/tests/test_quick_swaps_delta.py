@@ -0,0 +1,31 @@
+import random
+
+from team_model import Config, ModelState
+from team_model.interactions import add_domination, add_synergy
+from team_model.teamgen import evaluate_split, suggest_quick_swaps
+from team_model.types import PlayerState
+
+
+def test_swap_deltas_match_full_evaluation():
+    rnd = random.Random(3)
+    cfg = Config()
+    model = ModelState.empty(cfg)
+    names = [f"P{i}" for i in range(10)]
+    for name in names:
+        rating = rnd.uniform(900.0, 1150.0)
+        model.players[name] = PlayerState(name, rating, {"V1": rating}, role_tendencies={"defense": rnd.choice([0.0, 2.0])})
+    for _ in range(25):
+        a, b = rnd.sample(names, 2)
+        add_synergy(model.interactions, "V1", a, b, rnd.choice([0.5, -0.5]))
+        add_domination(model.interactions, "V1", a, b, 0.3)
+
+    base = {"team_a": names[:5], "team_b": names[5:]}
+    base_eval = evaluate_split(model, base["team_a"], base["team_b"], "V1")
+    swaps = suggest_quick_swaps(model, base, [], "V1", top_n=25)
+    assert len(swaps) == 25
+    for swap in swaps:
+        full = evaluate_split(model, swap["team_a"], swap["team_b"], "V1")
+        assert abs(swap["d_hat"] - full["d_hat"]) < 1e-6
+        assert abs(swap["score_delta"] - (full["score"] - base_eval["score"])) < 1e-6
+        for key, value in swap["comp_delta"].items():
+            assert abs(value - (full["components"][key] - base_eval["components"][key])) < 1e-6
@@ -0,0 +1,19 @@
+import pickle
+
+from team_model.interactions import add_synergy
+from team_model.types import InteractionState
+
+
+def test_synergy_pickle_is_stable_and_reads_legacy_blobs():
+    first, second = InteractionState(), InteractionState()
+    add_synergy(first, "V1", "alpha", "beta", 0.5)
+    add_synergy(second, "V1", "beta", "alpha", 0.5)
+    assert pickle.dumps(first) == pickle.dumps(second)
+
+    restored = pickle.loads(pickle.dumps(first))
+    assert restored == first
+    assert pickle.dumps(restored) == pickle.dumps(first)
+
+    legacy = InteractionState.__new__(InteractionState)
+    legacy.__setstate__({"synergy": {"V1": {frozenset({"alpha", "beta"}): 0.5}}, "domination": {}})
+    assert legacy.get_syn("V1", "beta", "alpha") == 0.5
@@ -0,0 +1,52 @@
+import pickle
+
+import pytest
+
+from team_model import Config, ModelState
+from team_model.learning import ensure_participants, update_from_match_with_breakdown
+from team_model.sweep import (
+    format_table,
+    grid_configs,
+    load_history,
+    match_d_hat,
+    random_configs,
+    run_sweep,
+    score_predictions,
+)
+from team_model.teamgen import evaluate_split
+
+
+def test_predictions_use_pre_match_state_and_replay_unchanged(random_history):
+    history = load_history(random_history(1, 30))
+    cfg = Config()
+    state, plain = ModelState.empty(cfg), ModelState.empty(cfg)
+    for item in history:
+        ensure_participants(state, item.match)
+        expected = evaluate_split(state, item.match.team_a, item.match.team_b, item.match.venue)["d_hat"]
+        assert match_d_hat(state, item.match) == pytest.approx(expected)
+        for model in (state, plain):
+            update_from_match_with_breakdown(model, item.match, quick_feedback=item.quick_feedback)
+    assert pickle.dumps(state) == pickle.dumps(plain)
+
+
+def test_score_predictions_fits_scale():
+    score = score_predictions([10.0, -20.0, 0.0], [1.0, -2.0, 1.0])
+    assert score["scale"] == pytest.approx(0.1)
+    assert score["mae"] == pytest.approx(1 / 3)
+    assert score["sign_accuracy"] == pytest.approx(2 / 3)
+
+
+def test_sweep_ranks_configs_the_same_in_a_pool(random_history):
+    history = load_history(random_history(2, 30))
+    configs = grid_configs(Config(), {"cap_pct": [0.04, 0.08, 0.16], "anchor_step1": [5.0, 15.0]})
+    assert len(configs) == 6 and {cfg.cap_pct for cfg in configs} == {0.04, 0.08, 0.16}
+    serial = run_sweep(history, configs)
+    assert [score["mae"] for _, score in serial] == sorted(score["mae"] for _, score in serial)
+    assert run_sweep(history, configs, workers=2) == serial
+
+    sampled = random_configs(Config(), 3, {"cap_pct": (0.05, 0.1)}, seed=4)
+    assert sampled == random_configs(Config(), 3, {"cap_pct": (0.05, 0.1)}, seed=4)
+    assert all(0.05 <= cfg.cap_pct <= 0.1 and cfg.anchor_step1 == Config().anchor_step1 for cfg in sampled)
+
+    table = format_table(serial, ["cap_pct", "anchor_step1"], limit=2).splitlines()
+    assert len(table) == 3 and table[0].split() == ["rank", "mae", "scale", "sign_acc", "cap_pct", "anchor_step1"]
@@ -0,0 +1,74 @@
+from itertools import combinations
+import random
+import time
+
+import pytest
+
+from team_model import Config, ModelState, TeamConstraints
+from team_model.interactions import add_synergy
+from team_model.teamgen import evaluate_split, generate_teams
+from team_model.types import PlayerState
+
+
+def _model(seed: int, n: int):
+    rnd = random.Random(seed)
+    model = ModelState.empty(Config())
+    names = [f"P{i:02d}" for i in range(n)]
+    for name in names:
+        rating = rnd.uniform(900.0, 1150.0)
+        model.players[name] = PlayerState(name, rating, {"V1": rating})
+    for _ in range(n):
+        a, b = rnd.sample(names, 2)
+        add_synergy(model.interactions, "V1", a, b, 0.5)
+    return model, names
+
+
+def test_constrained_best_matches_brute_force():
+    model, names = _model(5, 10)
+    constraints = TeamConstraints(together=(("P01", "P02"),), apart=(("P03", "P04"),))
+    expected = []
+    for rest in combinations(names[1:], 4):
+        team_a = [names[0], *rest]
+        if ("P01" in team_a) != ("P02" in team_a) or ("P03" in team_a) == ("P04" in team_a):
+            continue
+        team_b = [p for p in names if p not in team_a]
+        expected.append(evaluate_split(model, team_a, team_b, "V1"))
+    expected.sort(key=lambda item: (item["score"], abs(item["d_hat"]), item["team_a"]))
+
+    for solver in ("exhaustive", "pruned", "local"):
+        best = generate_teams(model, names, "V1", top_n=1, solver=solver, constraints=constraints)[0]
+        assert best["team_a"] == expected[0]["team_a"]
+
+
+def test_large_constrained_space_uses_budgeted_local_search():
+    model, names = _model(3, 26)
+    for name in names:
+        model.players[name] = PlayerState(name, 1000.0, {"V1": 1000.0})
+    constraints = TeamConstraints(together=(("P03", "P04", "P05"),), apart=(("P01", "P02"), ("P03", "P06")))
+    started = time.perf_counter()
+    variants = generate_teams(model, names, "V1", top_n=3, constraints=constraints)
+    assert time.perf_counter() - started < 2.0
+    assert len(variants) == 3
+    for variant in variants:
+        team_a = set(variant["team_a"])
+        assert len(team_a) == 13
+        assert ("P01" in team_a) != ("P02" in team_a)
+        assert {"P03", "P04", "P05"} <= team_a or not {"P03", "P04", "P05"} & team_a
+        assert ("P03" in team_a) != ("P06" in team_a)
+
+
+def test_fixed_sides_are_respected():
+    model, names = _model(9, 12)
+    constraints = TeamConstraints(team_a=("P05",), team_b=("P00", "P07"))
+    variants = generate_teams(model, names, "V1", top_n=3, constraints=constraints)
+    assert variants
+    for variant in variants:
+        assert "P05" in variant["team_a"]
+        assert {"P00", "P07"} <= set(variant["team_b"])
+
+
+def test_conflicting_constraints_raise():
+    model, names = _model(1, 8)
+    constraints = TeamConstraints(together=(("P01", "P02"),), apart=(("P01", "P02"),))
+    with pytest.raises(ValueError):
+        generate_teams(model, names, "V1", constraints=constraints)
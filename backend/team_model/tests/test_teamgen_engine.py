@@ -0,0 +1,80 @@
+from itertools import combinations
+import random
+
+from team_model import Config, ModelState
+from team_model.engine import build_split_context
+from team_model.interactions import add_domination, add_synergy
+from team_model import teamgen
+from team_model.teamgen import evaluate_split, generate_teams
+from team_model.types import PlayerState
+
+
+def test_engine_matches_scalar_scoring():
+    rnd = random.Random(7)
+    cfg = Config()
+    model = ModelState.empty(cfg)
+    names = [f"P{i}" for i in range(10)]
+    for name in names:
+        rating = rnd.uniform(900.0, 1150.0)
+        model.players[name] = PlayerState(name, rating, {"V1": rating}, role_tendencies={"attack": rnd.choice([0.0, 1.0])})
+    for _ in range(20):
+        a, b = rnd.sample(names, 2)
+        add_synergy(model.interactions, "V1", a, b, 0.5)
+        add_domination(model.interactions, "V1", a, b, 0.3)
+
+    expected = []
+    for rest in combinations(names[1:], 4):
+        team_a = [names[0], *rest]
+        team_b = [p for p in names if p not in team_a]
+        expected.append(evaluate_split(model, team_a, team_b, "V1"))
+    expected.sort(key=lambda item: (item["score"], abs(item["d_hat"]), item["team_a"]))
+
+    best = generate_teams(model, names, "V1", top_n=1)[0]
+    assert best["team_a"] == expected[0]["team_a"]
+    assert abs(best["score"] - expected[0]["score"]) < 1e-9
+
+
+def test_shared_context_matches_per_call_preparation():
+    rnd = random.Random(11)
+    model = ModelState.empty(Config())
+    names = [f"P{i}" for i in range(8)]
+    for name in names:
+        rating = rnd.uniform(900.0, 1150.0)
+        model.players[name] = PlayerState(name, rating, {"V1": rating})
+    for _ in range(10):
+        a, b = rnd.sample(names, 2)
+        add_synergy(model.interactions, "V1", a, b, 0.5)
+
+    ctx = build_split_context(model, names, "V1")
+    variants = generate_teams(model, names, "V1", top_n=3, ctx=ctx)
+    assert variants == generate_teams(model, names, "V1", top_n=3)
+    for variant in variants:
+        shared = evaluate_split(model, variant["team_a"], variant["team_b"], "V1", ctx=ctx)
+        fresh = evaluate_split(model, variant["team_a"], variant["team_b"], "V1")
+        assert abs(shared["score"] - fresh["score"]) < 1e-9
+        assert shared["components"] == fresh["components"]
+
+
+def test_context_of_another_roster_is_not_used():
+    model = ModelState.empty(Config())
+    for idx, rating in enumerate([1200.0, 1100.0, 1000.0, 950.0, 900.0, 850.0]):
+        model.players[f"P{idx}"] = PlayerState(f"P{idx}", rating, {"V1": rating})
+    model.players["Guest"] = PlayerState("Guest", 1300.0, {"V1": 1300.0}, is_guest=True)
+    team_a, team_b = ["P0", "P3", "Guest"], ["P1", "P2", "P4"]
+
+    wider = build_split_context(model, team_a + team_b + ["P5"], "V1")
+    assert wider.rating_map["Guest"] != build_split_context(model, team_a + team_b, "V1").rating_map["Guest"]
+    assert evaluate_split(model, team_a, team_b, "V1", ctx=wider) == evaluate_split(model, team_a, team_b, "V1")
+
+
+def test_small_candidate_pool_keeps_ranking(monkeypatch):
+    rnd = random.Random(3)
+    model = ModelState.empty(Config(teamgen_overlap_min_diff=3))
+    names = [f"P{i:02d}" for i in range(12)]
+    for name in names:
+        rating = 1000.0 if rnd.random() < 0.5 else rnd.uniform(900.0, 1150.0)
+        model.players[name] = PlayerState(name, rating, {"V1": rating})
+
+    expected = generate_teams(model, names, "V1", top_n=5)
+    monkeypatch.setattr(teamgen, "CANDIDATE_POOL", 2)
+    assert generate_teams(model, names, "V1", top_n=5) == expected
@@ -0,0 +1,24 @@
+import time
+
+from team_model import Config
+from team_model.teamgen import generate_teams
+
+
+def test_local_search_finds_exhaustive_best(rated_model):
+    model, names = rated_model(Config(teamgen_time_budget_ms=100.0), 10, seed=5)
+    best = generate_teams(model, names, "V1", top_n=1)[0]
+    local = generate_teams(model, names, "V1", top_n=1, solver="local")[0]
+    assert local["team_a"] == best["team_a"]
+
+
+def test_auto_falls_back_to_budgeted_local_search(rated_model):
+    cfg = Config(teamgen_exhaustive_max_splits=1000, teamgen_time_budget_ms=50.0)
+    model, names = rated_model(cfg, 40, seed=5)
+    started = time.perf_counter()
+    variants = generate_teams(model, names, "V1", top_n=3)
+    assert time.perf_counter() - started < 2.0
+    assert len(variants) == 3
+    for i, first in enumerate(variants):
+        for second in variants[i + 1 :]:
+            overlap = len(set(first["team_a"]) & set(second["team_a"]))
+            assert overlap <= 20 - cfg.teamgen_overlap_min_diff
@@ -0,0 +1,47 @@
+from itertools import combinations
+import random
+
+from team_model import Config, ModelState
+from team_model.interactions import add_domination, add_synergy
+from team_model import parallel
+from team_model.parallel import shard_prefixes
+from team_model.pruning import count_splits
+from team_model.teamgen import generate_teams
+from team_model.types import PlayerState
+
+
+def _rest(prefix):
+    return combinations(range(prefix[-1] + 1, 14), 7 - 1 - len(prefix))
+
+
+def test_shards_cover_every_split_once():
+    shards = shard_prefixes(14, 7, 6)
+    prefixes = [prefix for shard in shards for prefix in shard]
+    assert len(prefixes) == len(set(prefixes))
+    assert sum(len(list(_rest(prefix))) for prefix in prefixes) == count_splits(14, 7)
+
+
+def test_parallel_exhaustive_matches_serial():
+    rnd = random.Random(4)
+    model = ModelState.empty(Config(teamgen_parallel_min_splits=0))
+    names = [f"P{i:02d}" for i in range(14)]
+    for name in names:
+        rating = 1000.0 if rnd.random() < 0.4 else rnd.uniform(850.0, 1200.0)
+        model.players[name] = PlayerState(name, rating, {"V1": rating})
+    for _ in range(30):
+        a, b = rnd.sample(names, 2)
+        add_synergy(model.interactions, "V1", a, b, rnd.choice([0.5, -0.5]))
+        add_domination(model.interactions, "V1", a, b, rnd.choice([0.3, 1.0]))
+
+    serial = generate_teams(model, names, "V1", top_n=3, solver="exhaustive")
+    try:
+        assert generate_teams(model, names, "V1", top_n=3, solver="exhaustive", workers=2) == serial
+        pool = parallel._pool
+        # A later request on a changed state reuses the same processes.
+        model.players["P00"].global_rating += 100.0
+        model.players["P00"].venue_ratings["V1"] += 100.0
+        again = generate_teams(model, names, "V1", top_n=3, solver="exhaustive", workers=2)
+        assert parallel._pool is pool
+        assert again == generate_teams(model, names, "V1", top_n=3, solver="exhaustive")
+    finally:
+        parallel.shutdown_pool()
@@ -0,0 +1,56 @@
+from itertools import permutations
+from math import factorial
+import random
+
+import numpy as np
+
+from team_model import Config
+from team_model.partition import (
+    _moved_players,
+    canonical_labels,
+    count_partitions,
+    generate_partitions,
+    partition_labels,
+)
+from team_model.teamgen import generate_teams
+
+
+def test_partitions_skip_relabelled_duplicates():
+    labels = partition_labels(9, 3)
+    assert count_partitions(9, 3) == factorial(9) // (factorial(3) ** 3 * factorial(3))
+    assert len(labels) == count_partitions(9, 3)
+    assert len({tuple(row) for row in canonical_labels(labels).tolist()}) == len(labels)
+
+
+def test_two_team_partition_matches_generate_teams(rated_model):
+    model, names = rated_model(Config(), 10)
+    best = generate_teams(model, names, "V1", top_n=1)[0]
+    partition = generate_partitions(model, names, "V1", 2, top_n=1)[0]
+    assert partition["teams"][0] == best["team_a"]
+    assert abs(partition["score"] - best["score"]) < 1e-9
+
+
+def test_rotation_partitions_are_balanced_and_diverse(rated_model):
+    cfg = Config(teamgen_exhaustive_max_splits=1000, teamgen_time_budget_ms=50.0)
+    model, names = rated_model(cfg, 15)
+    variants = generate_partitions(model, names, "V1", 3, top_n=3)
+    assert len(variants) == 3
+    for variant in variants:
+        assert sorted(len(team) for team in variant["teams"]) == [5, 5, 5]
+        assert sorted(p for team in variant["teams"] for p in team) == names
+    assert variants[0]["score"] <= variants[1]["score"] <= variants[2]["score"]
+
+
+def test_moved_players_pairs_teams_optimally():
+    rnd = random.Random(6)
+    for num_teams in range(2, 7):
+        for _ in range(30):
+            labels_a = np.array([rnd.randrange(num_teams) for _ in range(3 * num_teams)])
+            labels_b = np.array([rnd.randrange(num_teams) for _ in range(3 * num_teams)])
+            kept = max(
+                sum(1 for a, b in zip(labels_a, labels_b) if perm[a] == b) for perm in permutations(range(num_teams))
+            )
+            assert _moved_players(labels_a, labels_b, num_teams) == len(labels_a) - kept
+    # Relabelling the teams moves nobody, even at eight teams.
+    labels = np.repeat(np.arange(8), 3)
+    assert _moved_players(labels, (labels + 3) % 8, 8) == 0
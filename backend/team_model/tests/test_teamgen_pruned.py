@@ -0,0 +1,54 @@
+import random
+
+from team_model import Config, ModelState
+from team_model.interactions import add_domination, add_synergy
+from team_model import teamgen
+from team_model.teamgen import generate_teams
+from team_model.types import PlayerState
+
+
+def test_pruned_solver_matches_exhaustive():
+    rnd = random.Random(11)
+    cfg = Config()
+    model = ModelState.empty(cfg)
+    names = [f"P{i:02d}" for i in range(13)]
+    for name in names:
+        rating = rnd.uniform(850.0, 1200.0)
+        model.players[name] = PlayerState(name, rating, {"V1": rating}, is_guest=rnd.random() < 0.2)
+    for _ in range(40):
+        a, b = rnd.sample(names, 2)
+        add_synergy(model.interactions, "V1", a, b, rnd.choice([0.5, -0.5]))
+        add_domination(model.interactions, "V1", a, b, rnd.choice([0.3, 1.0]))
+
+    for top_n in (1, 3, 5):
+        exhaustive = generate_teams(model, names, "V1", top_n=top_n)
+        pruned = generate_teams(model, names, "V1", top_n=top_n, solver="pruned")
+        assert pruned == exhaustive
+
+
+def test_pruned_solver_settles_below_the_full_space(monkeypatch, rated_model):
+    model, names = rated_model(Config(), 18, seed=5)
+    expected = {top_n: generate_teams(model, names, "V1", top_n=top_n) for top_n in (1, 3, 5)}
+    # Spread ratings separate, so the threshold seeded from the descent settles without streaming every split.
+    monkeypatch.setattr(teamgen, "_exhaustive_splits", None)
+    for top_n, variants in expected.items():
+        assert generate_teams(model, names, "V1", top_n=top_n, solver="pruned") == variants
+
+
+def test_pruned_solver_streams_when_bounds_do_not_separate(monkeypatch):
+    cfg = Config()
+    model = ModelState.empty(cfg)
+    names = [f"P{i:02d}" for i in range(12)]
+    for name in names:
+        model.players[name] = PlayerState(name, 1000.0, {"V1": 1000.0})
+    streamed = []
+    exhaustive_splits = teamgen._exhaustive_splits
+
+    def spy(*args, **kwargs):
+        streamed.append(args)
+        return exhaustive_splits(*args, **kwargs)
+
+    monkeypatch.setattr(teamgen, "_exhaustive_splits", spy)
+    pruned = generate_teams(model, names, "V1", top_n=3, solver="pruned")
+    assert len(streamed) == 1
+    assert pruned == generate_teams(model, names, "V1", top_n=3)
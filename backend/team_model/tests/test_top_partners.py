@@ -0,0 +1,52 @@
+import random
+
+from team_model.interactions import add_domination, add_synergy
+from team_model.types import InteractionState
+
+
+def _brute(table: dict, venues, player: str, k: int, symmetric: bool, incoming: bool = False) -> dict:
+    totals: dict[str, float] = {}
+    for venue in venues if venues is not None else table:
+        for key, value in table.get(venue, {}).items():
+            if symmetric and player in key:
+                other = next(iter(key - {player}))
+            elif not symmetric and key[incoming] == player:
+                other = key[not incoming]
+            else:
+                continue
+            totals[other] = totals.get(other, 0.0) + value
+    ranked = sorted(((value, other) for other, value in totals.items()))
+    positive = [(other, value) for value, other in reversed(ranked) if value > 0][:k]
+    negative = [(other, value) for value, other in ranked if value < 0][:k]
+    return {"positive": positive, "negative": negative}
+
+
+def test_top_partners_follow_updates_for_every_view():
+    rnd = random.Random(6)
+    names = [f"P{i}" for i in range(15)]
+    interactions = InteractionState()
+    views = [None, ("V1",), ("V1", "V2"), ("__global__",)]
+    for step in range(400):
+        a, b = rnd.sample(names, 2)
+        venue = rnd.choice(["V1", "V2", "V3"])
+        if step % 2:
+            add_synergy(interactions, venue, a, b, rnd.choice([-1.0, -0.5, 0.5, 1.0]))
+        else:
+            add_domination(interactions, venue, a, b, rnd.choice([-0.3, 0.3, 1.0]))
+        if step % 50 == 0:
+            player = rnd.choice(names)
+            for venues in views:
+                assert interactions.top_partners("synergy", player, venues, 3) == _brute(
+                    interactions.synergy, venues, player, 3, True
+                )
+                assert interactions.top_partners("domination", player, venues, 3) == _brute(
+                    interactions.domination, venues, player, 3, False
+                )
+                assert interactions.top_partners("dominated_by", player, venues, 3) == _brute(
+                    interactions.domination, venues, player, 3, False, incoming=True
+                )
+
+    interactions.synergy["V1"] = {}
+    interactions.invalidate_effective()
+    assert interactions.top_partners("synergy", "P0", ("V1",), 3) == {"positive": [], "negative": []}
+    assert interactions.top_partners("synergy", "missing", None, 3) == {"positive": [], "negative": []}
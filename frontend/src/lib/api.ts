@@ -399,11 +399,41 @@ export async function adminGetRatingLogs(params: { player_id?: string; match_id?
   }> }>(`/admin/rating-logs${suffix}`);
 }
 
+type AdminJob = {
+  job_id: number;
+  kind: string;
+  status: "queued" | "running" | "done" | "failed" | "cancelled";
+  progress: number;
+  error: string | null;
+  result: { matches: number } | null;
+};
+
+export async function adminGetJob(jobId: number) {
+  return apiFetch<AdminJob>(`/admin/jobs/${jobId}`);
+}
+
+export async function adminCancelJob(jobId: number) {
+  return apiFetch<AdminJob>(`/admin/jobs/${jobId}/cancel`, { method: "POST" });
+}
+
+async function waitForAdminJob(job: AdminJob) {
+  // Rebuilds run on the background worker; poll until the job settles.
+  while (job.status === "queued" || job.status === "running") {
+    await new Promise((resolve) => setTimeout(resolve, 1000));
+    job = await adminGetJob(job.job_id);
+  }
+  if (job.status !== "done" || !job.result) {
+    throw new ApiError(job.error || job.status, 200);
+  }
+  return job.result;
+}
+
 export async function adminRebuildRatingLogs(context_id = 1) {
-  return apiFetch<{ matches: number }>(`/admin/rating-logs/rebuild`, {
+  const job = await apiFetch<AdminJob>(`/admin/rating-logs/rebuild`, {
     method: "POST",
     body: JSON.stringify({ context_id })
   });
+  return waitForAdminJob(job);
 }
 
 export async function adminGetInteractions(params: { context_id?: number; venue: string; kind: "synergy" | "domination" }) {
@@ -457,10 +487,11 @@ export async function adminGetInteractionLogs(params: {
 }
 
 export async function adminRebuildInteractionLogs(context_id = 1) {
-  return apiFetch<{ matches: number }>(`/admin/interaction-logs/rebuild`, {
+  const job = await apiFetch<AdminJob>(`/admin/interaction-logs/rebuild`, {
     method: "POST",
     body: JSON.stringify({ context_id })
   });
+  return waitForAdminJob(job);
 }
 
 export async function adminDeleteMatch(matchId: number) {